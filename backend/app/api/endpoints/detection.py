@@ -1,25 +1,40 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException
+from fastapi.responses import StreamingResponse
 from app.services.owlv2_service import Owlv2Service
+from app.core import detections
+from app.core.config import settings
+from app.core.executor import InferenceExecutor, InferenceOverloaded
+from app.core.uploads import UploadTooLarge, read_upload
 from typing import List, Optional
-import io
+import asyncio
+import json
 
 router = APIRouter()
 
+# Waits (INFERENCE_RETRY_AFTER_S apart) for a saturated executor before a
+# streamed batch's images are reported as "overloaded"
+BATCH_OVERLOAD_RETRIES = 3
+
 @router.post("/")
 async def detect_apparel(
     file: UploadFile = File(...),
-    labels: Optional[List[str]] = None
+    labels: Optional[List[str]] = None,
+    compact: bool = False
 ):
     """
     Zero-Shot Detection of Fashion Items.
     Upload an image -> Get bounding boxes for 'shirt', 'dress', 'shoes', etc.
+    `compact=true` returns parallel label/confidence arrays and one flat box array.
     """
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
+    # Streamed in chunks; 413 as soon as MAX_UPLOAD_BYTES is crossed
+    content = await read_upload(file)
     try:
-        content = await file.read()
-        results = Owlv2Service.detect(content, labels)
+        results = await InferenceExecutor.run(Owlv2Service.detect, content, labels)
+        if compact:
+            results = detections.compact(results)
         return {
             "status": "success",
             "meta": {
@@ -28,5 +43,96 @@ async def detect_apparel(
             },
             "data": results
         }
+    except InferenceOverloaded:
+        raise
+    except ValueError as e:
+        # Undecodable upload
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+async def _detect_batch(batch: list, labels: Optional[List[str]]) -> dict:
+    """index -> detection result (or {"error"}) for one OWLv2 batch; InferenceOverloaded propagates"""
+    valid = [item for item in batch if item["content"] is not None]
+    if not valid:
+        return {}
+    try:
+        results = await InferenceExecutor.run(
+            Owlv2Service.detect_many, [item["content"] for item in valid], labels
+        )
+    except InferenceOverloaded:
+        raise
+    except Exception as e:
+        return {item["index"]: {"error": str(e)} for item in valid}
+    return {item["index"]: result for item, result in zip(valid, results)}
+
+async def _detect_batch_retrying(batch: list, labels: Optional[List[str]]) -> dict:
+    """_detect_batch, waiting out a saturated executor; still saturated -> retryable per-image errors"""
+    for attempt in range(BATCH_OVERLOAD_RETRIES + 1):
+        try:
+            return await _detect_batch(batch, labels)
+        except InferenceOverloaded as e:
+            if attempt == BATCH_OVERLOAD_RETRIES:
+                return {
+                    item["index"]: {"error": str(e), "retry_after": settings.INFERENCE_RETRY_AFTER_S}
+                    for item in batch if item["content"] is not None
+                }
+            await asyncio.sleep(settings.INFERENCE_RETRY_AFTER_S)
+
+@router.post("/batch")
+async def detect_apparel_batch(
+    files: List[UploadFile] = File(...),
+    labels: Optional[List[str]] = Form(None),
+    compact: bool = Form(False)
+):
+    """
+    Batch Zero-Shot Detection.
+    Upload many images with one shared label set -> NDJSON stream with one line
+    per image, emitted as each padded OWLv2 batch finishes. A saturated executor
+    fails the request with 503 before streaming starts; mid-stream, batches wait
+    for capacity and images still refused are "overloaded" lines to resend.
+    """
+    if len(files) > settings.DETECT_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.DETECT_BATCH_MAX_FILES} images per request"
+        )
+
+    # Uploads are closed once this handler returns, so read them before streaming
+    items = []
+    for index, upload in enumerate(files):
+        item = {"index": index, "filename": upload.filename, "content": None}
+        if not upload.content_type or not upload.content_type.startswith("image/"):
+            item["error"] = "File must be an image"
+        else:
+            try:
+                item["content"] = await read_upload(upload)
+            except UploadTooLarge as e:
+                item["error"] = e.detail
+        items.append(item)
+
+    batch_size = settings.OWLV2_BATCH_SIZE
+    batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+    # First batch before the response starts: a saturated executor is still a 503 + Retry-After
+    first = await _detect_batch(batches[0], labels) if batches else {}
+
+    async def stream():
+        for number, batch in enumerate(batches):
+            by_index = first if number == 0 else await _detect_batch_retrying(batch, labels)
+            for item in batch:
+                if item["content"] is None:
+                    result = {"error": item["error"]}
+                else:
+                    result = by_index[item["index"]]
+                line = {"index": item["index"], "filename": item["filename"]}
+                if "retry_after" in result:
+                    # Not processed: the caller should resend this image
+                    line.update({"status": "overloaded", "detail": result["error"],
+                                 "retry_after": result["retry_after"]})
+                elif "error" in result:
+                    line.update({"status": "error", "detail": result["error"]})
+                else:
+                    line.update({"status": "success", "data": detections.compact(result) if compact else result})
+                yield json.dumps(line) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
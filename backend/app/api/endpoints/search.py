@@ -1,62 +1,179 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
-from app.services.siglip_service import SiglipService
 from app.services.qdrant_service import QdrantService
+from app.services.hybrid_search import HybridSearchService
+from app.services.payload_store import PayloadStore
+from app.services.reranking_service import RerankingService
+from app.services.search_cache import SearchCache
+from app.services.siglip_service import SiglipService
+from app.services.visual_search import VisualSearchService
+from app.core import metrics
+from app.core.config import settings
+from app.core.executor import InferenceExecutor
+from app.core.imaging import decode_image
+from app.core.residency import ModelResidency
+from app.core.uploads import read_upload
 
 router = APIRouter()
 
 class SearchQuery(BaseModel):
     query_text: Optional[str] = None
     top_k: int = 5
+    # Opt-in cross-encoder stage over the top RERANK_CANDIDATES hits
+    rerank: bool = False
+
+class HybridSearchQuery(SearchQuery):
+    top_k: int = 20
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: Optional[bool] = None
+    brand: Optional[str] = None
 
 class SearchResponse(BaseModel):
+    id: Optional[str] = None
     score: float
+    rerank_score: Optional[float] = None
     payload: dict
 
-import hashlib
-from app.services.redis_service import RedisService
+class ImageSearchRegion(BaseModel):
+    label: str
+    box: Optional[List[float]] = None
+    confidence: Optional[float] = None
+    results: List[SearchResponse]
 
-# ... imports ...
+def _stage_one_limit(query: SearchQuery) -> int:
+    return max(query.top_k, settings.RERANK_CANDIDATES) if query.rerank else query.top_k
 
-@router.post("/", response_model=List[SearchResponse])
+async def _format_hits(query: SearchQuery, hits: list, rerank_version: Optional[str] = None,
+                       collection_name: Optional[str] = None) -> list:
+    """Response rows, reranked by the cross-encoder when the query asks for it"""
+    if settings.SEARCH_CACHE_PAYLOADS == "ids":
+        PayloadStore.put_hits(hits, collection_name)
+    if not query.rerank:
+        return [{"id": str(hit.id), "score": hit.score, "payload": hit.payload} for hit in hits]
+    # The budget covers the wait for an inference thread too
+    deadline = RerankingService.deadline_after()
+    with metrics.timed("rerank"):
+        reranked = await InferenceExecutor.run(
+            RerankingService.rerank, SearchCache.normalize_query(query.query_text), hits, query.top_k,
+            version=rerank_version, deadline=deadline,
+        )
+    return [
+        {"id": r.id, "score": r.original_score, "rerank_score": r.rerank_score, "payload": r.payload}
+        for r in reranked
+    ]
+
+# exclude_unset: rerank_score only appears on reranked responses
+@router.post("/", response_model=List[SearchResponse], response_model_exclude_unset=True)
 async def search_items(query: SearchQuery):
     """
-    Multimodal Semantic Search with Redis Caching:
-    1. Check Redis cache for query hash.
-    2. If hit, return cached results.
-    3. If miss, generate embedding -> search Qdrant -> cache results.
+    Multimodal Semantic Search with two-tier caching:
+    1. Check the result cache (worker LRU, then Redis) for the normalized query.
+    2. If hit, return cached results (stale ones are refreshed in the background).
+    3. If miss, get the text embedding (itself cached) -> search Qdrant -> cache results,
+       with identical concurrent misses coalesced into one computation.
+    """
+    if not query.query_text:
+        return []
+
+    # A/B-routed model versions (MODEL_AB_ROUTES); {} serves the default models
+    versions = ModelResidency.route_all(SearchCache.normalize_query(query.query_text))
+    cache_key = SearchCache.result_key(
+        "text", query.query_text, top_k=query.top_k, rerank=query.rerank, **versions
+    )
+
+    collection_name = SiglipService.collection_for(versions.get("siglip"))
+
+    async def compute():
+        # 2. Text embedding (cached; otherwise off the event loop, rejected if saturated)
+        embedding = await SearchCache.text_embedding(query.query_text, versions.get("siglip"))
+
+        # 3. Search in Vector DB
+        results = await QdrantService.search(
+            embedding, limit=_stage_one_limit(query), collection_name=collection_name,
+        )
+
+        # 4. Format response (optionally reranked)
+        return await _format_hits(query, results, versions.get("reranker"), collection_name)
+
+    # 1./5. Cached (stale entries refreshed in the background), or computed
+    # once per key across concurrent requests and cached
+    return await SearchCache.cached_results(cache_key, compute, kind="text", collection_name=collection_name)
+
+@router.post("/hybrid", response_model=List[SearchResponse], response_model_exclude_unset=True)
+async def hybrid_search(query: HybridSearchQuery):
+    """
+    Semantic search constrained by structured filters (category, brand,
+    price range, stock). Filters run inside Qdrant's HNSW traversal on the
+    payload indexes created by `init_collection`.
     """
     if not query.query_text:
         return []
 
-    # Generate cache key
-    query_hash = hashlib.md5(f"{query.query_text}-{query.top_k}".encode()).hexdigest()
-    cache_key = f"search:{query_hash}"
-
-    # 1. Check Cache
-    cached_results = await RedisService.get_cache(cache_key)
-    if cached_results:
-        return cached_results
-
-    # 2. Generate text embedding
-    embedding = SiglipService.get_text_embedding(query.query_text)
-    
-    # 3. Search in Vector DB
-    results = QdrantService.search(embedding, limit=query.top_k)
-    
-    # 4. Format response
-    response = []
-    for hit in results:
-        response.append({
-            "score": hit.score,
-            "payload": hit.payload
-        })
-    
-    # 5. Set Cache (TTL: 1 hour)
-    await RedisService.set_cache(cache_key, response, expire=3600)
-        
-    return response
+    versions = ModelResidency.route_all(SearchCache.normalize_query(query.query_text))
+    cache_key = SearchCache.result_key(
+        "hybrid", query.query_text, **query.model_dump(exclude={"query_text"}), **versions
+    )
+
+    collection_name = SiglipService.collection_for(versions.get("siglip"))
+
+    async def compute():
+        embedding = await SearchCache.text_embedding(query.query_text, versions.get("siglip"))
+        results = await HybridSearchService.search(
+            embedding,
+            category=query.category,
+            min_price=query.min_price,
+            max_price=query.max_price,
+            in_stock=query.in_stock,
+            brand=query.brand,
+            limit=_stage_one_limit(query),
+            collection_name=collection_name,
+        )
+        return await _format_hits(query, results, versions.get("reranker"), collection_name)
+
+    return await SearchCache.cached_results(cache_key, compute, kind="hybrid", collection_name=collection_name)
+
+@router.post("/image", response_model=List[ImageSearchRegion])
+async def search_by_image(
+    file: UploadFile = File(...),
+    top_k: int = Form(5),
+    crop: bool = Form(True),
+):
+    """
+    Visual Search ("Magic Crop"):
+    1. Decode the upload once, directly at model resolution.
+    2. Optionally detect garments with OWLv2.
+    3. Embed the full image + every crop in a single SigLIP batch.
+    4. Query Qdrant for all of them in one batch search.
+    """
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    content = await read_upload(file)
+    try:
+        with metrics.timed("image_decode"):
+            decoded = await run_in_threadpool(decode_image, content, settings.IMAGE_DECODE_MAX_SIDE)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    with metrics.timed("image_embedding"):
+        regions = await InferenceExecutor.run(VisualSearchService.embed_regions, decoded, content, crop)
+    batch_hits = await QdrantService.search_batch(
+        [region.embedding for region in regions], limit=top_k
+    )
+
+    return [
+        {
+            "label": region.label,
+            "box": region.box,
+            "confidence": region.confidence,
+            "results": [{"id": str(hit.id), "score": hit.score, "payload": hit.payload} for hit in hits],
+        }
+        for region, hits in zip(regions, batch_hits)
+    ]
 
 @router.on_event("startup")
 async def startup_event():
@@ -0,0 +1,114 @@
+"""
+Dynamic Micro-Batching
+Collects concurrent inference calls for a short window (or until the batch
+is full), runs a single batched forward pass and fans the results back out
+to the waiting callers.
+
+    batcher = MicroBatcher("text", SiglipService.get_text_embeddings, max_batch_size=16)
+    embedding = batcher.submit("red dress").result()
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+from app.core import metrics
+
+_batch_size = metrics.histogram(
+    "inference_batch_size",
+    "Number of requests served by one batched forward pass",
+    buckets=metrics.DEFAULT_SIZE_BUCKETS,
+)
+_batch_fill = metrics.histogram(
+    "inference_batch_fill_ratio",
+    "Batch size divided by the configured maximum batch size",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+_queue_wait = metrics.histogram(
+    "inference_batch_queue_wait_seconds",
+    "Time a request spent queued before its batch started running",
+)
+
+
+class MicroBatcher:
+    """
+    Thread-based batching scheduler.
+    `batch_fn` receives a list of inputs and must return a list of outputs
+    of the same length. Callers may block on `submit(...).result()` or
+    await `asyncio.wrap_future(submit(...))`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=f"batcher-{self.name}", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self) -> list:
+        # Block for the first request, then keep the window open for max_wait
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                _queue_wait.observe(started - enqueued_at, batcher=self.name)
+            _batch_size.observe(len(batch), batcher=self.name)
+            _batch_fill.observe(len(batch) / self.max_batch_size, batcher=self.name)
+
+            # Skip requests whose callers already gave up
+            live = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not live:
+                continue
+            try:
+                outputs = self.batch_fn([item for item, _, _ in live])
+                if len(outputs) != len(live):
+                    raise RuntimeError(
+                        f"Batch function returned {len(outputs)} results for {len(live)} inputs"
+                    )
+            except Exception as e:
+                for _, future, _ in live:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), output in zip(live, outputs):
+                future.set_result(output)
@@ -0,0 +1,92 @@
+"""
+In-process LRU Cache
+Small thread-safe LRU used for per-worker caches (query embeddings,
+rerank scores, search results, ...). Entries can optionally expire after a
+TTL. Hit/miss counts are exported through app.core.metrics under the cache's
+name.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core import metrics
+
+_hits = metrics.counter("lru_cache_hits_total", "In-process LRU cache hits")
+_misses = metrics.counter("lru_cache_misses_total", "In-process LRU cache misses")
+_evictions = metrics.counter("lru_cache_evictions_total", "In-process LRU cache evictions")
+_hit_ratio = metrics.gauge("lru_cache_hit_ratio", "Hits / lookups per in-process LRU cache since start")
+
+
+def _update_hit_ratios():
+    hits, misses = _hits.samples(), _misses.samples()
+    for key in hits.keys() | misses.keys():
+        lookups = hits.get(key, 0.0) + misses.get(key, 0.0)
+        _hit_ratio.set(hits.get(key, 0.0) / lookups if lookups else 0.0, **dict(key))
+
+
+metrics.on_collect(_update_hit_ratios)
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, name: str, maxsize: int = 128, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        # Default lifetime in seconds (None = until evicted)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (value, monotonic expiry or None)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                _misses.inc(cache=self.name)
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+        _hits.inc(cache=self.name)
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                _evictions.inc(cache=self.name)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def info(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,134 @@
+"""
+Cache Codecs
+Pluggable serialization for values stored in Redis.
+
+Every encoded value starts with a one-byte tag naming its format, with an
+upper-case tag when the body is zstd-compressed:
+    j/J = json    o/O = orjson    m/M = msgpack
+Decoding dispatches on the tag, so switching CACHE_CODEC never breaks
+entries written by another worker or an older deploy. Untagged values
+(plain JSON written before codecs existed) are still readable.
+
+orjson, msgpack and zstandard are optional; CACHE_CODEC="auto" picks the
+most compact serializer that is installed.
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+CODECS = ("auto", "msgpack", "orjson", "json")
+
+
+def _json() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    return (
+        lambda value: json.dumps(value, separators=(",", ":")).encode(),
+        json.loads,
+    )
+
+
+def _orjson():
+    import orjson
+    return orjson.dumps, orjson.loads
+
+
+def _msgpack():
+    import msgpack
+    return (
+        lambda value: msgpack.packb(value, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+
+_FORMATS = {
+    "json": (b"j", _json),
+    "orjson": (b"o", _orjson),
+    "msgpack": (b"m", _msgpack),
+}
+_TAGS = {tag: name for name, (tag, _) in _FORMATS.items()}
+
+
+def available_formats() -> list:
+    names = []
+    for name, (_, load) in _FORMATS.items():
+        try:
+            load()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+class Codec:
+    """Serializer + optional zstd compression, as bytes in / bytes out"""
+
+    def __init__(self, name: str = "json", compression: str = "none",
+                 compression_level: int = 3, min_compress_bytes: int = 512):
+        if name == "auto":
+            name = next(n for n in ("msgpack", "orjson", "json") if n in available_formats())
+        if name not in _FORMATS:
+            raise ValueError(f"Unknown cache codec '{name}'. Expected one of {CODECS}")
+        self.name = name
+        self.compression = compression
+        self.min_compress_bytes = min_compress_bytes
+        self._tag, load = _FORMATS[name]
+        self._dumps, _ = load()
+        self._decoders: Dict[str, Callable[[bytes], Any]] = {}
+
+        self._compressor = None
+        self._decompressor = None
+        if compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError(
+                    "CACHE_COMPRESSION=zstd requires the zstandard package (pip install zstandard)"
+                )
+            self._compressor = zstandard.ZstdCompressor(level=compression_level)
+            self._decompressor = zstandard.ZstdDecompressor()
+        elif compression != "none":
+            raise ValueError(f"Unknown cache compression '{compression}'")
+
+    def _decoder(self, name: str) -> Callable[[bytes], Any]:
+        decoder = self._decoders.get(name)
+        if decoder is None:
+            _, decoder = _FORMATS[name][1]()
+            self._decoders[name] = decoder
+        return decoder
+
+    def encode(self, value: Any) -> bytes:
+        body = self._dumps(value)
+        if self._compressor is not None and len(body) >= self.min_compress_bytes:
+            return self._tag.upper() + self._compressor.compress(body)
+        return self._tag + body
+
+    def decode(self, data: bytes) -> Any:
+        tag = data[:1]
+        name = _TAGS.get(tag.lower())
+        if name is None:
+            # Untagged legacy JSON
+            return json.loads(data)
+        body = data[1:]
+        if tag.isupper():
+            if self._decompressor is None:
+                import zstandard
+                self._decompressor = zstandard.ZstdDecompressor()
+            body = self._decompressor.decompress(body)
+        return self._decoder(name)(body)
+
+
+_codec: Optional[Codec] = None
+
+
+def get_codec() -> Codec:
+    global _codec
+    if _codec is None:
+        _codec = Codec(
+            settings.CACHE_CODEC,
+            settings.CACHE_COMPRESSION,
+            compression_level=settings.CACHE_COMPRESSION_LEVEL,
+            min_compress_bytes=settings.CACHE_COMPRESSION_MIN_BYTES,
+        )
+        print(f"Cache codec: {_codec.name} (compression: {_codec.compression})")
+    return _codec
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,15 +7,149 @@ class Settings(BaseSettings):
     # Model Configuration
     OWLV2_MODEL_ID: str = "google/owlv2-base-patch16-ensemble"
     SIGLIP_MODEL_ID: str = "google/siglip-so400m-patch14-384"
+    # Used when SIGLIP_MODEL_ID is not listed in model_registry
+    SIGLIP_EMBEDDING_DIM: int = 1152
     CONFIDENCE_THRESHOLD: float = 0.15
+    # Class-aware NMS IoU (>= 1 disables) and max boxes per label (0 = no cap)
+    OWLV2_NMS_IOU: float = 0.5
+    OWLV2_TOP_K_PER_LABEL: int = 10
+    OWLV2_BATCH_SIZE: int = 4
+    OWLV2_QUERY_CACHE_SIZE: int = 32
+    DETECT_BATCH_MAX_FILES: int = 256
+    # Enforced while the body streams in (see app.core.uploads)
+    MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024
+    DETECT_BATCH_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # "default": from_pretrained per worker. "mmap": weights memory-mapped from
+    # MMAP_WEIGHTS_DIR and shared through the page cache (see app.core.weights)
+    MODEL_WEIGHTS_MODE: str = "default"
+    MMAP_WEIGHTS_DIR: str = ".weights_cache"
+
+    # Comma-separated models to load at startup ("siglip,owlv2,reranker");
+    # the rest load lazily on first request. /ready waits for these.
+    PRELOAD_MODELS: str = ""
+    WARMUP_ENABLED: bool = True
+
+    # On-demand model_registry versions (A/B routing) share this budget with
+    # the default models, by registry memory_gb; 0 = unlimited.
+    # MODEL_AB_ROUTES="siglip=v1:90,v2:10;reranker=v1:50,v2:50"
+    MODEL_MEMORY_BUDGET_GB: float = 0.0
+    MODEL_AB_ROUTES: str = ""
+
+    # Cross-encoder reranking (opt-in per request)
+    RERANK_MODEL_ID: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 50
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_MAX_LENGTH: int = 128
+    RERANK_CACHE_SIZE: int = 4096
+    # Past this budget the stage-1 (vector) ordering is returned instead
+    RERANK_BUDGET_MS: float = 150.0
+
+    # Image search: uploads are decoded straight to model resolution
+    IMAGE_DECODE_MAX_SIDE: int = 960
+    IMAGE_SEARCH_MAX_CROPS: int = 5
+    IMAGE_SEARCH_MIN_CROP_PX: int = 32
+
+    # Inference backends ("torch", "torch-int8", "onnx", "onnx-int8").
+    # Unset -> use the backend from model_registry.MODEL_REGISTRY
+    SIGLIP_BACKEND: Optional[str] = None
+    OWLV2_BACKEND: Optional[str] = None
+    ONNX_CACHE_DIR: str = ".onnx_cache"
+
+    # Dynamic micro-batching for SigLIP embeddings
+    SIGLIP_BATCHING_ENABLED: bool = True
+    SIGLIP_BATCH_MAX_SIZE: int = 16
+    SIGLIP_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Inference executor / admission control
+    INFERENCE_WORKERS: int = 4
+    INFERENCE_MAX_QUEUE: int = 32
+    INFERENCE_RETRY_AFTER_S: int = 1
+    # Per-request stage timings in a Server-Timing response header
+    SERVER_TIMING_ENABLED: bool = True
+    # "local": models run in every API worker. "remote": API workers forward
+    # model calls to the inference server (python -m app.inference_server)
+    INFERENCE_MODE: str = "local"
+    # Comma-separated to spread calls over several inference servers (round-robin)
+    INFERENCE_SOCKET: str = "/tmp/lumina-inference.sock"
+    INFERENCE_CLIENT_CONNECTIONS: int = 16
+    INFERENCE_TIMEOUT_S: float = 30.0
+
+    # Persistent on-disk embedding store (disabled when unset)
+    EMBEDDING_STORE_DIR: Optional[str] = None
+    EMBEDDING_STORE_CAPACITY: int = 100_000
+    EMBEDDING_STORE_DTYPE: str = "float16"
+
+    # Bulk ingestion
+    INGEST_EMBED_BATCH_SIZE: int = 32
+    INGEST_UPSERT_BATCH_SIZE: int = 256
+    INGEST_DECODE_WORKERS: int = 8
+    INGEST_MAX_IN_FLIGHT: int = 4
 
     # Database
+    # "qdrant" (server at QDRANT_URL) or "local": in-process NumPy index under
+    # LOCAL_INDEX_PATH for small catalogs, tests and offline use (app.services.local_index)
+    VECTOR_BACKEND: str = "qdrant"
+    LOCAL_INDEX_PATH: str = ".vector_index"
+    # Local collections at least this large use the IVF index (0 = always exact);
+    # smaller ones are scanned exactly from a float32 copy (BENCHMARKS.md)
+    LOCAL_INDEX_ANN_MIN_POINTS: int = 10_000
+    LOCAL_INDEX_IVF_NPROBE: int = 16
+    # Keep the float32 copy for every local collection, in each process (2x the
+    # float16 file in RAM); off = collections past the ANN threshold widen rows per chunk
+    LOCAL_INDEX_FLOAT32_CACHE: bool = False
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_COLLECTION: str = "lumina_products_v1"
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT_S: int = 10
+    # HNSW tuned for filtered search: payload_m adds per-payload-value links so
+    # the graph stays connected inside selective filters, and filters matching
+    # fewer than FULL_SCAN_THRESHOLD KB of vectors skip HNSW for an indexed scan
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 128
+    QDRANT_HNSW_PAYLOAD_M: int = 16
+    QDRANT_FULL_SCAN_THRESHOLD_KB: int = 10_000
     
     # Infrastructure
     REDIS_URL: str = "redis://localhost:6379"
 
+    # Redis value encoding: "auto" (msgpack > orjson > json, whichever is
+    # installed), "msgpack", "orjson" or "json"; optional zstd for large values
+    CACHE_CODEC: str = "auto"
+    CACHE_COMPRESSION: str = "none"
+    CACHE_COMPRESSION_LEVEL: int = 3
+    CACHE_COMPRESSION_MIN_BYTES: int = 512
+
+    # Search caching: per-worker LRU tier in front of Redis. The local TTL is
+    # kept short so other workers' invalidations are picked up quickly.
+    # Per-endpoint result TTLs. Past the soft TTL a cached result is still
+    # served, and refreshed in the background; past the hard TTL it is gone.
+    SEARCH_TEXT_TTL_S: int = 3600
+    SEARCH_TEXT_SOFT_TTL_S: int = 600
+    SEARCH_HYBRID_TTL_S: int = 1800
+    SEARCH_HYBRID_SOFT_TTL_S: int = 300
+    # Every TTL written to Redis is randomized by +/- this fraction
+    CACHE_TTL_JITTER: float = 0.1
+    SEARCH_CACHE_LOCAL_SIZE: int = 1024
+    SEARCH_CACHE_LOCAL_TTL_S: float = 60.0
+    # Text embeddings are keyed by normalized query + model, independent of
+    # top_k / filters, so only the query text decides whether SigLIP runs
+    EMBEDDING_CACHE_TTL_S: int = 86_400
+    EMBEDDING_CACHE_LOCAL_SIZE: int = 4096
+    # "inline": Redis holds full result rows. "ids": Redis holds only point ids
+    # and scores; payloads come from the per-worker payload store (and Qdrant
+    # on a store miss)
+    SEARCH_CACHE_PAYLOADS: str = "inline"
+    PAYLOAD_STORE_SIZE: int = 50_000
+    PAYLOAD_STORE_TTL_S: float = 300.0
+    # Cross-worker single-flight: one worker computes a missing result under a
+    # short Redis lock, the others poll the cache until it appears (or give
+    # up after WAIT_MS and compute it themselves)
+    SINGLEFLIGHT_LOCK_TTL_MS: int = 5000
+    SINGLEFLIGHT_WAIT_MS: int = 3000
+    SINGLEFLIGHT_POLL_MS: int = 25
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,92 @@
+"""
+Detection Post-processing
+Array-level clean-up of raw detector output before anything is serialized:
+
+  select()    class-aware NMS + per-label top-k, returning surviving indices
+  to_dicts()  bulk conversion of the survivors to the API's detection dicts
+  compact()   the same result with parallel arrays and boxes as one flat list
+
+Boxes are [xmin, ymin, xmax, ymax] rows of an (N, 4) array; scores and
+labels are (N,) arrays. NMS only suppresses boxes of the same label, so a
+"bag" overlapping a "dress" survives while duplicate "dress" boxes do not.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+def _iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """IoU of one box against each row of `boxes`"""
+    inter_w = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    inter_h = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    inter = inter_w * inter_h
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    union = area + areas - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def select(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    labels: np.ndarray,
+    iou_threshold: float = 0.5,
+    top_k: int = 0,
+) -> np.ndarray:
+    """
+    Indices of the detections to keep, highest score first.
+    `iou_threshold` >= 1 disables NMS; `top_k` <= 0 keeps every label's survivors.
+    """
+    order = np.argsort(-scores, kind="stable")
+    if order.size == 0:
+        return order
+
+    if iou_threshold < 1:
+        # Shift each label into its own coordinate range so one greedy pass
+        # never compares boxes of different labels
+        boxes = boxes.astype(np.float64)
+        offsets = labels.astype(np.float64) * (boxes.max() - boxes.min() + 1)
+        shifted = boxes + offsets[:, None]
+        keep = []
+        while order.size:
+            best, rest = order[0], order[1:]
+            keep.append(best)
+            order = rest[_iou(shifted[best], shifted[rest]) <= iou_threshold]
+        order = np.array(keep, dtype=np.int64)
+
+    if top_k > 0:
+        # Rank within label, preserving the score order inside each label
+        kept_labels = labels[order]
+        by_label = np.argsort(kept_labels, kind="stable")
+        sorted_labels = kept_labels[by_label]
+        rank = np.empty(order.size, dtype=np.int64)
+        rank[by_label] = np.arange(order.size) - np.searchsorted(sorted_labels, sorted_labels)
+        order = order[rank < top_k]
+    return order
+
+
+def to_dicts(boxes: np.ndarray, scores: np.ndarray, labels: np.ndarray, texts: List[str]) -> List[dict]:
+    """One list conversion per array instead of per-element .item()/round calls"""
+    names = [texts[label] for label in labels.tolist()]
+    # float64 first, so 0.9 serializes as 0.9 rather than float32's 0.8999999761581421
+    scores = np.round(scores.astype(np.float64), 2).tolist()
+    boxes = np.round(boxes.astype(np.float64), 2).tolist()
+    return [
+        {"label": name, "confidence": score, "box": box}  # box: [xmin, ymin, xmax, ymax]
+        for name, score, box in zip(names, scores, boxes)
+    ]
+
+
+def compact(result: dict) -> dict:
+    """
+    {"labels": [...], "confidences": [...], "boxes": [x0, y0, x1, y1, x0, ...], "count": n}
+    Roughly half the JSON of the per-detection dict form.
+    """
+    detections = result["detections"]
+    return {
+        "labels": [d["label"] for d in detections],
+        "confidences": [d["confidence"] for d in detections],
+        "boxes": [coordinate for d in detections for coordinate in d["box"]],
+        "count": len(detections),
+    }
@@ -0,0 +1,123 @@
+"""
+Bounded Inference Executor
+Runs blocking model inference on a dedicated thread pool so the event loop
+keeps serving other requests (including cache hits) while a forward pass
+is in progress.
+
+Admission control: at most INFERENCE_WORKERS + INFERENCE_MAX_QUEUE calls may
+be in flight. Anything beyond that is rejected immediately with
+InferenceOverloaded instead of queueing without bound.
+
+Functions with a registered submitter (the SigLIP text micro-batcher) are
+handed to it straight from the event loop and awaited, so a request waiting
+for its batch holds an admission slot but no pool thread, and batches can
+fill up to their own maximum size rather than INFERENCE_WORKERS.
+
+With INFERENCE_MODE="remote" the model calls are forwarded to the inference
+server process instead (see app.services.inference_client); admission
+control still applies per API worker.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+_rejected = metrics.counter(
+    "inference_rejected_total", "Inference calls rejected by admission control"
+)
+_in_flight = metrics.gauge(
+    "inference_in_flight", "Inference calls currently running or queued"
+)
+
+
+class InferenceOverloaded(Exception):
+    """Raised when the inference queue is full"""
+
+
+class InferenceExecutor:
+    _pool: Optional[ThreadPoolExecutor] = None
+    _pending = 0
+    _lock = threading.Lock()
+    # Blocking function -> coroutine function that runs it out of process
+    _remote: Dict[Callable, Callable] = {}
+    # Blocking function -> non-blocking submit(*args) returning a concurrent
+    # Future, or None to fall back to the pool for that call
+    _submitters: Dict[Callable, Callable] = {}
+
+    @classmethod
+    def use_remote(cls, functions: Dict[Callable, Callable]):
+        cls._remote = dict(functions)
+
+    @classmethod
+    def register_submitter(cls, fn: Callable, submit: Callable):
+        cls._submitters[fn] = submit
+
+    @classmethod
+    def get_pool(cls) -> ThreadPoolExecutor:
+        if cls._pool is None:
+            with cls._lock:
+                if cls._pool is None:
+                    cls._pool = ThreadPoolExecutor(
+                        max_workers=settings.INFERENCE_WORKERS,
+                        thread_name_prefix="inference",
+                    )
+        return cls._pool
+
+    @classmethod
+    def capacity(cls) -> int:
+        return settings.INFERENCE_WORKERS + settings.INFERENCE_MAX_QUEUE
+
+    @classmethod
+    def _acquire(cls, name: str):
+        with cls._lock:
+            if cls._pending >= cls.capacity():
+                _rejected.inc(call=name)
+                raise InferenceOverloaded(
+                    f"Inference queue is full ({cls._pending} calls in flight)"
+                )
+            cls._pending += 1
+            _in_flight.set(cls._pending)
+
+    @classmethod
+    def _release(cls):
+        with cls._lock:
+            cls._pending -= 1
+            _in_flight.set(cls._pending)
+
+    @classmethod
+    async def run(cls, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` on the inference pool, or reject if saturated"""
+        cls._acquire(getattr(fn, "__name__", "call"))
+        remote = cls._remote.get(fn)
+        if remote is not None:
+            try:
+                return await remote(*args, **kwargs)
+            finally:
+                cls._release()
+        submit = cls._submitters.get(fn)
+        try:
+            future = submit(*args, **kwargs) if submit is not None else None
+            if future is None:
+                # Carry the request's context (trace spans) onto the pool thread
+                future = cls.get_pool().submit(
+                    contextvars.copy_context().run, functools.partial(fn, *args, **kwargs)
+                )
+        except BaseException:
+            cls._release()
+            raise
+        # Release the slot when the work finishes, even if the caller disconnects
+        future.add_done_callback(lambda _: cls._release())
+        return await asyncio.wrap_future(future)
+
+    @classmethod
+    def shutdown(cls):
+        with cls._lock:
+            if cls._pool is not None:
+                cls._pool.shutdown(wait=False, cancel_futures=True)
+                cls._pool = None
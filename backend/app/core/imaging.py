@@ -0,0 +1,51 @@
+"""
+Shared Image Decoding
+Decode an upload once, at (roughly) the resolution the models need.
+JPEG uploads use `Image.draft` so libjpeg decodes straight to a 1/2, 1/4 or
+1/8 scale instead of materializing a full 12MP bitmap; everything is then
+thumbnailed down to `max_side`. The original size is kept so coordinates can
+be mapped back onto the uploaded image.
+"""
+
+import io
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+from PIL import Image
+
+
+@dataclass
+class DecodedImage:
+    image: "Image.Image"
+    # (width, height) of the uploaded image before any downscaling
+    original_size: Tuple[int, int]
+
+    @property
+    def scale(self) -> Tuple[float, float]:
+        """Factors mapping decoded-image coordinates back to original ones"""
+        width, height = self.image.size
+        return self.original_size[0] / width, self.original_size[1] / height
+
+    def to_original(self, box: Sequence[float]) -> list:
+        sx, sy = self.scale
+        return [round(box[0] * sx, 2), round(box[1] * sy, 2),
+                round(box[2] * sx, 2), round(box[3] * sy, 2)]
+
+
+def decode_image(image_bytes: bytes, max_side: Optional[int] = None) -> DecodedImage:
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        original_size = image.size
+        if max_side and max(original_size) > max_side:
+            # JPEG only: decode at the smallest DCT scale (1/2, 1/4, 1/8) that
+            # still covers the target size; a no-op for other formats
+            ratio = max_side / max(original_size)
+            image.draft("RGB", (math.ceil(original_size[0] * ratio),
+                                math.ceil(original_size[1] * ratio)))
+        image = image.convert("RGB")
+        if max_side and max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.BICUBIC)
+    except Exception as e:
+        raise ValueError(f"Invalid image format: {e}")
+    return DecodedImage(image=image, original_size=original_size)
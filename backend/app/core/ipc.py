@@ -0,0 +1,67 @@
+"""
+Inference IPC Framing
+Message format between API workers and the inference server (Unix socket):
+
+    u32 header length | header (codec-encoded dict) | u32 buffer count |
+    per buffer: u64 length | raw bytes
+
+Bulk data - image bytes, float32 embeddings - travels as raw buffers beside a
+small header rather than inside it, so nothing is base64-encoded or parsed
+element by element: uploads are written straight from the request's bytes
+object and embeddings are read back as a memoryview cast to float32.
+"""
+
+import asyncio
+import struct
+from array import array
+from typing import Any, List, Sequence, Tuple
+
+from app.core.codecs import get_codec
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+
+async def write_message(writer: asyncio.StreamWriter, header: dict, buffers: Sequence[bytes] = ()):
+    encoded = get_codec().encode(header)
+    chunks = [_U32.pack(len(encoded)), encoded, _U32.pack(len(buffers))]
+    for buffer in buffers:
+        chunks.append(_U64.pack(len(buffer)))
+        chunks.append(buffer)
+    writer.writelines(chunks)
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[dict, List[bytes]]:
+    (header_size,) = _U32.unpack(await reader.readexactly(_U32.size))
+    header = get_codec().decode(await reader.readexactly(header_size))
+    (count,) = _U32.unpack(await reader.readexactly(_U32.size))
+    buffers = []
+    for _ in range(count):
+        (size,) = _U64.unpack(await reader.readexactly(_U64.size))
+        buffers.append(await reader.readexactly(size))
+    return header, buffers
+
+
+def pack_vectors(vectors: Sequence[Sequence[float]]) -> bytes:
+    """[n, dim] floats -> one contiguous float32 buffer"""
+    packed = array("f")
+    for vector in vectors:
+        packed.extend(vector)
+    return packed.tobytes()
+
+
+def unpack_vectors(buffer: bytes, count: int) -> List[List[float]]:
+    if count == 0:
+        return []
+    flat = memoryview(buffer).cast("f")
+    dim = len(flat) // count
+    return [flat[i * dim:(i + 1) * dim].tolist() for i in range(count)]
+
+
+def error_header(error: BaseException) -> dict:
+    return {"ok": False, "error": type(error).__name__, "detail": str(error)}
+
+
+def ok_header(result: Any = None, **extra) -> dict:
+    return {"ok": True, "result": result, **extra}
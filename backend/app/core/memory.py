@@ -0,0 +1,63 @@
+"""
+Process Memory
+Actual resident memory of a process, from /proc/<pid>/smaps_rollup (Linux):
+
+  rss            resident pages, shared ones counted in full
+  pss            proportional set size: shared pages split across the
+                 processes mapping them - sum PSS over workers for the node cost
+  shared_clean   resident pages shared with other processes (mapped weights,
+                 copy-on-write pages inherited from a preloading master)
+  private_dirty  memory only this process uses
+
+RSS over-counts shared weights once per worker; PSS does not, which is what
+makes preload-then-fork / mmap weights visible.
+"""
+
+import os
+import resource
+import sys
+from typing import Dict, Optional
+
+_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """Memory breakdown in bytes for `pid` (default: this process)"""
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+    except OSError:
+        # No smaps_rollup (macOS, old kernels): peak RSS is all we can get
+        if pid not in (None, os.getpid()):
+            return {}
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return {"rss": maxrss if sys.platform == "darwin" else maxrss * 1024}
+
+    memory = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in _FIELDS:
+            memory[_FIELDS[parts[0].rstrip(":")]] = int(parts[1]) * 1024
+    return memory
+
+
+def child_pids(pid: int) -> list:
+    """Direct children of a process (e.g. the workers of a gunicorn master)"""
+    children = set()
+    task_dir = f"/proc/{pid}/task"
+    for tid in os.listdir(task_dir):
+        try:
+            with open(f"{task_dir}/{tid}/children") as f:
+                children.update(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return sorted(children)
@@ -0,0 +1,225 @@
+"""
+In-process Metrics
+Lightweight, thread-safe counters and histograms shared by the services.
+Metrics are keyed by name plus an optional set of labels, e.g.
+    metrics.counter("siglip_batches_total").inc(kind="text")
+    metrics.histogram("siglip_batch_size").observe(8, kind="text")
+
+`timed(stage)` spans also land in the current request's trace (see
+app.core.tracing), which becomes its Server-Timing header. `render()` is the
+Prometheus text exposition served at /metrics; registries are per process.
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+DEFAULT_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def bucket_quantile(buckets: tuple, counts: list, q: float) -> Optional[float]:
+    """
+    Estimate the q-quantile (0-1) from histogram bucket counts, interpolating
+    linearly inside the bucket it falls in (like Prometheus histogram_quantile).
+    Values past the last bucket are reported as the last bound.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if i == len(buckets):
+                return buckets[-1]
+            lower = buckets[i - 1] if i > 0 else 0.0
+            return lower + (buckets[i] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+
+class Counter:
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram:
+    def __init__(self, name: str, description: str = "", buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        # Index of the first bucket whose upper bound is >= value
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return series["count"] if series else 0
+
+    def total(self, **labels) -> float:
+        series = self._series.get(_label_key(labels))
+        return series["sum"] if series else 0.0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        series = self._series.get(_label_key(labels))
+        return bucket_quantile(self.buckets, series["counts"], q) if series else None
+
+    def samples(self) -> Dict[LabelKey, dict]:
+        with self._lock:
+            return {
+                key: {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]}
+                for key, s in self._series.items()
+            }
+
+
+def _render_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in key
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {type(metric).__name__}")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description=description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description=description)
+
+    def histogram(
+        self, name: str, description: str = "", buckets: Optional[tuple] = None
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, description=description,
+            buckets=buckets or DEFAULT_LATENCY_BUCKETS,
+        )
+
+    def all(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self._metrics)
+
+    def on_collect(self, fn: Callable[[], None]):
+        """Run `fn` before every render, e.g. to refresh derived gauges"""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        for collect in list(self._collectors):
+            collect()
+        lines = []
+        for name, metric in sorted(self.all().items()):
+            kind = {Histogram: "histogram", Gauge: "gauge"}.get(type(metric), "counter")
+            if metric.description:
+                lines.append(f"# HELP {name} {metric.description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, sample in sorted(metric.samples().items()):
+                if kind != "histogram":
+                    lines.append(f"{name}{_render_labels(key)} {sample}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), sample["counts"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{_render_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_render_labels(key)} {sample['sum']}")
+                lines.append(f"{name}_count{_render_labels(key)} {sample['count']}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+registry = MetricsRegistry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+on_collect = registry.on_collect
+render = registry.render
+
+
+_stage_seconds = histogram(
+    "stage_duration_seconds", "Latency of individual request pipeline stages"
+)
+
+# (stage, seconds) spans of the request being handled; None outside requests
+current_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the duration of a pipeline stage, e.g. `with metrics.timed("qdrant_search"):`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _stage_seconds.observe(seconds, stage=stage)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.append((stage, seconds))
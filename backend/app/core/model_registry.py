@@ -9,7 +9,7 @@ Upgrade Path:
 """
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional
 
 @dataclass
 class ModelConfig:
@@ -17,6 +17,8 @@ class ModelConfig:
     embedding_dim: int
     description: str
     memory_gb: float
+    # Inference backend: "torch", "torch-int8", "onnx" or "onnx-int8"
+    backend: str = "torch"
 
 # Model Registry - swap versions without code changes
 MODEL_REGISTRY: Dict[str, Dict[str, ModelConfig]] = {
@@ -82,3 +84,17 @@ def get_total_memory(versions: Dict[str, str] = None) -> float:
         config = get_model_config(model_type, version)
         total += config.memory_gb
     return total
+
+def find_model_config(model_type: str, model_id: str) -> Optional[ModelConfig]:
+    """Look up the registry entry for a HF model id, if it is registered"""
+    for config in MODEL_REGISTRY.get(model_type, {}).values():
+        if config.model_id == model_id:
+            return config
+    return None
+
+def resolve_backend(model_type: str, model_id: str, override: Optional[str] = None) -> str:
+    """Settings override wins, then the registry entry, then PyTorch fp32"""
+    if override:
+        return override
+    config = find_model_config(model_type, model_id)
+    return config.backend if config else "torch"
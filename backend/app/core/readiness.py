@@ -0,0 +1,75 @@
+"""
+Model Readiness
+Per-model load state shared by the services and the /ready probe:
+    not_loaded -> loading -> loaded -> warming -> ready   (or failed)
+with the time spent loading and warming up, e.g.
+    with readiness.loading("siglip"):
+        ...from_pretrained(...)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from app.core import metrics
+
+_load_seconds = metrics.gauge("model_load_seconds", "Time spent loading each model")
+
+
+@dataclass
+class ModelState:
+    status: str = "not_loaded"
+    load_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+_states: Dict[str, ModelState] = {}
+_lock = threading.Lock()
+
+
+def state(name: str) -> ModelState:
+    with _lock:
+        return _states.setdefault(name, ModelState())
+
+
+def _track(name: str, active: str, done: str, field: str):
+    model = state(name)
+    model.status, model.error = active, None
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        model.status, model.error = "failed", f"{type(e).__name__}: {e}"
+        raise
+    seconds = round(time.perf_counter() - started, 3)
+    setattr(model, field, seconds)
+    model.status = done
+    if field == "load_seconds":
+        _load_seconds.set(seconds, model=name)
+
+
+@contextmanager
+def loading(name: str):
+    yield from _track(name, "loading", "loaded", "load_seconds")
+
+
+@contextmanager
+def warming(name: str):
+    yield from _track(name, "warming", "ready", "warmup_seconds")
+
+
+def is_loaded(name: str) -> bool:
+    return state(name).status in ("loaded", "warming", "ready")
+
+
+def snapshot() -> Dict[str, dict]:
+    with _lock:
+        return {name: asdict(model) for name, model in _states.items()}
+
+
+def reset():
+    with _lock:
+        _states.clear()
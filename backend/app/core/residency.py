@@ -0,0 +1,260 @@
+"""
+Model Residency
+Loads MODEL_REGISTRY versions on demand next to the default models and keeps
+their combined registry footprint (`memory_gb`) under MODEL_MEMORY_BUDGET_GB:
+
+    with ModelResidency.acquire("siglip", "v2") as (processor, backend):
+        ...
+
+Loading a version that doesn't fit evicts the least-recently-used *idle*
+version first; versions in use are never evicted, and if nothing idle is
+left the call fails with ModelMemoryExhausted (a 503, like a full inference
+queue). The default models (settings.*_MODEL_ID) are pinned: they count
+against the budget but stay resident.
+
+A/B routing: MODEL_AB_ROUTES="siglip=v1:90,v2:10;reranker=v1:50,v2:50"
+sends a stable share of routing keys (e.g. normalized queries) to each
+version, so the same query always hits the same variant.
+"""
+
+import gc
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.executor import InferenceOverloaded
+from app.core.model_registry import MODEL_REGISTRY, ModelConfig, find_model_config, get_model_config
+
+_uses = metrics.counter("model_uses_total", "Inference calls per model version")
+_loads = metrics.counter("model_loads_total", "On-demand model version loads")
+_evictions = metrics.counter("model_evictions_total", "Model versions evicted to stay under budget")
+_load_duration = metrics.histogram("model_version_load_seconds", "On-demand model version load time")
+_resident_gb = metrics.gauge("model_resident_gb", "Registry memory of resident models")
+
+Key = Tuple[str, str]
+
+
+class ModelMemoryExhausted(InferenceOverloaded):
+    """Every resident model is in use and the requested one doesn't fit the budget"""
+
+
+@dataclass
+class ResidentModel:
+    model_type: str
+    version: str
+    model_id: str
+    memory_gb: float
+    handle: Any = field(default=None, repr=False)
+    pinned: bool = False
+    in_use: int = 0
+    uses: int = 0
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class ModelResidency:
+    # model_type -> builds a handle from a registry entry
+    _loaders: Dict[str, Callable[[ModelConfig], Any]] = {}
+    # Least recently used first
+    _resident: "OrderedDict[Key, ResidentModel]" = OrderedDict()
+    # Memory promised to loads in progress
+    _reserved_gb = 0.0
+    _lock = threading.Lock()
+    _key_locks: Dict[Key, threading.Lock] = {}
+
+    @classmethod
+    def register_loader(cls, model_type: str, loader: Callable[[ModelConfig], Any]):
+        cls._loaders[model_type] = loader
+
+    @classmethod
+    def pin(cls, model_type: str, model_id: str, handle: Any = None):
+        """
+        Account for an always-resident default model. If `model_id` is a
+        registry version, acquiring that version reuses `handle`.
+        """
+        config = find_model_config(model_type, model_id)
+        version = next(
+            (v for v, c in MODEL_REGISTRY.get(model_type, {}).items() if c is config), "default"
+        )
+        with cls._lock:
+            cls._resident[(model_type, version)] = ResidentModel(
+                model_type, version, model_id,
+                memory_gb=config.memory_gb if config else 0.0, handle=handle, pinned=True,
+            )
+            cls._update_gauge()
+
+    @classmethod
+    def budget_gb(cls) -> float:
+        return settings.MODEL_MEMORY_BUDGET_GB
+
+    @classmethod
+    def resident_gb(cls) -> float:
+        return sum(model.memory_gb for model in cls._resident.values())
+
+    @classmethod
+    def _update_gauge(cls):
+        _resident_gb.set(cls.resident_gb())
+
+    @classmethod
+    def _checkout(cls, key: Key) -> Optional[ResidentModel]:
+        """Mark a resident model in use (caller holds _lock)"""
+        model = cls._resident.get(key)
+        if model is not None:
+            model.in_use += 1
+            model.uses += 1
+            model.last_used = time.monotonic()
+            cls._resident.move_to_end(key)
+            _uses.inc(model=key[0], version=key[1])
+        return model
+
+    @classmethod
+    def _make_room(cls, needed_gb: float) -> List[ResidentModel]:
+        """Evict idle models, least recently used first, until `needed_gb` fits (caller holds _lock)"""
+        budget = cls.budget_gb()
+        excess = cls.resident_gb() + cls._reserved_gb + needed_gb - budget
+        if budget <= 0 or excess <= 0:
+            return []
+        victims, freed = [], 0.0
+        for key, model in cls._resident.items():
+            if freed >= excess:
+                break
+            if not model.pinned and not model.in_use:
+                victims.append(key)
+                freed += model.memory_gb
+        if freed < excess:
+            raise ModelMemoryExhausted(
+                f"Model memory budget exhausted: {needed_gb}GB needed, "
+                f"{cls.resident_gb() + cls._reserved_gb:.1f}/{budget}GB resident or loading"
+            )
+        for key in victims:
+            _evictions.inc(model=key[0], version=key[1])
+        return [cls._resident.pop(key) for key in victims]
+
+    @classmethod
+    def _load(cls, key: Key) -> ResidentModel:
+        model_type, version = key
+        config = get_model_config(model_type, version)
+        loader = cls._loaders.get(model_type)
+        if loader is None:
+            raise ValueError(f"No loader registered for model type '{model_type}'")
+
+        with cls._lock:
+            evicted = cls._make_room(config.memory_gb)
+            cls._reserved_gb += config.memory_gb
+        for model in evicted:
+            print(f"Evicted {model.model_type} {model.version} ({model.model_id}) after {model.uses} uses")
+        del evicted
+        gc.collect()
+
+        try:
+            print(f"Loading {model_type} {version} ({config.model_id}) on demand...")
+            started = time.perf_counter()
+            handle = loader(config)
+            _load_duration.observe(time.perf_counter() - started, model=model_type, version=version)
+            _loads.inc(model=model_type, version=version)
+        finally:
+            with cls._lock:
+                cls._reserved_gb -= config.memory_gb
+
+        with cls._lock:
+            model = ResidentModel(model_type, version, config.model_id, config.memory_gb, handle)
+            cls._resident[key] = model
+            cls._update_gauge()
+            return cls._checkout(key)
+
+    @classmethod
+    @contextmanager
+    def acquire(cls, model_type: str, version: str):
+        """Hold a loaded model version for the duration of the block; it can't be evicted meanwhile"""
+        key = (model_type, version)
+        with cls._lock:
+            model = cls._checkout(key)
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+        if model is None:
+            # One load per version; concurrent callers wait for it
+            with key_lock:
+                with cls._lock:
+                    model = cls._checkout(key)
+                if model is None:
+                    model = cls._load(key)
+        try:
+            yield model.handle
+        finally:
+            with cls._lock:
+                model.in_use -= 1
+
+    @classmethod
+    def evict(cls, model_type: str, version: str) -> bool:
+        """Drop an idle, unpinned version now"""
+        key = (model_type, version)
+        with cls._lock:
+            model = cls._resident.get(key)
+            if model is None or model.pinned or model.in_use:
+                return False
+            del cls._resident[key]
+            _evictions.inc(model=model_type, version=version)
+            cls._update_gauge()
+        gc.collect()
+        return True
+
+    @staticmethod
+    def routes() -> Dict[str, List[Tuple[str, int]]]:
+        """Parse MODEL_AB_ROUTES into {model_type: [(version, weight), ...]}"""
+        routes = {}
+        for entry in filter(None, (part.strip() for part in settings.MODEL_AB_ROUTES.split(";"))):
+            model_type, _, split = entry.partition("=")
+            weights = []
+            for item in split.split(","):
+                version, _, weight = item.strip().partition(":")
+                get_model_config(model_type.strip(), version)  # unknown versions fail loudly
+                weights.append((version, int(weight or 1)))
+            routes[model_type.strip()] = weights
+        return routes
+
+    @classmethod
+    def route(cls, model_type: str, routing_key: str) -> Optional[str]:
+        """Version serving `routing_key`, or None for the default model"""
+        weights = cls.routes().get(model_type)
+        if not weights:
+            return None
+        total = sum(weight for _, weight in weights)
+        bucket = int.from_bytes(hashlib.md5(routing_key.encode()).digest()[:8], "big") % total
+        for version, weight in weights:
+            if bucket < weight:
+                return version
+            bucket -= weight
+        return weights[-1][0]
+
+    @classmethod
+    def route_all(cls, routing_key: str) -> Dict[str, str]:
+        """Routed version per model type that has A/B routes configured"""
+        return {model_type: cls.route(model_type, routing_key) for model_type in cls.routes()}
+
+    @classmethod
+    def info(cls) -> dict:
+        with cls._lock:
+            return {
+                "budget_gb": cls.budget_gb(),
+                "resident_gb": round(cls.resident_gb(), 2),
+                "models": [
+                    {
+                        "model": m.model_type, "version": m.version, "model_id": m.model_id,
+                        "memory_gb": m.memory_gb, "pinned": m.pinned, "in_use": m.in_use, "uses": m.uses,
+                    }
+                    for m in cls._resident.values()
+                ],
+            }
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._resident.clear()
+            cls._key_locks.clear()
+            cls._reserved_gb = 0.0
+            cls._update_gauge()
@@ -0,0 +1,59 @@
+"""
+Single-Flight Request Coalescing
+Concurrent calls for the same key inside one worker share a single
+computation: the first caller (the leader) runs it, everyone else awaits the
+leader's result. Used so a burst of identical searches costs one embedding
+and one Qdrant query instead of N.
+
+Cross-worker coalescing (a short Redis lock) lives in SearchCache, on top of
+this.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core import metrics
+
+_coalesced = metrics.counter(
+    "singleflight_coalesced_total", "Calls that reused another caller's in-flight result"
+)
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            call = self._calls.get(key)
+            if call is None:
+                break
+            _coalesced.inc(flight=self.name)
+            try:
+                # shield: a waiter going away must not cancel the leader's work
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if not call.cancelled():
+                    raise
+                # The leader was cancelled (e.g. client disconnected); take over
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as e:
+            call.set_exception(e)
+            call.exception()  # mark retrieved: there may be no waiters
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
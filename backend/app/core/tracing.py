@@ -0,0 +1,86 @@
+"""
+Request Tracing
+Per-request timing spans for the Server-Timing header and the
+http_request_duration_seconds histogram.
+
+ServerTimingMiddleware opens a trace (app.core.metrics.current_trace) for each
+HTTP request; every `metrics.timed(stage)` span run on its behalf - in the
+handler, in tasks it starts, or on the inference executor - is appended to it.
+When the response starts, the spans are summed per stage and sent as
+
+    Server-Timing: cache_lookup;dur=0.41, text_embedding;dur=12.7, ..., app;dur=15.2
+
+Work done inside a shared micro-batch belongs to no single request; it only
+shows up in /metrics. Cost per span is a perf_counter pair and a list append,
+cheap enough to leave on (SERVER_TIMING_ENABLED).
+"""
+
+import time
+from typing import Dict, List, Tuple
+
+from fastapi.responses import JSONResponse
+
+from app.core import metrics
+from app.core.config import settings
+
+_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response starts"
+)
+
+
+def server_timing(trace: List[Tuple[str, float]], total: float) -> str:
+    durations: Dict[str, float] = {}
+    for stage, seconds in trace:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    durations["app"] = total
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in durations.items())
+
+
+def _handler(scope) -> str:
+    """Low-cardinality route label: the path template, else the endpoint name"""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "unmatched")
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI (no BaseHTTPMiddleware): streaming responses pass through untouched"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace: List[Tuple[str, float]] = []
+        token = metrics.current_trace.set(trace)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                _request_seconds.observe(
+                    total, method=scope["method"], handler=_handler(scope), status=message["status"]
+                )
+                if settings.SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(trace, total).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.current_trace.reset(token)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose encoding shows up as the `response_encode` stage"""
+
+    def render(self, content) -> bytes:
+        with metrics.timed("response_encode"):
+            return super().render(content)
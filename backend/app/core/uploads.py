@@ -0,0 +1,90 @@
+"""
+Upload Size Limits
+Oversized uploads are rejected with 413 while the body streams in, before
+they are buffered:
+
+  UploadLimitMiddleware  rejects a request whose Content-Length exceeds its
+                         limit without reading the body, and otherwise counts
+                         body bytes as the multipart parser pulls them,
+                         aborting as soon as the limit is crossed
+  read_upload()          reads one UploadFile in chunks, up to a per-file limit
+
+Limits: MAX_UPLOAD_BYTES per image; whole requests get that plus multipart
+overhead, or DETECT_BATCH_MAX_BYTES on the batch detection endpoint.
+"""
+
+import json
+
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+
+CHUNK_BYTES = 256 * 1024
+# Boundaries, part headers and form fields around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(HTTPException):
+    """413; an HTTPException so FastAPI's body parsing re-raises it unchanged"""
+
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Upload exceeds the {limit // (1024 * 1024)}MB limit")
+
+
+def request_limit(path: str) -> int:
+    if path.rstrip("/").endswith("/detect/batch"):
+        return settings.DETECT_BATCH_MAX_BYTES
+    return settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+
+
+async def read_upload(upload: UploadFile, max_bytes: int = None) -> bytes:
+    """The upload's bytes, or UploadTooLarge once more than `max_bytes` were read"""
+    max_bytes = settings.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    chunks, size = [], 0
+    while True:
+        chunk = await upload.read(CHUNK_BYTES)
+        if not chunk:
+            return b"".join(chunks)
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        chunks.append(chunk)
+
+
+class UploadLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = request_limit(scope["path"])
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            # Answer without reading the body at all
+            error = UploadTooLarge(limit)
+            body = json.dumps({"detail": error.detail}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                            (b"connection", b"close")],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        # Chunked / lying Content-Length: count what actually arrives
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise UploadTooLarge(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,75 @@
+"""
+Shared Model Weights
+How HF models are materialized, so several worker processes on one node can
+share one physical copy of the weights instead of each holding ~1.5GB:
+
+  MODEL_WEIGHTS_MODE="default"  from_pretrained into private (anonymous) memory
+  MODEL_WEIGHTS_MODE="mmap"     weights are memory-mapped from a checkpoint in
+                                MMAP_WEIGHTS_DIR; clean file-backed pages live
+                                in the page cache once and are shared by every
+                                process that maps them (forked or not)
+
+The mmap checkpoint is written once per model id with torch.save (zip format,
+which torch.load can map) from the downloaded weights, then reused.
+
+Preload-then-fork (gunicorn.conf.py) gets the same effect for the default
+mode: models loaded in the master before forking are shared copy-on-write.
+Quantized backends (torch-int8, onnx*) build their own weights and are not
+shared either way.
+"""
+
+import fcntl
+import os
+
+import torch
+
+from app.core.config import settings
+
+
+def mmap_checkpoint_path(model_id: str) -> str:
+    return os.path.join(settings.MMAP_WEIGHTS_DIR, model_id.replace("/", "--") + ".pt")
+
+
+def _write_checkpoint(model_cls, model_id: str, path: str):
+    """Export the fp32 state dict once; concurrent workers wait on the file lock"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(path):
+                return
+            print(f"Writing mmap weights for {model_id} to {path}...")
+            model = model_cls.from_pretrained(model_id)
+            torch.save(model.state_dict(), f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            del model
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_mmap(model_cls, model_id: str):
+    from transformers.modeling_utils import no_init_weights
+
+    path = mmap_checkpoint_path(model_id)
+    if not os.path.exists(path):
+        _write_checkpoint(model_cls, model_id, path)
+
+    config = model_cls.config_class.from_pretrained(model_id)
+    # Skeleton with uninitialized (never touched, so never resident) parameters;
+    # buffers computed in __init__ (position ids, ...) stay as built
+    with no_init_weights():
+        model = model_cls(config)
+    state = torch.load(path, mmap=True, weights_only=True, map_location="cpu")
+    # assign=True: parameters *become* the mapped tensors instead of copies
+    model.load_state_dict(state, assign=True)
+    model.tie_weights()
+    return model
+
+
+def load_pretrained(model_cls, model_id: str):
+    """`model_cls.from_pretrained(model_id)`, honouring MODEL_WEIGHTS_MODE"""
+    if settings.MODEL_WEIGHTS_MODE == "mmap":
+        return _load_mmap(model_cls, model_id)
+    if settings.MODEL_WEIGHTS_MODE != "default":
+        raise ValueError(f"Unknown MODEL_WEIGHTS_MODE '{settings.MODEL_WEIGHTS_MODE}'")
+    return model_cls.from_pretrained(model_id)
@@ -0,0 +1,51 @@
+"""
+Inference server CLI: owns the models for API workers running with
+INFERENCE_MODE=remote
+
+    python -m app.inference_server
+    python -m app.inference_server --socket /run/lumina/inference.sock --models siglip,owlv2,reranker
+
+With several servers (INFERENCE_SOCKET=/tmp/a.sock,/tmp/b.sock), start one per
+path, each with its --socket.
+"""
+
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.services.inference_server import InferenceServer
+from app.services.model_preload import MODELS, ModelPreloader
+
+
+async def serve(socket_path: str):
+    server = InferenceServer(socket_path)
+    # Listen right away so clients can ping while models load
+    await server.start()
+    try:
+        await asyncio.to_thread(ModelPreloader.preload)
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve model inference to API workers over a Unix socket")
+    parser.add_argument("--socket", help="Unix socket path to listen on (default: INFERENCE_SOCKET, "
+                                         "required when it lists several)")
+    parser.add_argument("--models", help="Comma-separated models to preload (default: PRELOAD_MODELS, else all)")
+    args = parser.parse_args()
+    try:
+        socket_path = args.socket or InferenceServer.default_socket()
+    except ValueError as e:
+        parser.error(str(e))
+    if "," in socket_path:
+        parser.error("--socket takes a single path")
+
+    # The server is only useful with its models resident: preload everything by default
+    settings.PRELOAD_MODELS = args.models or settings.PRELOAD_MODELS or ",".join(MODELS)
+    ModelPreloader.requested()
+    asyncio.run(serve(socket_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Catalog ingestion CLI
+
+    python -m app.ingest products.jsonl --checkpoint products.ckpt
+    python -m app.ingest products.csv --image-root /data/images --upsert-batch-size 512
+    python -m app.ingest products.jsonl --siglip-version v2   # A/B collection for SigLIP v2
+"""
+
+import argparse
+import json
+
+from app.services.ingestion import IngestionPipeline
+from app.services.qdrant_service import QdrantService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed a product manifest and index it in Qdrant")
+    parser.add_argument("manifest", help="JSONL or CSV manifest with `sku`, `image` and payload fields")
+    parser.add_argument("--checkpoint", help="Checkpoint file used to resume an interrupted run")
+    parser.add_argument("--image-root", help="Directory that relative image paths are resolved against")
+    parser.add_argument("--embed-batch-size", type=int)
+    parser.add_argument("--upsert-batch-size", type=int)
+    parser.add_argument("--decode-workers", type=int)
+    parser.add_argument("--max-in-flight", type=int)
+    parser.add_argument("--limit", type=int, help="Stop after this many manifest rows")
+    parser.add_argument("--siglip-version", help="model_registry SigLIP version to embed with, "
+                                                 "into that version's collection (MODEL_AB_ROUTES)")
+    args = parser.parse_args()
+
+    QdrantService.init_collection()
+    QdrantService.ensure_collection(args.siglip_version)
+    pipeline = IngestionPipeline(
+        args.manifest,
+        checkpoint_path=args.checkpoint,
+        image_root=args.image_root,
+        embed_batch_size=args.embed_batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        decode_workers=args.decode_workers,
+        max_in_flight=args.max_in_flight,
+        siglip_version=args.siglip_version,
+    )
+    stats = pipeline.run(limit=args.limit)
+    print(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.api.api_router import api_router
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics, readiness
+from app.core.memory import process_memory
+from app.core.residency import ModelResidency
+from app.core.tracing import ServerTimingMiddleware, TimedJSONResponse
+from app.core.uploads import UploadLimitMiddleware
 from app.core.config import settings
+from app.core.executor import InferenceExecutor, InferenceOverloaded
+from app.services.inference_client import InferenceClient
+from app.services.model_preload import ModelPreloader
+from app.services.qdrant_service import QdrantService
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -9,8 +20,12 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url=None,
+    default_response_class=TimedJSONResponse,
 )
 
+# Reject oversized bodies before they are parsed or buffered. Added before
+# CORS so CORS wraps it: the cross-origin frontend can read the 413.
+app.add_middleware(UploadLimitMiddleware)
 # Configure CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -18,10 +33,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser devtools show the per-stage timings
+    expose_headers=["Server-Timing"],
 )
+# Outermost: times everything, including CORS
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.exception_handler(InferenceOverloaded)
+async def inference_overloaded_handler(request: Request, exc: InferenceOverloaded):
+    # Shed load fast instead of letting tail latency grow without bound
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER_S)},
+    )
+
+@app.on_event("startup")
+async def preload_models():
+    if settings.INFERENCE_MODE == "remote":
+        # Models live in the inference server process; this worker only forwards
+        InferenceExecutor.use_remote(InferenceClient.remote_functions())
+        return
+    # In the background: the server starts answering (/ready -> 503) right away
+    if ModelPreloader.requested():
+        app.state.preload_task = asyncio.create_task(asyncio.to_thread(ModelPreloader.preload))
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    InferenceExecutor.shutdown()
+    await InferenceClient.close()
+    await QdrantService.close()
+
 @app.get("/")
 def health_check():
     return {
@@ -29,3 +73,29 @@ def health_check():
         "status": "active",
         "version": "0.1.0"
     }
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus scrape endpoint (this worker's registry)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once every PRELOAD_MODELS model is loaded (and warmed up)"""
+    extra = {}
+    if settings.INFERENCE_MODE == "remote":
+        # Ready when every inference server is reachable and has its models
+        servers = await InferenceClient.ping_all()
+        ready = bool(servers) and all(server["ready"] for server in servers.values())
+        # Servers preload the same models; report the first one's
+        models = next(iter(servers.values()))["models"] if servers else {}
+        extra["servers"] = servers
+    else:
+        ready, models = ModelPreloader.is_ready(), readiness.snapshot()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready, "models": models, **extra,
+            "memory": process_memory(), "residency": ModelResidency.info(),
+        },
+    )
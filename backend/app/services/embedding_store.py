@@ -0,0 +1,184 @@
+"""
+Persistent Embedding Store
+On-disk cache of image embeddings keyed by (sha256 of image bytes, model id),
+shared by every uvicorn worker and the ingestion CLI on the same host.
+
+Layout (one pair of files per model, under EMBEDDING_STORE_DIR):
+  <model>.vec   memory-mapped [capacity, dim] float16/float32 matrix
+  <model>.idx   header (write counter) + [capacity, 32] sha256 key per slot
+
+Writes append into a ring of `capacity` slots under an exclusive file lock,
+so the oldest entries are evicted first once the store is full. Readers keep
+an in-memory key -> slot dict and only scan slots written since their last
+lookup (O(1) amortized). Every hit is re-validated against the slot's key,
+so a slot recycled by another process is never returned for the wrong image.
+"""
+
+import fcntl
+import hashlib
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+
+MAGIC = b"LUMEMB01"
+# magic, dim, dtype code, capacity, write counter
+HEADER_FORMAT = "<8sIIQQ"
+HEADER_SIZE = 64
+COUNTER_OFFSET = struct.calcsize("<8sIIQ")
+KEY_SIZE = 32
+DTYPES = {1: np.float16, 2: np.float32}
+
+_lookups = metrics.counter("embedding_store_lookups_total", "Embedding store lookups by result")
+_writes = metrics.counter("embedding_store_writes_total", "Embeddings appended to the store")
+
+
+def image_key(image_bytes: bytes) -> bytes:
+    return hashlib.sha256(image_bytes).digest()
+
+
+class EmbeddingStore:
+    _stores: Dict[str, "EmbeddingStore"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, directory: str, model_id: str, dim: int,
+                 capacity: int = 100_000, dtype: str = "float16"):
+        self.model_id = model_id
+        self.dim = dim
+        self.capacity = capacity
+        self.dtype_code = 1 if dtype == "float16" else 2
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, model_id.replace("/", "--"))
+        self._idx_path = f"{base}.idx"
+        self._vec_path = f"{base}.vec"
+        self._lock_path = f"{base}.lock"
+        self._thread_lock = threading.Lock()
+        self._index: Dict[bytes, int] = {}
+        self._slot_keys: List[Optional[bytes]] = [None] * capacity
+        self._seen = 0
+        self._open()
+
+    @classmethod
+    def for_model(cls, model_id: str, dim: int) -> Optional["EmbeddingStore"]:
+        """Shared store for a model, or None when EMBEDDING_STORE_DIR is not set"""
+        if not settings.EMBEDDING_STORE_DIR:
+            return None
+        with cls._stores_lock:
+            store = cls._stores.get(model_id)
+            if store is None or store.dim != dim:
+                store = cls(
+                    settings.EMBEDDING_STORE_DIR, model_id, dim,
+                    capacity=settings.EMBEDDING_STORE_CAPACITY,
+                    dtype=settings.EMBEDDING_STORE_DTYPE,
+                )
+                cls._stores[model_id] = store
+            return store
+
+    # ----- files -----
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _header_matches(self) -> bool:
+        if not (os.path.exists(self._idx_path) and os.path.exists(self._vec_path)):
+            return False
+        with open(self._idx_path, "rb") as f:
+            raw = f.read(COUNTER_OFFSET)
+        if len(raw) < COUNTER_OFFSET:
+            return False
+        magic, dim, dtype_code, capacity = struct.unpack("<8sIIQ", raw)
+        return (magic, dim, dtype_code, capacity) == (MAGIC, self.dim, self.dtype_code, self.capacity)
+
+    def _create(self):
+        dtype = np.dtype(DTYPES[self.dtype_code])
+        with open(self._vec_path, "wb") as f:
+            f.truncate(self.capacity * self.dim * dtype.itemsize)
+        with open(self._idx_path, "wb") as f:
+            f.truncate(HEADER_SIZE + self.capacity * KEY_SIZE)
+            f.seek(0)
+            f.write(struct.pack(HEADER_FORMAT, MAGIC, self.dim, self.dtype_code, self.capacity, 0))
+
+    def _open(self):
+        with self._file_lock():
+            if not self._header_matches():
+                # New store, or the model/dimension/capacity changed: start over
+                self._create()
+        self._idx = np.memmap(self._idx_path, dtype=np.uint8, mode="r+")
+        self._counter = np.ndarray((1,), dtype="<u8", buffer=self._idx, offset=COUNTER_OFFSET)
+        self._keys = np.ndarray(
+            (self.capacity, KEY_SIZE), dtype=np.uint8, buffer=self._idx, offset=HEADER_SIZE
+        )
+        self._vectors = np.memmap(
+            self._vec_path, dtype=DTYPES[self.dtype_code], mode="r+",
+            shape=(self.capacity, self.dim),
+        )
+
+    # ----- index -----
+
+    def _sync(self):
+        """Index slots written (by any process) since the last sync"""
+        counter = int(self._counter[0])
+        if counter == self._seen:
+            return
+        start = max(self._seen, counter - self.capacity)
+        for n in range(start, counter):
+            slot = n % self.capacity
+            old_key = self._slot_keys[slot]
+            if old_key is not None and self._index.get(old_key) == slot:
+                del self._index[old_key]
+            key = self._keys[slot].tobytes()
+            self._slot_keys[slot] = key
+            self._index[key] = slot
+        self._seen = counter
+
+    def __len__(self) -> int:
+        return min(int(self._counter[0]), self.capacity)
+
+    # ----- public API -----
+
+    def get(self, key: bytes) -> Optional[List[float]]:
+        with self._thread_lock:
+            self._sync()
+            slot = self._index.get(key)
+        if slot is None or self._keys[slot].tobytes() != key:
+            _lookups.inc(result="miss")
+            return None
+        vector = np.array(self._vectors[slot], dtype=np.float32)
+        # The slot may have been recycled while we were reading it
+        if self._keys[slot].tobytes() != key:
+            _lookups.inc(result="miss")
+            return None
+        _lookups.inc(result="hit")
+        return vector.tolist()
+
+    def put(self, key: bytes, vector: List[float]):
+        with self._thread_lock, self._file_lock():
+            self._sync()
+            slot = self._index.get(key)
+            if slot is not None and self._keys[slot].tobytes() == key:
+                return
+            counter = int(self._counter[0])
+            slot = counter % self.capacity
+            # Clear the key first so readers never pair the old key with the new vector
+            self._keys[slot] = 0
+            self._vectors[slot] = np.asarray(vector, dtype=self._vectors.dtype)
+            self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+            self._counter[0] = counter + 1
+            self._sync()
+        _writes.inc()
+
+    def flush(self):
+        self._vectors.flush()
+        self._idx.flush()
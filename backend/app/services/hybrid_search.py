@@ -8,7 +8,6 @@ price ranges, categories, stock status, and more.
 from typing import List, Optional
 from qdrant_client.models import Filter, FieldCondition, MatchValue, Range
 from app.services.qdrant_service import QdrantService
-from app.core.config import settings
 
 
 class HybridSearchService:
@@ -60,7 +59,7 @@ class HybridSearchService:
         return Filter(must=conditions)
     
     @staticmethod
-    def search(
+    async def search(
         query_embedding: List[float],
         category: Optional[str] = None,
         min_price: Optional[float] = None,
@@ -68,12 +67,13 @@ class HybridSearchService:
         in_stock: Optional[bool] = None,
         brand: Optional[str] = None,
         limit: int = 20,
+        collection_name: Optional[str] = None,
     ) -> list:
         """
         Execute hybrid search: vector similarity + structured filters
         
         Example:
-            results = HybridSearchService.search(
+            results = await HybridSearchService.search(
                 query_embedding=embedding,
                 category="dress",
                 max_price=100.0,
@@ -81,7 +81,6 @@ class HybridSearchService:
                 limit=20
             )
         """
-        client = QdrantService.get_client()
         query_filter = HybridSearchService.build_filter(
             category=category,
             min_price=min_price,
@@ -90,11 +89,6 @@ class HybridSearchService:
             brand=brand,
         )
         
-        results = client.search(
-            collection_name=settings.QDRANT_COLLECTION,
-            query_vector=query_embedding,
-            query_filter=query_filter,
-            limit=limit,
+        return await QdrantService.search(
+            query_embedding, limit=limit, query_filter=query_filter, collection_name=collection_name
         )
-        
-        return results
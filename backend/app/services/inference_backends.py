@@ -0,0 +1,275 @@
+"""
+Pluggable Inference Backends
+The services talk to a small backend object instead of the raw HF model, so
+the same code path can run on:
+
+  torch       - PyTorch fp32 (default, reference numerics)
+  torch-int8  - PyTorch dynamic INT8 quantization of nn.Linear layers
+  onnx        - ONNX Runtime fp32 graphs exported from the PyTorch model
+  onnx-int8   - ONNX Runtime with dynamically quantized INT8 weights
+
+Backends are selected per model through MODEL_REGISTRY (ModelConfig.backend)
+or overridden with SIGLIP_BACKEND / OWLV2_BACKEND. ONNX graphs are exported
+once and cached under ONNX_CACHE_DIR.
+"""
+
+import math
+import os
+from typing import List, Sequence
+
+import torch
+
+from app.core.config import settings
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+ONNX_OPSET = 17
+
+
+def validate_backend(name: str) -> str:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name} (expected one of {BACKENDS})")
+    return name
+
+
+def quantize_dynamic_int8(model):
+    """
+    Dynamic INT8 quantization of all Linear layers (weights int8, activations fp32).
+    In place, so the fp32 Linear weights are released rather than kept beside the copy.
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _onnx_dir(model_id: str) -> str:
+    path = os.path.join(settings.ONNX_CACHE_DIR, model_id.replace("/", "--"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _onnx_session(module, name: str, model_id: str, example_inputs: tuple,
+                  input_names: List[str], output_names: List[str],
+                  dynamic_axes: dict, int8: bool):
+    """Export `module` to ONNX once (plus an INT8 copy if requested) and open a session"""
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        raise RuntimeError("ONNX backends require `pip install onnxruntime onnx`")
+
+    directory = _onnx_dir(model_id)
+    fp32_path = os.path.join(directory, f"{name}.onnx")
+    if not os.path.exists(fp32_path):
+        print(f"Exporting {model_id} {name} graph to ONNX...")
+        with torch.no_grad():
+            torch.onnx.export(
+                module, example_inputs, fp32_path,
+                input_names=input_names,
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET,
+            )
+
+    path = fp32_path
+    if int8:
+        path = os.path.join(directory, f"{name}.int8.onnx")
+        if not os.path.exists(path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(fp32_path, path, weight_type=QuantType.QInt8)
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+# ===== SigLIP =====
+
+class SiglipTorchBackend:
+    def __init__(self, model):
+        self.model = model
+
+    def image_features(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+    def text_features(self, input_ids):
+        return self.model.get_text_features(input_ids=input_ids)
+
+
+class _SiglipImageTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+
+class _SiglipTextTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids):
+        return self.model.get_text_features(input_ids=input_ids)
+
+
+class SiglipOnnxBackend:
+    def __init__(self, model, model_id: str, int8: bool = False):
+        image_size = model.config.vision_config.image_size
+        text_length = model.config.text_config.max_position_embeddings
+        self._image = _onnx_session(
+            _SiglipImageTower(model), "image", model_id,
+            (torch.zeros(1, 3, image_size, image_size),),
+            ["pixel_values"], ["image_embeds"],
+            {"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+            int8,
+        )
+        self._text = _onnx_session(
+            _SiglipTextTower(model), "text", model_id,
+            (torch.zeros(1, text_length, dtype=torch.long),),
+            ["input_ids"], ["text_embeds"],
+            {"input_ids": {0: "batch"}, "text_embeds": {0: "batch"}},
+            int8,
+        )
+
+    def image_features(self, pixel_values):
+        (embeds,) = self._image.run(None, {"pixel_values": pixel_values.numpy()})
+        return torch.from_numpy(embeds)
+
+    def text_features(self, input_ids):
+        (embeds,) = self._text.run(None, {"input_ids": input_ids.numpy()})
+        return torch.from_numpy(embeds)
+
+
+def load_siglip_backend(name: str, model, model_id: str):
+    validate_backend(name)
+    if name == "torch":
+        return SiglipTorchBackend(model)
+    if name == "torch-int8":
+        return SiglipTorchBackend(quantize_dynamic_int8(model))
+    return SiglipOnnxBackend(model, model_id, int8=name == "onnx-int8")
+
+
+# ===== OWLv2 =====
+
+def _owlv2_heads(model, pixel_values, query_embeds, query_mask):
+    """Image tower + class/box heads against precomputed (batched) text queries"""
+    feature_map = model.image_embedder(pixel_values=pixel_values)[0]
+    batch_size, height, width, hidden_dim = feature_map.shape
+    image_feats = torch.reshape(feature_map, (batch_size, height * width, hidden_dim))
+
+    pred_logits, _ = model.class_predictor(image_feats, query_embeds, query_mask)
+    pred_boxes = model.box_predictor(image_feats, feature_map)
+    return pred_logits, pred_boxes
+
+
+class Owlv2TorchBackend:
+    def __init__(self, model):
+        self.model = model
+
+    def text_features(self, input_ids, attention_mask):
+        return self.model.owlv2.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+    def predict(self, pixel_values, query_embeds, query_mask):
+        return _owlv2_heads(self.model, pixel_values, query_embeds, query_mask)
+
+
+class _Owlv2Heads(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values, query_embeds, query_mask):
+        return _owlv2_heads(self.model, pixel_values, query_embeds, query_mask)
+
+
+class _Owlv2TextTower(torch.nn.Module):
+    """Just the text encoder + projection of an OWLv2 model"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.text_model = model.owlv2.text_model
+        self.text_projection = model.owlv2.text_projection
+
+    def forward(self, input_ids, attention_mask):
+        pooled = self.text_model(input_ids=input_ids, attention_mask=attention_mask)[1]
+        return self.text_projection(pooled)
+
+
+class Owlv2OnnxBackend:
+    """
+    Runs the image tower + heads in ONNX Runtime. Text queries stay in PyTorch
+    (computed once per label set and cached anyway), but only the text tower is
+    kept: the rest of the fp32 model is released once the session is built.
+    """
+
+    def __init__(self, model, model_id: str, int8: bool = False):
+        self._text_tower = _Owlv2TextTower(model).eval()
+        image_size = model.config.vision_config.image_size
+        hidden_dim = model.config.projection_dim
+        self._heads = _onnx_session(
+            _Owlv2Heads(model), "detector", model_id,
+            (
+                torch.zeros(1, 3, image_size, image_size),
+                torch.zeros(1, 2, hidden_dim),
+                torch.ones(1, 2, dtype=torch.bool),
+            ),
+            ["pixel_values", "query_embeds", "query_mask"], ["logits", "pred_boxes"],
+            {
+                "pixel_values": {0: "batch"},
+                "query_embeds": {0: "batch", 1: "queries"},
+                "query_mask": {0: "batch", 1: "queries"},
+                "logits": {0: "batch", 2: "queries"},
+                "pred_boxes": {0: "batch"},
+            },
+            int8,
+        )
+
+    def text_features(self, input_ids, attention_mask):
+        return self._text_tower(input_ids, attention_mask)
+
+    def predict(self, pixel_values, query_embeds, query_mask):
+        logits, boxes = self._heads.run(None, {
+            "pixel_values": pixel_values.numpy(),
+            "query_embeds": query_embeds.contiguous().numpy(),
+            "query_mask": query_mask.contiguous().numpy(),
+        })
+        return torch.from_numpy(logits), torch.from_numpy(boxes)
+
+
+def load_owlv2_backend(name: str, model, model_id: str):
+    validate_backend(name)
+    if name == "torch":
+        return Owlv2TorchBackend(model)
+    if name == "torch-int8":
+        return Owlv2TorchBackend(quantize_dynamic_int8(model))
+    return Owlv2OnnxBackend(model, model_id, int8=name == "onnx-int8")
+
+
+# ===== Parity metrics (accuracy cost of a backend vs. the fp32 reference) =====
+
+def cosine_drift(reference: Sequence[float], candidate: Sequence[float]) -> float:
+    """1 - cosine similarity between a reference embedding and a candidate one"""
+    dot = sum(a * b for a, b in zip(reference, candidate))
+    norm = math.sqrt(sum(a * a for a in reference)) * math.sqrt(sum(b * b for b in candidate))
+    return 1.0 - (dot / norm if norm else 0.0)
+
+
+def box_iou(a: Sequence[float], b: Sequence[float]) -> float:
+    """IoU of two [xmin, ymin, xmax, ymax] boxes"""
+    inter_w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    inter_h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def detection_parity(reference: List[dict], candidate: List[dict]) -> float:
+    """
+    Mean IoU between each reference detection and the best same-label candidate
+    detection (0 for reference boxes the candidate missed).
+    """
+    if not reference:
+        return 1.0 if not candidate else 0.0
+    total = 0.0
+    for ref in reference:
+        matches = [box_iou(ref["box"], c["box"]) for c in candidate if c["label"] == ref["label"]]
+        total += max(matches, default=0.0)
+    return total / len(reference)
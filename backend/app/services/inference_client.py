@@ -0,0 +1,163 @@
+"""
+Inference Client
+API-worker side of INFERENCE_MODE="remote": the same blocking service calls
+the endpoints already hand to InferenceExecutor.run, forwarded to the
+inference server process over its Unix socket instead of running in-process.
+
+`remote_functions()` maps each service function to its remote stand-in;
+InferenceExecutor.use_remote() installs it, so endpoints don't change.
+Connections are persistent and pooled (INFERENCE_CLIENT_CONNECTIONS).
+INFERENCE_SOCKET may list several comma-separated server sockets; calls
+are spread over them round-robin.
+"""
+
+import asyncio
+import itertools
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core import ipc
+from app.core.config import settings
+from app.core.executor import InferenceOverloaded
+from app.services.owlv2_service import Owlv2Service
+from app.services.reranking_service import RerankResult, RerankingService
+from app.services.siglip_service import SiglipService
+from app.services.visual_search import QueryRegion, VisualSearchService
+
+# Server-side exceptions re-raised as themselves so endpoint handling is unchanged
+_ERRORS = {"InferenceOverloaded": InferenceOverloaded, "ValueError": ValueError}
+
+
+class InferenceServerError(RuntimeError):
+    """The inference server failed a request"""
+
+
+# What a down, restarting or misbehaving server raises: connect/stream errors,
+# a timeout, a truncated or undecodable frame (codecs raise ValueError) or a failed op
+UNAVAILABLE_ERRORS = (
+    OSError, EOFError, asyncio.TimeoutError, struct.error, ValueError, InferenceServerError,
+)
+
+
+class InferenceClient:
+    # socket path -> idle connections to that server
+    _idle: Dict[str, List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+    _slots: Optional[asyncio.Semaphore] = None
+    _turns = itertools.count()
+
+    @classmethod
+    def _get_slots(cls) -> asyncio.Semaphore:
+        if cls._slots is None:
+            cls._slots = asyncio.Semaphore(settings.INFERENCE_CLIENT_CONNECTIONS)
+        return cls._slots
+
+    @staticmethod
+    def sockets() -> List[str]:
+        return [path.strip() for path in settings.INFERENCE_SOCKET.split(",") if path.strip()]
+
+    @classmethod
+    def _next_socket(cls) -> str:
+        sockets = cls.sockets()
+        return sockets[next(cls._turns) % len(sockets)]
+
+    @classmethod
+    async def call(cls, op: str, args: Optional[dict] = None, buffers: Sequence[bytes] = (),
+                   socket_path: Optional[str] = None) -> Tuple[object, List[bytes]]:
+        """One request to `socket_path`, or to the next server in turn"""
+        socket_path = socket_path or cls._next_socket()
+        async with cls._get_slots():
+            idle = cls._idle.setdefault(socket_path, [])
+            if idle:
+                reader, writer = idle.pop()
+            else:
+                reader, writer = await asyncio.open_unix_connection(socket_path)
+            try:
+                await ipc.write_message(writer, {"op": op, "args": args or {}}, buffers)
+                header, out = await asyncio.wait_for(
+                    ipc.read_message(reader), timeout=settings.INFERENCE_TIMEOUT_S
+                )
+            except BaseException:
+                # Unknown stream state (timeout, cancellation, broken pipe): drop it
+                writer.close()
+                raise
+            idle.append((reader, writer))
+
+        if not header["ok"]:
+            error = _ERRORS.get(header["error"], InferenceServerError)
+            raise error(header["detail"])
+        return header["result"], out
+
+    @classmethod
+    async def close(cls):
+        for idle in cls._idle.values():
+            for _, writer in idle:
+                writer.close()
+        cls._idle.clear()
+        cls._slots = None
+
+    @classmethod
+    async def ping(cls, socket_path: Optional[str] = None) -> dict:
+        result, _ = await cls.call("ping", socket_path=socket_path)
+        return result
+
+    @classmethod
+    async def ping_all(cls) -> Dict[str, dict]:
+        """Every server's readiness; one that can't answer reports not ready, with the error"""
+        async def ping(socket_path: str) -> dict:
+            try:
+                return await cls.ping(socket_path)
+            except UNAVAILABLE_ERRORS as e:
+                return {"ready": False, "models": {}, "error": f"{type(e).__name__}: {e}"}
+
+        sockets = cls.sockets()
+        return dict(zip(sockets, await asyncio.gather(*(ping(path) for path in sockets))))
+
+    # ----- remote stand-ins for the in-process service calls -----
+
+    @classmethod
+    async def text_embedding(cls, text: str, version: Optional[str] = None) -> List[float]:
+        _, buffers = await cls.call("text_embedding", {"text": text, "version": version})
+        return ipc.unpack_vectors(buffers[0], 1)[0]
+
+    @classmethod
+    async def detect(cls, image_bytes: bytes, texts: Optional[List[str]] = None) -> dict:
+        result, _ = await cls.call("detect", {"labels": texts}, [image_bytes])
+        return result
+
+    @classmethod
+    async def detect_many(cls, images_bytes: List[bytes], texts: Optional[List[str]] = None) -> List[dict]:
+        result, _ = await cls.call("detect_many", {"labels": texts}, images_bytes)
+        return result
+
+    @classmethod
+    async def embed_regions(cls, decoded, image_bytes: bytes, crop: bool = True,
+                            labels: Optional[List[str]] = None) -> List[QueryRegion]:
+        # The server decodes the original bytes itself; `decoded` stays local
+        meta, buffers = await cls.call("embed_regions", {"crop": crop, "labels": labels}, [image_bytes])
+        embeddings = ipc.unpack_vectors(buffers[0], len(meta))
+        return [QueryRegion(embedding=embedding, **region) for region, embedding in zip(meta, embeddings)]
+
+    @classmethod
+    async def rerank(cls, query_text: str, candidates: list, top_k: int = 20,
+                     version: Optional[str] = None, deadline: Optional[float] = None) -> List[RerankResult]:
+        # perf_counter() isn't comparable across processes; send what's left of the budget
+        budget_ms = None if deadline is None else max(0.0, (deadline - time.perf_counter()) * 1000)
+        result, _ = await cls.call("rerank", {
+            "query": query_text,
+            "candidates": [{"id": str(c.id), "score": c.score, "payload": c.payload} for c in candidates],
+            "top_k": top_k,
+            "version": version,
+            "budget_ms": budget_ms,
+        })
+        return [RerankResult(**row) for row in result]
+
+    @classmethod
+    def remote_functions(cls) -> Dict[object, object]:
+        return {
+            SiglipService.get_text_embedding: cls.text_embedding,
+            Owlv2Service.detect: cls.detect,
+            Owlv2Service.detect_many: cls.detect_many,
+            VisualSearchService.embed_regions: cls.embed_regions,
+            RerankingService.rerank: cls.rerank,
+        }
@@ -0,0 +1,140 @@
+"""
+Inference Server
+Owns OWLv2 / SigLIP / the reranker in a dedicated process and serves API
+workers over a Unix socket (INFERENCE_MODE="remote"). API workers then only
+do HTTP, caching and Qdrant I/O, so their count scales with concurrency
+while model memory is paid once. Requests from every API worker land in this
+process's InferenceExecutor and micro-batchers, so they batch together too.
+
+Run with `python -m app.inference_server`. Ops and wire format mirror
+app.services.inference_client; framing is in app.core.ipc.
+"""
+
+import asyncio
+import os
+from dataclasses import asdict
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core import ipc, readiness
+from app.core.config import settings
+from app.core.executor import InferenceExecutor
+from app.core.imaging import decode_image
+from app.services.inference_client import InferenceClient
+from app.services.model_preload import ModelPreloader
+from app.services.owlv2_service import Owlv2Service
+from app.services.reranking_service import RerankingService
+from app.services.siglip_service import SiglipService
+from app.services.visual_search import VisualSearchService
+
+Handler = Callable[[dict, List[bytes]], Awaitable[Tuple[object, List[bytes]]]]
+
+
+async def _ping(args: dict, buffers: List[bytes]):
+    return {"ready": ModelPreloader.is_ready(), "models": readiness.snapshot()}, []
+
+
+async def _text_embedding(args: dict, buffers: List[bytes]):
+    embedding = await InferenceExecutor.run(
+        SiglipService.get_text_embedding, args["text"], args.get("version")
+    )
+    return None, [ipc.pack_vectors([embedding])]
+
+
+async def _detect(args: dict, buffers: List[bytes]):
+    return await InferenceExecutor.run(Owlv2Service.detect, buffers[0], args.get("labels")), []
+
+
+async def _detect_many(args: dict, buffers: List[bytes]):
+    return await InferenceExecutor.run(Owlv2Service.detect_many, buffers, args.get("labels")), []
+
+
+def _decode_and_embed_regions(image_bytes: bytes, crop: bool, labels: Optional[list]):
+    decoded = decode_image(image_bytes, settings.IMAGE_DECODE_MAX_SIDE)
+    return VisualSearchService.embed_regions(decoded, image_bytes, crop, labels)
+
+
+async def _embed_regions(args: dict, buffers: List[bytes]):
+    regions = await InferenceExecutor.run(
+        _decode_and_embed_regions, buffers[0], args.get("crop", True), args.get("labels")
+    )
+    meta = [{"label": r.label, "box": r.box, "confidence": r.confidence} for r in regions]
+    return meta, [ipc.pack_vectors([r.embedding for r in regions])]
+
+
+async def _rerank(args: dict, buffers: List[bytes]):
+    candidates = [SimpleNamespace(**candidate) for candidate in args["candidates"]]
+    deadline = RerankingService.deadline_after(args.get("budget_ms"))
+    results = await InferenceExecutor.run(
+        RerankingService.rerank, args["query"], candidates, args.get("top_k", 20),
+        version=args.get("version"), deadline=deadline,
+    )
+    return [asdict(result) for result in results], []
+
+
+OPS: Dict[str, Handler] = {
+    "ping": _ping,
+    "text_embedding": _text_embedding,
+    "detect": _detect,
+    "detect_many": _detect_many,
+    "embed_regions": _embed_regions,
+    "rerank": _rerank,
+}
+
+
+class InferenceServer:
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or self.default_socket()
+        if "," in self.socket_path:
+            raise ValueError(f"One socket path per inference server, got '{self.socket_path}'")
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @staticmethod
+    def default_socket() -> str:
+        """INFERENCE_SOCKET when it names one server; a list of several needs an explicit path each"""
+        sockets = InferenceClient.sockets()
+        if len(sockets) != 1:
+            raise ValueError(
+                f"INFERENCE_SOCKET lists {len(sockets)} servers; start each with its own --socket"
+            )
+        return sockets[0]
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # stale socket from a previous run
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        print(f"Inference server listening on {self.socket_path}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # One persistent connection per client slot; requests on it are sequential
+        try:
+            while True:
+                try:
+                    header, buffers = await ipc.read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                handler = OPS.get(header.get("op"))
+                try:
+                    if handler is None:
+                        raise ValueError(f"Unknown inference op '{header.get('op')}'")
+                    result, out = await handler(header.get("args") or {}, buffers)
+                    await ipc.write_message(writer, ipc.ok_header(result), out)
+                except Exception as e:
+                    await ipc.write_message(writer, ipc.error_header(e))
+        finally:
+            writer.close()
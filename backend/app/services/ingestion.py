@@ -0,0 +1,348 @@
+"""
+Bulk Catalog Ingestion
+Streams a product manifest into Qdrant:
+
+  manifest (JSONL/CSV) -> decode pool -> batched SigLIP -> chunked upserts
+
+Stages overlap: the next batch is prepared (read, hashed, diffed against
+Qdrant, decoded) while the current one is embedded, and up to
+INGEST_MAX_IN_FLIGHT upsert chunks are sent to Qdrant concurrently.
+Progress is checkpointed after every contiguous run of committed chunks, so
+an interrupted run resumes where it left off.
+
+Point ids are derived from the SKU and each point stores the sha256 of its
+image bytes plus the embedding model id. Items whose image and model are
+unchanged reuse the stored vector (and are skipped entirely if the payload
+is unchanged too), so re-indexing only pays for the deltas. Images already
+in the local embedding store (embedding_store.py) skip the model as well.
+
+Manifest rows need a `sku` and an `image` (local path, relative to the
+manifest unless --image-root is given). All other fields become the payload.
+
+With `siglip_version`, a model_registry SigLIP version embeds the catalog
+into that version's collection (SiglipService.collection_for), which is
+what MODEL_AB_ROUTES sends the version's queries to.
+"""
+
+import csv
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+from app.core.config import settings
+from qdrant_client.models import PointStruct
+from app.services.qdrant_service import CONTENT_HASH_KEY, MODEL_ID_KEY, QdrantService
+from app.services.siglip_service import SiglipService
+
+
+@dataclass
+class ManifestItem:
+    row: int
+    sku: str
+    image_path: str
+    payload: dict
+
+
+@dataclass
+class IngestionStats:
+    processed: int = 0
+    upserted: int = 0
+    embedded: int = 0
+    reused: int = 0
+    unchanged: int = 0
+    store_hits: int = 0
+    failed: int = 0
+    skipped: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def items_per_sec(self) -> float:
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "upserted": self.upserted,
+            "embedded": self.embedded,
+            "reused": self.reused,
+            "unchanged": self.unchanged,
+            "store_hits": self.store_hits,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_s": round(self.elapsed, 2),
+            "items_per_sec": round(self.items_per_sec, 2),
+        }
+
+
+def read_manifest(path: str, image_root: Optional[str] = None) -> Iterator[ManifestItem]:
+    """Yield manifest rows from a .jsonl or .csv file"""
+    image_root = image_root or os.path.dirname(os.path.abspath(path))
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row_number, row in enumerate(rows):
+            row = dict(row)
+            sku = str(row.get("sku") or row.get("id") or "")
+            image = row.pop("image", None) or row.get("image_path")
+            if not sku or not image:
+                raise ValueError(f"Manifest row {row_number} needs `sku` and `image`")
+            image_path = image if os.path.isabs(image) else os.path.join(image_root, image)
+            yield ManifestItem(row=row_number, sku=sku, image_path=image_path, payload=row)
+
+
+@dataclass
+class PreparedBatch:
+    items: List[ManifestItem]
+    # Points that can be written without running the model
+    points: list = field(default_factory=list)
+    # (payload, decoded image) pairs that still need an embedding
+    to_embed: list = field(default_factory=list)
+
+
+class Checkpoint:
+    """Tracks the number of leading manifest rows that are safely in Qdrant"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.offset = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.offset = json.load(f).get("offset", 0)
+
+    def save(self, offset: int, stats: IngestionStats):
+        self.offset = offset
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"offset": offset, "stats": stats.as_dict()}, f)
+        os.replace(tmp_path, self.path)
+
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        manifest_path: str,
+        checkpoint_path: Optional[str] = None,
+        image_root: Optional[str] = None,
+        embed_batch_size: Optional[int] = None,
+        upsert_batch_size: Optional[int] = None,
+        decode_workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        report_every_s: float = 10.0,
+        siglip_version: Optional[str] = None,
+    ):
+        self.manifest_path = manifest_path
+        self.siglip_version = SiglipService.resolve_version(siglip_version)
+        # None = QDRANT_COLLECTION
+        self.collection_name = SiglipService.collection_for(self.siglip_version)
+        self.image_root = image_root
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.embed_batch_size = embed_batch_size or settings.INGEST_EMBED_BATCH_SIZE
+        self.upsert_batch_size = upsert_batch_size or settings.INGEST_UPSERT_BATCH_SIZE
+        self.decode_workers = decode_workers or settings.INGEST_DECODE_WORKERS
+        self.max_in_flight = max_in_flight or settings.INGEST_MAX_IN_FLIGHT
+        self.report_every_s = report_every_s
+        self.stats = IngestionStats()
+
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        # chunk index -> last manifest row (exclusive) once committed
+        self._committed: dict = {}
+        self._next_chunk_to_commit = 0
+        self._last_report = time.perf_counter()
+
+    # ----- stages -----
+
+    @staticmethod
+    def _read(item: ManifestItem) -> Optional[bytes]:
+        try:
+            with open(item.image_path, "rb") as f:
+                return f.read()
+        except OSError as e:
+            print(f"[ingest] row {item.row} ({item.sku}): {e}")
+            return None
+
+    @staticmethod
+    def _decode(entry: tuple):
+        item, content = entry
+        try:
+            return SiglipService.decode_image(content)
+        except ValueError as e:
+            print(f"[ingest] row {item.row} ({item.sku}): {e}")
+            return None
+
+    def _batches(self, items: Iterator[ManifestItem]) -> Iterator[List[ManifestItem]]:
+        batch = []
+        for item in items:
+            if item.row < self.checkpoint.offset:
+                self.stats.skipped += 1
+                continue
+            batch.append(item)
+            if len(batch) == self.embed_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _prepare(self, batch: List[ManifestItem], io_pool: ThreadPoolExecutor) -> PreparedBatch:
+        """Read + hash images, diff against stored points and decode only what changed"""
+        prepared = PreparedBatch(items=batch)
+        contents = list(io_pool.map(self._read, batch))
+
+        entries = []
+        for item, content in zip(batch, contents):
+            if content is None:
+                continue
+            payload = {
+                "sku": item.sku,
+                **item.payload,
+                CONTENT_HASH_KEY: QdrantService.content_hash(content),
+                MODEL_ID_KEY: SiglipService.model_id(self.siglip_version),
+            }
+            entries.append((item, content, QdrantService.point_id(item.sku), payload))
+
+        existing = QdrantService.retrieve_points(
+            [entry[2] for entry in entries], collection_name=self.collection_name
+        ) if entries else {}
+
+        changed, payload_only = [], []
+        for item, content, point_id, payload in entries:
+            record = existing.get(point_id)
+            stored = record.payload if record is not None else {}
+            if (stored.get(CONTENT_HASH_KEY) != payload[CONTENT_HASH_KEY]
+                    or stored.get(MODEL_ID_KEY) != payload[MODEL_ID_KEY]):
+                changed.append((item, content, payload))
+            elif stored == payload:
+                self.stats.unchanged += 1
+            else:
+                payload_only.append((point_id, payload))
+
+        # Same image + model, new product data: keep the stored vector
+        if payload_only:
+            vectors = QdrantService.retrieve_points(
+                [point_id for point_id, _ in payload_only], with_vectors=True,
+                collection_name=self.collection_name,
+            )
+            for point_id, payload in payload_only:
+                prepared.points.append(
+                    PointStruct(id=point_id, vector=vectors[point_id].vector, payload=payload)
+                )
+            self.stats.reused += len(payload_only)
+
+        # Image already embedded by this model elsewhere (API upload, other SKU, earlier run)
+        store = SiglipService.get_embedding_store(self.siglip_version)
+        to_decode = []
+        for item, content, payload in changed:
+            cached = store.get(bytes.fromhex(payload[CONTENT_HASH_KEY])) if store else None
+            if cached is not None:
+                prepared.points.append(QdrantService.build_point(cached, payload))
+                self.stats.store_hits += 1
+            else:
+                to_decode.append((item, content, payload))
+
+        images = io_pool.map(self._decode, [(item, content) for item, content, _ in to_decode])
+        for (_, _, payload), image in zip(to_decode, images):
+            if image is not None:
+                prepared.to_embed.append((payload, image))
+
+        self.stats.failed += len(batch) - len(entries) + len(to_decode) - len(prepared.to_embed)
+        return prepared
+
+    def _embed(self, to_embed: list) -> list:
+        if not to_embed:
+            return []
+        embeddings = SiglipService.get_image_embeddings([image for _, image in to_embed], self.siglip_version)
+        self.stats.embedded += len(to_embed)
+
+        store = SiglipService.get_embedding_store(self.siglip_version)
+        if store is not None:
+            for (payload, _), embedding in zip(to_embed, embeddings):
+                store.put(bytes.fromhex(payload[CONTENT_HASH_KEY]), embedding)
+        return [
+            QdrantService.build_point(embedding, payload)
+            for (payload, _), embedding in zip(to_embed, embeddings)
+        ]
+
+    def _upsert(self, chunk_index: int, points: list, end_row: int):
+        try:
+            if points:
+                QdrantService.upsert_points(points, collection_name=self.collection_name)
+            with self._lock:
+                self.stats.upserted += len(points)
+                self._committed[chunk_index] = end_row
+                # Only advance the checkpoint over a contiguous prefix of chunks
+                while self._next_chunk_to_commit in self._committed:
+                    offset = self._committed.pop(self._next_chunk_to_commit)
+                    self._next_chunk_to_commit += 1
+                    self.checkpoint.save(offset, self.stats)
+        finally:
+            self._in_flight.release()
+
+    def _submit_chunk(self, pool: ThreadPoolExecutor, chunk_index: int, points: list,
+                      end_row: int, pending: List[Future]):
+        # Blocks when INGEST_MAX_IN_FLIGHT upserts are already running
+        self._in_flight.acquire()
+        pending.append(pool.submit(self._upsert, chunk_index, points, end_row))
+
+    def _report(self, force: bool = False):
+        now = time.perf_counter()
+        if force or now - self._last_report >= self.report_every_s:
+            self._last_report = now
+            print(f"[ingest] {json.dumps(self.stats.as_dict())}")
+
+    # ----- driver -----
+
+    def run(self, limit: Optional[int] = None) -> IngestionStats:
+        if self.checkpoint.offset:
+            print(f"[ingest] Resuming from manifest row {self.checkpoint.offset}")
+
+        items = read_manifest(self.manifest_path, self.image_root)
+        if limit is not None:
+            end = self.checkpoint.offset + limit
+            items = itertools.takewhile(lambda item: item.row < end, items)
+
+        pending: List[Future] = []
+        chunk, chunk_index, chunk_end = [], 0, self.checkpoint.offset
+        with ThreadPoolExecutor(self.decode_workers, thread_name_prefix="decode") as io_pool, \
+             ThreadPoolExecutor(1, thread_name_prefix="prepare") as prepare_pool, \
+             ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="upsert") as upsert_pool:
+            batches = self._batches(items)
+            current = next(batches, None)
+            future = prepare_pool.submit(self._prepare, current, io_pool) if current else None
+            while future is not None:
+                # Prepare the next batch while this one is being embedded
+                upcoming = next(batches, None)
+                next_future = prepare_pool.submit(self._prepare, upcoming, io_pool) if upcoming else None
+
+                prepared = future.result()
+                chunk.extend(prepared.points)
+                chunk.extend(self._embed(prepared.to_embed))
+                chunk_end = prepared.items[-1].row + 1
+                self.stats.processed += len(prepared.items)
+
+                while len(chunk) >= self.upsert_batch_size:
+                    points, chunk = chunk[:self.upsert_batch_size], chunk[self.upsert_batch_size:]
+                    end_row = chunk_end if not chunk else prepared.items[0].row
+                    self._submit_chunk(upsert_pool, chunk_index, points, end_row, pending)
+                    chunk_index += 1
+                self._report()
+                future = next_future
+
+            self._submit_chunk(upsert_pool, chunk_index, chunk, chunk_end, pending)
+            for future in pending:
+                future.result()
+
+        self._report(force=True)
+        return self.stats
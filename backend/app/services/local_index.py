@@ -0,0 +1,522 @@
+"""
+Local Vector Index
+In-process stand-in for the Qdrant server (VECTOR_BACKEND=local), for small
+catalogs, tests and offline deployments. QdrantService hands out a
+LocalVectorIndex / AsyncLocalVectorIndex in place of the Qdrant clients; they
+implement the subset of the client API the service uses (collections, upsert,
+retrieve, search, search_batch, payload indexes), so callers are unchanged.
+
+Layout (per collection, under LOCAL_INDEX_PATH):
+  <name>.meta.json     dimension + payload index schema
+  <name>.vectors       memory-mapped [capacity, dim] float16, L2-normalized rows
+  <name>.points.jsonl  append-only log of {"row", "id", "payload"}
+
+Search is exact by default: one float32 matmul per chunk of rows and an
+argpartition top-k, so cosine scores match Qdrant's. NumPy has no fast
+half-precision matmul, so each chunk of the float16 mapping is widened to
+float32 as it is scored (at most SCORE_CHUNK_ROWS rows at a time). With
+LOCAL_INDEX_FLOAT32_CACHE each process instead keeps a float32 copy of the
+rows, widened once as they are loaded or written: faster scans for twice the
+file's size in RAM per process. Collections with at least
+LOCAL_INDEX_ANN_MIN_POINTS points switch to an IVF index (k-means coarse
+quantizer, LOCAL_INDEX_IVF_NPROBE lists scanned per query), built in memory
+on first use and rebuilt as the collection grows. Smaller collections, which
+are scanned exactly, always keep the float32 copy: it is bounded by the
+threshold, and the exact scan is where widening costs most.
+
+Writers append under an exclusive file lock; every reader (other uvicorn
+workers, the ingestion CLI) replays the log tail before answering, so writes
+from any process are visible on the next query. Filters support the Qdrant
+models HybridSearchService builds: must / should / must_not with MatchValue,
+MatchAny, MatchExcept and Range conditions.
+"""
+
+import asyncio
+import fcntl
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+
+# Rows scored per matmul, bounding the float32 copy each chunk is gathered/widened into
+SCORE_CHUNK_ROWS = 8192
+INITIAL_CAPACITY = 1024
+# Rebuild the IVF index once the collection has grown this much since the last build
+IVF_REBUILD_GROWTH = 1.2
+IVF_KMEANS_ITERATIONS = 10
+IVF_TRAIN_POINTS_PER_LIST = 64
+
+_searches = metrics.counter("local_index_searches_total", "Local vector index queries by mode")
+
+
+@dataclass
+class CollectionInfo:
+    points_count: int
+    payload_schema: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Record:
+    id: Any
+    payload: Optional[dict] = None
+    vector: Optional[List[float]] = None
+
+
+@dataclass
+class ScoredPoint:
+    id: Any
+    score: float
+    payload: Optional[dict] = None
+    version: int = 0
+
+
+def _conditions(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class _IVFIndex:
+    """Coarse k-means partition of the rows present at build time"""
+
+    def __init__(self, vectors: np.ndarray, count: int, seed: int = 0):
+        self.count = count
+        n_lists = min(count, max(1, int(4 * math.sqrt(count))))
+        rng = np.random.default_rng(seed)
+        train_rows = np.sort(rng.choice(count, size=min(count, n_lists * IVF_TRAIN_POINTS_PER_LIST), replace=False))
+        train = vectors[train_rows].astype(np.float32, copy=False)
+
+        centroids = train[rng.choice(len(train), size=n_lists, replace=False)]
+        for _ in range(IVF_KMEANS_ITERATIONS):
+            assignment = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, train)
+            filled = np.bincount(assignment, minlength=n_lists) > 0
+            # Spherical k-means: empty lists keep their previous centroid
+            centroids[filled] = _normalize(sums[filled])
+        self.centroids = centroids
+
+        assignment = np.empty(count, dtype=np.int64)
+        for start in range(0, count, SCORE_CHUNK_ROWS):
+            stop = min(start + SCORE_CHUNK_ROWS, count)
+            chunk = vectors[start:stop].astype(np.float32, copy=False)
+            assignment[start:stop] = np.argmax(chunk @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(n_lists)]
+
+    def candidates(self, query: np.ndarray, n_probe: int) -> np.ndarray:
+        """Rows in the n_probe lists closest to the query, ascending"""
+        n_probe = min(n_probe, len(self.lists))
+        nearest = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        return np.sort(np.concatenate([self.lists[i] for i in nearest]))
+
+
+class LocalCollection:
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        base = os.path.join(directory, name)
+        self._meta_path = f"{base}.meta.json"
+        self._vec_path = f"{base}.vectors"
+        self._log_path = f"{base}.points.jsonl"
+        self._lock_path = f"{base}.lock"
+        self._thread_lock = threading.RLock()
+
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.payload_schema = meta.get("payload_schema", {})
+        self._rows: Dict[Any, int] = {}
+        self._ids: List[Any] = []
+        self._payloads: List[dict] = []
+        self._log_offset = 0
+        self._vectors = None
+        self._capacity = 0
+        # LOCAL_INDEX_FLOAT32_CACHE: float32 copy of the first len(self._ids) rows, grown by doubling
+        self._dense: Optional[np.ndarray] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._ivf: Optional[_IVFIndex] = None
+        self._map()
+
+    @staticmethod
+    def create(directory: str, name: str, dim: int):
+        base = os.path.join(directory, name)
+        with open(f"{base}.meta.json", "w") as f:
+            json.dump({"dim": dim, "payload_schema": {}}, f)
+        with open(f"{base}.vectors", "wb") as f:
+            f.truncate(INITIAL_CAPACITY * dim * 2)
+        open(f"{base}.points.jsonl", "wb").close()
+
+    # ----- files -----
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _map(self):
+        capacity = os.path.getsize(self._vec_path) // (self.dim * 2)
+        if capacity != self._capacity:
+            self._vectors = np.memmap(self._vec_path, dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+            self._capacity = capacity
+
+    def _sync(self):
+        """Replay log lines appended (by any process) since the last sync"""
+        size = os.path.getsize(self._log_path)
+        if size == self._log_offset:
+            return
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_offset)
+            tail = f.read(size - self._log_offset)
+        # A line is only complete once its newline is written
+        complete = tail[:tail.rfind(b"\n") + 1]
+        changed = []
+        for line in complete.splitlines():
+            entry = json.loads(line)
+            row = entry["row"]
+            changed.append(row)
+            if row == len(self._ids):
+                self._ids.append(entry["id"])
+                self._payloads.append(entry["payload"])
+            else:
+                self._payloads[row] = entry["payload"]
+            self._rows[entry["id"]] = row
+        self._log_offset += len(complete)
+        self._columns.clear()
+        self._map()
+        self._widen(changed)
+
+    def _widen(self, rows: list):
+        """Bring the float32 cache, if built, up to date with the rows just synced"""
+        if self._dense is None:
+            return
+        count = len(self._ids)
+        if count > len(self._dense):
+            # A new array, so searches still scoring the old one are unaffected
+            dense = np.empty((max(count, 2 * len(self._dense)), self.dim), dtype=np.float32)
+            dense[:len(self._dense)] = self._dense
+            self._dense = dense
+        if rows:
+            rows = np.unique(rows)
+            self._dense[rows] = self._vectors[rows]
+
+    @staticmethod
+    def _below_ann_threshold(count: int) -> bool:
+        return 0 < count < settings.LOCAL_INDEX_ANN_MIN_POINTS
+
+    def _matrix(self) -> np.ndarray:
+        """Rows to score: the float32 cache when enabled or still small, else the float16 mapping"""
+        if not (settings.LOCAL_INDEX_FLOAT32_CACHE or self._below_ann_threshold(len(self._ids))):
+            self._dense = None
+            return self._vectors
+        if self._dense is None:
+            self._dense = self._vectors[:len(self._ids)].astype(np.float32)
+        return self._dense
+
+    def _grow(self, rows: int):
+        if rows <= self._capacity:
+            return
+        capacity = max(self._capacity, INITIAL_CAPACITY)
+        while capacity < rows:
+            capacity *= 2
+        with open(self._vec_path, "r+b") as f:
+            f.truncate(capacity * self.dim * 2)
+        self._map()
+
+    # ----- writes -----
+
+    def upsert(self, points: list):
+        with self._thread_lock, self._file_lock():
+            self._sync()
+            vectors = _normalize(np.asarray([point.vector for point in points], dtype=np.float32))
+            entries, new_rows, next_row = [], {}, len(self._ids)
+            for point in points:
+                row = self._rows.get(point.id, new_rows.get(point.id))
+                if row is None:
+                    row = new_rows[point.id] = next_row
+                    next_row += 1
+                entries.append({"row": row, "id": point.id, "payload": point.payload or {}})
+            self._grow(next_row)
+            # Vectors are on disk before the log lines that make them visible
+            self._vectors[[entry["row"] for entry in entries]] = vectors.astype(np.float16)
+            self._vectors.flush()
+            with open(self._log_path, "ab") as f:
+                f.write(b"".join(json.dumps(entry).encode() + b"\n" for entry in entries))
+            self._sync()
+
+    def set_payload_index(self, field_name: str, field_schema: Any):
+        with self._thread_lock, self._file_lock():
+            self.payload_schema[field_name] = str(getattr(field_schema, "value", field_schema))
+            with open(self._meta_path, "w") as f:
+                json.dump({"dim": self.dim, "payload_schema": self.payload_schema}, f)
+
+    # ----- reads -----
+
+    def info(self) -> CollectionInfo:
+        with self._thread_lock:
+            self._sync()
+            return CollectionInfo(points_count=len(self._ids), payload_schema=dict(self.payload_schema))
+
+    def retrieve(self, ids: list, with_payload: bool = True, with_vectors: bool = False) -> List[Record]:
+        with self._thread_lock:
+            self._sync()
+            rows = [(point_id, self._rows[point_id]) for point_id in ids if point_id in self._rows]
+            return [
+                Record(
+                    id=point_id,
+                    payload=self._payloads[row] if with_payload else None,
+                    vector=self._vectors[row].tolist() if with_vectors else None,
+                )
+                for point_id, row in rows
+            ]
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            column = np.fromiter((payload.get(key) for payload in self._payloads), dtype=object, count=len(self._ids))
+            self._columns[key] = column
+        return column
+
+    def _numeric_column(self, key: str) -> np.ndarray:
+        column = self._columns.get(f"{key}#float")
+        if column is None:
+            column = np.fromiter(
+                (value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+                 for value in self._column(key)),
+                dtype=np.float64, count=len(self._ids),
+            )
+            self._columns[f"{key}#float"] = column
+        return column
+
+    def _condition_mask(self, condition) -> np.ndarray:
+        if getattr(condition, "key", None) is None and hasattr(condition, "must"):
+            return self._filter_mask(condition)
+
+        match = getattr(condition, "match", None)
+        if match is not None:
+            column = self._column(condition.key)
+            if hasattr(match, "value"):
+                return column == match.value
+            if hasattr(match, "any"):
+                values = set(match.any)
+                return np.fromiter((value in values for value in column), dtype=bool, count=len(column))
+            if hasattr(match, "except_"):
+                values = set(match.except_)
+                return np.fromiter((value not in values for value in column), dtype=bool, count=len(column))
+
+        bounds = getattr(condition, "range", None)
+        if bounds is not None:
+            column = self._numeric_column(condition.key)
+            mask = ~np.isnan(column)
+            for attr, compare in (("gt", np.greater), ("gte", np.greater_equal),
+                                  ("lt", np.less), ("lte", np.less_equal)):
+                limit = getattr(bounds, attr, None)
+                if limit is not None:
+                    mask &= compare(column, limit, where=mask, out=np.zeros_like(mask))
+            return mask
+
+        raise ValueError(f"Unsupported filter condition for the local index: {condition!r}")
+
+    def _filter_mask(self, query_filter) -> np.ndarray:
+        mask = np.ones(len(self._ids), dtype=bool)
+        for condition in _conditions(getattr(query_filter, "must", None)):
+            mask &= self._condition_mask(condition)
+        should = _conditions(getattr(query_filter, "should", None))
+        if should:
+            mask &= np.logical_or.reduce([self._condition_mask(condition) for condition in should])
+        for condition in _conditions(getattr(query_filter, "must_not", None)):
+            mask &= ~self._condition_mask(condition)
+        return mask
+
+    @staticmethod
+    def _scores(vectors: np.ndarray, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """[Q, rows] cosine scores, gathering scattered rows and widening float16 one chunk at a time"""
+        count = len(rows)
+        scores = np.empty((len(queries), count), dtype=np.float32)
+        for start in range(0, count, SCORE_CHUNK_ROWS):
+            stop = min(start + SCORE_CHUNK_ROWS, count)
+            if rows[stop - 1] - rows[start] == stop - start - 1:
+                chunk = vectors[rows[start]:rows[stop - 1] + 1]  # contiguous: no gather copy
+            else:
+                chunk = vectors[rows[start:stop]]
+            scores[:, start:stop] = queries @ chunk.astype(np.float32, copy=False).T
+        return scores
+
+    def _ann(self) -> Optional[_IVFIndex]:
+        count = len(self._ids)
+        if not settings.LOCAL_INDEX_ANN_MIN_POINTS or self._below_ann_threshold(count):
+            return None
+        if self._ivf is None or count >= self._ivf.count * IVF_REBUILD_GROWTH:
+            with metrics.timed("local_index_ivf_build"):
+                self._ivf = _IVFIndex(self._matrix(), count)
+        return self._ivf
+
+    def _hits(self, rows: np.ndarray, scores: np.ndarray, limit: int, with_payload: bool) -> List[ScoredPoint]:
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            ScoredPoint(
+                id=self._ids[row],
+                score=float(score),
+                payload=self._payloads[row] if with_payload else None,
+            )
+            for row, score in zip(rows[top].tolist(), scores[top].tolist())
+        ]
+
+    def search_many(self, requests: list) -> List[List[ScoredPoint]]:
+        """requests: (vector, filter, limit, with_payload) tuples -> hits per request"""
+        with self._thread_lock:
+            self._sync()
+            count = len(self._ids)
+            if not count or not requests:
+                return [[] for _ in requests]
+            # Scoring runs unlocked. Rows below `count` are never moved and appends
+            # land above it, but an upsert of an existing id (from any process) rewrites
+            # its row in place, so a racing search may score that one point against a
+            # partly written vector; every other row is unaffected.
+            vectors = self._matrix()
+            ivf = self._ann()
+            masks = [self._filter_mask(request[1]) if request[1] is not None else None for request in requests]
+
+        queries = _normalize(np.asarray([request[0] for request in requests], dtype=np.float32))
+        all_rows = np.arange(count)
+        exact_scores = None
+        results = []
+        for query, mask, (_, _, limit, with_payload) in zip(queries, masks, requests):
+            if ivf is not None:
+                # Rows appended since the build are scanned exactly
+                rows = np.concatenate([ivf.candidates(query, settings.LOCAL_INDEX_IVF_NPROBE),
+                                       np.arange(ivf.count, count)])
+                if mask is not None:
+                    rows = rows[mask[rows]]
+                # A selective filter can leave the probed lists short: scan exactly instead
+                if len(rows) >= limit or mask is None:
+                    _searches.inc(mode="ivf")
+                    scores = self._scores(vectors, query[None], rows)[0]
+                    results.append(self._hits(rows, scores, limit, with_payload))
+                    continue
+
+            _searches.inc(mode="exact")
+            if exact_scores is None:
+                # One pass over the matrix for every query in the batch
+                exact_scores = self._scores(vectors, queries, all_rows)
+            rows = all_rows if mask is None else all_rows[mask]
+            results.append(self._hits(rows, exact_scores[len(results)][rows], limit, with_payload))
+        return results
+
+
+class LocalVectorIndex:
+    """Synchronous QdrantClient stand-in over the collections in one directory"""
+
+    _shared: Dict[str, "LocalVectorIndex"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._collections: Dict[str, LocalCollection] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, path: Optional[str] = None) -> "LocalVectorIndex":
+        """One instance per directory and process, shared by the sync and async clients"""
+        path = path or settings.LOCAL_INDEX_PATH
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(path)
+            return cls._shared[path]
+
+    def _collection(self, collection_name: str) -> LocalCollection:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                if not self.collection_exists(collection_name):
+                    raise ValueError(f"Collection '{collection_name}' not found")
+                collection = LocalCollection(self.path, collection_name)
+                self._collections[collection_name] = collection
+            return collection
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self.path, f"{collection_name}.meta.json"))
+
+    def create_collection(self, collection_name: str, vectors_config, **kwargs) -> bool:
+        # Rows are normalized, so dot product == cosine; HNSW options do not apply
+        LocalCollection.create(self.path, collection_name, vectors_config.size)
+        with self._lock:
+            self._collections.pop(collection_name, None)
+        return True
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            self._collections.pop(collection_name, None)
+        existed = self.collection_exists(collection_name)
+        for suffix in (".meta.json", ".vectors", ".points.jsonl", ".lock"):
+            path = os.path.join(self.path, f"{collection_name}{suffix}")
+            if os.path.exists(path):
+                os.remove(path)
+        return existed
+
+    def get_collection(self, collection_name: str) -> CollectionInfo:
+        return self._collection(collection_name).info()
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs):
+        # Filters always scan payload columns; the schema is recorded for parity with Qdrant
+        self._collection(collection_name).set_payload_index(field_name, field_schema)
+
+    def upsert(self, collection_name: str, points: list, wait: bool = True, **kwargs):
+        self._collection(collection_name).upsert(points)
+
+    def retrieve(self, collection_name: str, ids: list, with_payload: bool = True,
+                 with_vectors: bool = False, **kwargs) -> List[Record]:
+        return self._collection(collection_name).retrieve(ids, with_payload, with_vectors)
+
+    def search(self, collection_name: str, query_vector, query_filter=None, limit: int = 10,
+               with_payload: bool = True, **kwargs) -> List[ScoredPoint]:
+        return self._collection(collection_name).search_many([(query_vector, query_filter, limit, with_payload)])[0]
+
+    def search_batch(self, collection_name: str, requests: list, **kwargs) -> List[List[ScoredPoint]]:
+        return self._collection(collection_name).search_many([
+            (request.vector, request.filter, request.limit, request.with_payload)
+            for request in requests
+        ])
+
+    def close(self):
+        pass
+
+
+class AsyncLocalVectorIndex:
+    """AsyncQdrantClient stand-in: the same index, with scans run off the event loop"""
+
+    def __init__(self, index: LocalVectorIndex):
+        self.index = index
+
+    def __getattr__(self, name):
+        method = getattr(self.index, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+    async def close(self):
+        pass
+
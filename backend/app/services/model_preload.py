@@ -0,0 +1,51 @@
+"""
+Model Preloading
+Loads (and warms up) the models named in PRELOAD_MODELS at startup so no user
+request pays the first-load cost. /ready reports not-ready until every
+preloaded model has finished, which keeps rolling deploys from routing
+traffic to cold pods. Models not listed still load lazily on first use.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core import readiness
+from app.core.config import settings
+from app.services.owlv2_service import Owlv2Service
+from app.services.reranking_service import RerankingService
+from app.services.siglip_service import SiglipService
+
+# name -> (load, load + warm-up)
+MODELS: Dict[str, Tuple[Callable, Callable]] = {
+    "siglip": (SiglipService.get_model, SiglipService.warmup),
+    "owlv2": (Owlv2Service.get_model, Owlv2Service.warmup),
+    "reranker": (RerankingService.get_reranker, RerankingService.warmup),
+}
+
+
+class ModelPreloader:
+    @staticmethod
+    def requested() -> List[str]:
+        names = [name.strip() for name in settings.PRELOAD_MODELS.split(",") if name.strip()]
+        unknown = [name for name in names if name not in MODELS]
+        if unknown:
+            raise ValueError(f"Unknown PRELOAD_MODELS entries {unknown}. Expected any of {list(MODELS)}")
+        return names
+
+    @staticmethod
+    def preload(names: Optional[List[str]] = None, warmup: Optional[bool] = None):
+        """Blocking: load each model in turn. A failure is recorded and the rest still load."""
+        names = ModelPreloader.requested() if names is None else names
+        warmup = settings.WARMUP_ENABLED if warmup is None else warmup
+        for name in names:
+            load, load_and_warm = MODELS[name]
+            try:
+                (load_and_warm if warmup else load)()
+                model = readiness.state(name)
+                print(f"Preloaded {name} (load {model.load_seconds}s, warm-up {model.warmup_seconds}s)")
+            except Exception as e:
+                print(f"Preloading {name} failed: {e}")
+
+    @staticmethod
+    def is_ready() -> bool:
+        done = "ready" if settings.WARMUP_ENABLED else "loaded"
+        return all(readiness.state(name).status == done for name in ModelPreloader.requested())
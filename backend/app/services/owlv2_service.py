@@ -1,63 +1,208 @@
 from PIL import Image
+import threading
 import torch
 from transformers import Owlv2Processor, Owlv2ForObjectDetection
+from app.core import detections, metrics, readiness
 from app.core.config import settings
-import io
+from app.core.imaging import DecodedImage, decode_image
+from app.core.cache import LRUCache
+from app.core.model_registry import resolve_backend
+from app.core.residency import ModelResidency
+from app.core.weights import load_pretrained
+from app.services.inference_backends import load_owlv2_backend
+from typing import Optional
+
+# Default fashion labels for "Magic Crop"
+DEFAULT_LABELS = ["shirt", "pants", "dress", "sunglasses", "shoes", "bag", "jacket", "hat", "watch", "skirt"]
 
 class Owlv2Service:
     _processor = None
     _model = None
+    _backend = None
+    _query_cache = LRUCache("owlv2_text_queries", maxsize=settings.OWLV2_QUERY_CACHE_SIZE)
+    _load_lock = threading.Lock()
 
     @classmethod
     def get_model(cls):
-        if cls._model is None:
-            print(f"Loading Owlv2 model: {settings.OWLV2_MODEL_ID}...")
-            cls._processor = Owlv2Processor.from_pretrained(settings.OWLV2_MODEL_ID)
-            cls._model = Owlv2ForObjectDetection.from_pretrained(settings.OWLV2_MODEL_ID)
-            cls._model.eval()
-            print("Model loaded successfully.")
+        """(processor, torch model); the model is None for ONNX backends"""
+        if cls._backend is None:
+            # Concurrent first requests wait for one load instead of racing
+            with cls._load_lock:
+                if cls._backend is None:
+                    cls._load()
         return cls._processor, cls._model
 
     @staticmethod
-    def detect(image_bytes: bytes, texts: list[str] = None):
+    def _build(model_id: str, backend: str):
+        """(processor, backend); as for SigLIP, no fp32 copy is kept beside the backend"""
+        processor = Owlv2Processor.from_pretrained(model_id)
+        model = load_pretrained(Owlv2ForObjectDetection, model_id)
+        model.eval()
+        return processor, load_owlv2_backend(backend, model, model_id)
+
+    @classmethod
+    def _load(cls):
+        with readiness.loading("owlv2"):
+            print(f"Loading Owlv2 model: {settings.OWLV2_MODEL_ID}...")
+            backend = resolve_backend("detection", settings.OWLV2_MODEL_ID, settings.OWLV2_BACKEND)
+            processor, inference = cls._build(settings.OWLV2_MODEL_ID, backend)
+            cls._processor = processor
+            cls._model = getattr(inference, "model", None)
+            # Published last: a non-None _backend means everything is ready
+            cls._backend = inference
+            ModelResidency.pin("detection", settings.OWLV2_MODEL_ID, (processor, inference))
+            print(f"Model loaded successfully (backend: {backend}).")
+
+    @classmethod
+    def warmup(cls):
+        """Detection passes at batch size 1 and OWLV2_BATCH_SIZE with the default labels"""
+        cls.get_model()
+        with readiness.warming("owlv2"):
+            image = Image.new("RGB", (settings.IMAGE_DECODE_MAX_SIDE,) * 2)
+            for batch_size in sorted({1, settings.OWLV2_BATCH_SIZE}):
+                cls.detect_images([image] * batch_size)
+
+    @classmethod
+    def get_backend(cls):
+        cls.get_model()
+        return cls._backend
+
+    @staticmethod
+    def decode_image(image_bytes: bytes) -> DecodedImage:
+        """
+        Decode straight to (at most) the model's input size: the processor
+        resizes to 960px anyway, so a 12MP photo is never fully materialized
+        """
+        return decode_image(image_bytes, settings.IMAGE_DECODE_MAX_SIDE)
+
+    @staticmethod
+    def _to_original(result: dict, decoded: DecodedImage) -> dict:
+        """Map boxes from the downscaled bitmap back onto the uploaded image"""
+        if decoded.image.size != decoded.original_size:
+            for detection in result["detections"]:
+                detection["box"] = decoded.to_original(detection["box"])
+        return result
+
+    @staticmethod
+    def _format_detections(results: dict, texts: list[str]) -> dict:
+        """NMS and per-label top-k on whole arrays; only survivors become dicts"""
+        scores = results["scores"].cpu().numpy()
+        labels = results["labels"].cpu().numpy()
+        boxes = results["boxes"].cpu().numpy()
+        keep = detections.select(
+            boxes, scores, labels,
+            iou_threshold=settings.OWLV2_NMS_IOU,
+            top_k=settings.OWLV2_TOP_K_PER_LABEL,
+        )
+        return {
+            "detections": detections.to_dicts(boxes[keep], scores[keep], labels[keep], texts),
+            "count": len(keep)
+        }
+
+    @staticmethod
+    def normalize_labels(texts: list[str]) -> tuple:
+        return tuple(" ".join(text.split()).lower() for text in texts)
+
+    @classmethod
+    def get_query_embeddings(cls, texts: list[str]):
+        """
+        Text-tower output for a label set, cached per normalized label tuple.
+        Returns (query_embeds [Q, D], query_mask [Q]).
+        """
+        key = cls.normalize_labels(texts)
+        cached = cls._query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        processor, _ = cls.get_model()
+        with metrics.timed("owlv2_text_queries"):
+            inputs = processor(text=[list(key)], return_tensors="pt")
+            with torch.no_grad():
+                query_embeds = cls.get_backend().text_features(
+                    inputs["input_ids"], inputs["attention_mask"]
+                )
+        # Padding queries (empty strings) start with token id 0
+        query_mask = inputs["input_ids"][:, 0] > 0
+
+        cls._query_cache.put(key, (query_embeds, query_mask))
+        return query_embeds, query_mask
+
+    @classmethod
+    def query_cache_info(cls) -> dict:
+        return cls._query_cache.info()
+
+    @staticmethod
+    def _predict(pixel_values, query_embeds, query_mask):
+        """Image tower + class/box heads against precomputed text queries"""
+        from transformers.models.owlv2.modeling_owlv2 import Owlv2ObjectDetectionOutput
+
+        batch_size = pixel_values.shape[0]
+        query_embeds = query_embeds.unsqueeze(0).expand(batch_size, -1, -1)
+        query_mask = query_mask.unsqueeze(0).expand(batch_size, -1)
+
+        pred_logits, pred_boxes = Owlv2Service.get_backend().predict(
+            pixel_values, query_embeds, query_mask
+        )
+        return Owlv2ObjectDetectionOutput(logits=pred_logits, pred_boxes=pred_boxes)
+
+    @staticmethod
+    def detect_images(images: list, texts: Optional[list[str]] = None) -> list[dict]:
+        """
+        Run one padded OWLv2 batch over several decoded images that share a label set.
+        Returns one result dict per image, in input order.
+        """
         if texts is None:
-            # Default fashion labels for "Magic Crop"
-            texts = ["shirt", "pants", "dress", "sunglasses", "shoes", "bag", "jacket", "hat", "watch", "skirt"]
+            texts = DEFAULT_LABELS
 
-        processor, model = Owlv2Service.get_model()
+        processor, _ = Owlv2Service.get_model()
+        query_embeds, query_mask = Owlv2Service.get_query_embeddings(texts)
 
-        try:
-            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        except Exception as e:
-            raise ValueError(f"Invalid image format: {e}")
+        # The image processor pads every image to the same square input size
+        with metrics.timed("owlv2_preprocess"):
+            inputs = processor(images=images, return_tensors="pt")
 
-        # Owlv2 expects text queries as a list of lists (one list per image)
-        inputs = processor(text=[texts], images=image, return_tensors="pt")
+        with torch.no_grad(), metrics.timed("owlv2_forward"):
+            outputs = Owlv2Service._predict(
+                inputs["pixel_values"], query_embeds, query_mask
+            )
 
-        with torch.no_grad():
-            outputs = model(**inputs)
+        # Per-image target sizes so each image's boxes land in its own coordinates
+        target_sizes = torch.tensor([image.size[::-1] for image in images])
 
-        # Target image size for post-processing
-        target_sizes = torch.tensor([image.size[::-1]])
-        
         # Post-process outputs to get bounding boxes (normalized 0-1 or absolute)
         # Using threshold from settings
-        results = processor.post_process_object_detection(
-            outputs=outputs, 
-            target_sizes=target_sizes, 
-            threshold=settings.CONFIDENCE_THRESHOLD
-        )[0]
-
-        detections = []
-        for score, label, box in zip(results["scores"], results["labels"], results["boxes"]):
-            box = [round(i, 2) for i in box.tolist()]
-            detections.append({
-                "label": texts[label],
-                "confidence": round(score.item(), 2),
-                "box": box  # [xmin, ymin, xmax, ymax]
-            })
+        with metrics.timed("owlv2_postprocess"):
+            batch_results = processor.post_process_object_detection(
+                outputs=outputs,
+                target_sizes=target_sizes,
+                threshold=settings.CONFIDENCE_THRESHOLD
+            )
+            return [Owlv2Service._format_detections(results, texts) for results in batch_results]
 
-        return {
-            "detections": detections,
-            "count": len(detections)
-        }
+    @staticmethod
+    def detect(image_bytes: bytes, texts: list[str] = None):
+        with metrics.timed("owlv2_decode"):
+            decoded = Owlv2Service.decode_image(image_bytes)
+        return Owlv2Service._to_original(Owlv2Service.detect_images([decoded.image], texts)[0], decoded)
+
+    @staticmethod
+    def detect_many(images_bytes: list[bytes], texts: Optional[list[str]] = None) -> list[dict]:
+        """
+        Detect on one batch of encoded images. Images that fail to decode get an
+        error entry instead of failing the whole batch.
+        """
+        results: list[dict] = [None] * len(images_bytes)
+        decoded, positions = [], []
+        with metrics.timed("owlv2_decode"):
+            for i, image_bytes in enumerate(images_bytes):
+                try:
+                    decoded.append(Owlv2Service.decode_image(image_bytes))
+                    positions.append(i)
+                except ValueError as e:
+                    results[i] = {"error": str(e)}
+
+        if decoded:
+            batch = Owlv2Service.detect_images([d.image for d in decoded], texts)
+            for i, image, result in zip(positions, decoded, batch):
+                results[i] = Owlv2Service._to_original(result, image)
+        return results
@@ -0,0 +1,55 @@
+"""
+Payload Store
+Per-worker cache of product payloads by point id. Lets the search cache keep
+only (id, score) pairs in Redis: payloads seen in recent search hits are
+served from memory, anything else is fetched from Qdrant in one request.
+Entries expire after PAYLOAD_STORE_TTL_S so re-ingested products refresh.
+
+Point ids are derived from the SKU, so the same id exists in every SigLIP
+version's collection (with that version's payload); entries are kept per
+collection, None meaning QDRANT_COLLECTION.
+"""
+
+from typing import Dict, Hashable, Iterable, Optional
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.services.qdrant_service import QdrantService
+
+
+class PayloadStore:
+    _cache = LRUCache("payloads", settings.PAYLOAD_STORE_SIZE, ttl=settings.PAYLOAD_STORE_TTL_S)
+
+    @staticmethod
+    def _key(point_id: str, collection_name: Optional[str]) -> Hashable:
+        return point_id if collection_name is None else (collection_name, point_id)
+
+    @classmethod
+    def put_hits(cls, hits: Iterable, collection_name: Optional[str] = None):
+        for hit in hits:
+            cls._cache.put(cls._key(str(hit.id), collection_name), hit.payload)
+
+    @classmethod
+    async def get_many(cls, point_ids: list, collection_name: Optional[str] = None) -> Dict[str, dict]:
+        """id -> payload for every id that still exists in the collection"""
+        payloads, missing = {}, []
+        for point_id in point_ids:
+            payload = cls._cache.get(cls._key(point_id, collection_name))
+            if payload is None:
+                missing.append(point_id)
+            else:
+                payloads[point_id] = payload
+        if missing:
+            fetched = await QdrantService.retrieve_payloads(missing, collection_name=collection_name)
+            for point_id, payload in fetched.items():
+                cls._cache.put(cls._key(point_id, collection_name), payload)
+            payloads.update(fetched)
+        return payloads
+
+    @classmethod
+    def clear(cls):
+        cls._cache.clear()
+
+    @classmethod
+    def info(cls) -> dict:
+        return cls._cache.info()
@@ -1,51 +1,226 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    VectorParams, Distance, PointStruct, SearchRequest, HnswConfigDiff, PayloadSchemaType,
+)
+from app.core import metrics
 from app.core.config import settings
+from app.core.residency import ModelResidency
+from app.services.local_index import AsyncLocalVectorIndex, LocalVectorIndex
+from app.services.siglip_service import SiglipService
+import hashlib
 import uuid
+from typing import Optional
+
+# Namespace for deterministic point ids: uuid5(namespace, sku)
+POINT_ID_NAMESPACE = uuid.UUID("6f1c5a52-4a8e-4c3b-9a57-3f0d2c7b9e14")
+
+# Payload fields written by the indexer, not part of the product data
+CONTENT_HASH_KEY = "content_hash"
+MODEL_ID_KEY = "model_id"
+
+# Payload fields used by HybridSearchService filters -> index type
+PAYLOAD_INDEXES = {
+    "category": PayloadSchemaType.KEYWORD,
+    "brand": PayloadSchemaType.KEYWORD,
+    "in_stock": PayloadSchemaType.BOOL,
+    "price": PayloadSchemaType.FLOAT,
+}
 
 class QdrantService:
+    # Sync client: startup + ingestion CLI. Async client: request handlers.
     _client = None
+    _async_client = None
+
+    @staticmethod
+    def _client_options() -> dict:
+        return {
+            "url": settings.QDRANT_URL,
+            "prefer_grpc": settings.QDRANT_PREFER_GRPC,
+            "grpc_port": settings.QDRANT_GRPC_PORT,
+            "timeout": settings.QDRANT_TIMEOUT_S,
+        }
+
+    @staticmethod
+    def is_local() -> bool:
+        return settings.VECTOR_BACKEND == "local"
 
     @classmethod
     def get_client(cls):
         if cls._client is None:
-            cls._client = QdrantClient(url=settings.QDRANT_URL)
+            if cls.is_local():
+                cls._client = LocalVectorIndex.shared()
+            else:
+                cls._client = QdrantClient(**cls._client_options())
         return cls._client
 
+    @classmethod
+    def get_async_client(cls):
+        # One long-lived client per worker so HTTP/gRPC connections are reused
+        if cls._async_client is None:
+            if cls.is_local():
+                cls._async_client = AsyncLocalVectorIndex(LocalVectorIndex.shared())
+            else:
+                cls._async_client = AsyncQdrantClient(**cls._client_options())
+        return cls._async_client
+
+    @classmethod
+    async def close(cls):
+        if cls._async_client is not None:
+            await cls._async_client.close()
+            cls._async_client = None
+
     @staticmethod
-    def init_collection():
+    def hnsw_config() -> HnswConfigDiff:
+        return HnswConfigDiff(
+            m=settings.QDRANT_HNSW_M,
+            ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+            payload_m=settings.QDRANT_HNSW_PAYLOAD_M,
+            full_scan_threshold=settings.QDRANT_FULL_SCAN_THRESHOLD_KB,
+        )
+
+    @staticmethod
+    def ensure_collection(siglip_version: Optional[str] = None) -> str:
+        """
+        Create the collection holding a SigLIP version's embeddings (default:
+        QDRANT_COLLECTION), sized to that version's embedding dim -> its name.
+        """
         client = QdrantService.get_client()
-        if not client.collection_exists(settings.QDRANT_COLLECTION):
+        collection_name = SiglipService.collection_for(siglip_version) or settings.QDRANT_COLLECTION
+        if not client.collection_exists(collection_name):
             client.create_collection(
-                collection_name=settings.QDRANT_COLLECTION,
-                # SigLIP vector size = 1152
-                vectors_config=VectorParams(size=1152, distance=Distance.COSINE),
+                collection_name=collection_name,
+                vectors_config=VectorParams(
+                    size=SiglipService.embedding_dim(siglip_version), distance=Distance.COSINE
+                ),
+                hnsw_config=QdrantService.hnsw_config(),
             )
-            print(f"Collection '{settings.QDRANT_COLLECTION}' created.")
+            print(f"Collection '{collection_name}' created.")
+        QdrantService.ensure_payload_indexes(collection_name)
+        return collection_name
+
+    @staticmethod
+    def init_collection():
+        """QDRANT_COLLECTION plus one collection per SigLIP version routed by MODEL_AB_ROUTES"""
+        QdrantService.ensure_collection()
+        for version, _ in ModelResidency.routes().get("siglip", []):
+            if SiglipService.collection_for(version) is None:
+                continue  # served by the default model and collection
+            collection_name = QdrantService.ensure_collection(version)
+            if not QdrantService.get_client().get_collection(collection_name).points_count:
+                print(f"Warning: '{collection_name}' is empty; SigLIP {version} queries find nothing "
+                      f"until `python -m app.ingest <manifest> --siglip-version {version}` fills it.")
+
+    @staticmethod
+    def ensure_payload_indexes(collection_name: Optional[str] = None) -> list:
+        """
+        Create any missing filter indexes. Indexes should exist before bulk
+        ingestion so HNSW can build the extra payload-aware links; creating
+        them on a populated collection works but triggers a re-index.
+        """
+        client = QdrantService.get_client()
+        collection_name = collection_name or settings.QDRANT_COLLECTION
+        existing = client.get_collection(collection_name).payload_schema or {}
+        created = []
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            if field_name in existing:
+                continue
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=schema,
+                wait=True,
+            )
+            created.append(field_name)
+        if created:
+            print(f"Payload indexes created on '{collection_name}': {', '.join(created)}")
+        return created
+
+    @staticmethod
+    def point_id(sku: str) -> str:
+        """Stable point id for a product, so re-ingesting overwrites instead of duplicating"""
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, sku))
+
+    @staticmethod
+    def content_hash(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    @staticmethod
+    def build_point(embedding: list[float], payload: dict) -> PointStruct:
+        sku = payload.get("sku")
+        return PointStruct(
+            id=QdrantService.point_id(str(sku)) if sku else str(uuid.uuid4()),
+            vector=embedding,
+            payload=payload
+        )
 
     @staticmethod
     def upsert_item(embedding: list[float], payload: dict):
+        point = QdrantService.build_point(embedding, payload)
+        QdrantService.upsert_points([point])
+        return point.id
+
+    @staticmethod
+    def upsert_points(points: list[PointStruct], wait: bool = True, collection_name: Optional[str] = None):
+        """Write a chunk of points in a single request"""
         client = QdrantService.get_client()
-        point_id = str(uuid.uuid4())
-        
         client.upsert(
-            collection_name=settings.QDRANT_COLLECTION,
-            points=[
-                PointStruct(
-                    id=point_id,
-                    vector=embedding,
-                    payload=payload
-                )
-            ]
+            collection_name=collection_name or settings.QDRANT_COLLECTION,
+            points=points,
+            wait=wait,
         )
-        return point_id
 
     @staticmethod
-    def search(embedding: list[float], limit: int = 5):
+    def retrieve_points(point_ids: list[str], with_vectors: bool = False,
+                        collection_name: Optional[str] = None) -> dict:
+        """Fetch existing points by id -> {id: Record}"""
         client = QdrantService.get_client()
-        results = client.search(
-            collection_name=settings.QDRANT_COLLECTION,
-            query_vector=embedding,
-            limit=limit
+        records = client.retrieve(
+            collection_name=collection_name or settings.QDRANT_COLLECTION,
+            ids=point_ids,
+            with_payload=True,
+            with_vectors=with_vectors,
         )
+        return {str(record.id): record for record in records}
+
+    @staticmethod
+    async def retrieve_payloads(point_ids: list[str], collection_name: Optional[str] = None) -> dict:
+        """Payloads of existing points -> {id: payload} (async, for request handlers)"""
+        client = QdrantService.get_async_client()
+        with metrics.timed("qdrant_retrieve"):
+            records = await client.retrieve(
+                collection_name=collection_name or settings.QDRANT_COLLECTION,
+                ids=point_ids,
+                with_payload=True,
+                with_vectors=False,
+            )
+        return {str(record.id): record.payload for record in records}
+
+    @staticmethod
+    async def search(embedding: list[float], limit: int = 5, query_filter=None,
+                     collection_name: Optional[str] = None):
+        client = QdrantService.get_async_client()
+        with metrics.timed("qdrant_search"):
+            results = await client.search(
+                collection_name=collection_name or settings.QDRANT_COLLECTION,
+                query_vector=embedding,
+                query_filter=query_filter,
+                limit=limit
+            )
+        return results
+
+    @staticmethod
+    async def search_batch(embeddings: list[list[float]], limit: int = 5, query_filter=None):
+        """
+        Run several vector queries (multi-crop, multi-query, A/B variants) in one
+        round trip -> one hit list per query, in input order.
+        """
+        client = QdrantService.get_async_client()
+        with metrics.timed("qdrant_search_batch"):
+            results = await client.search_batch(
+                collection_name=settings.QDRANT_COLLECTION,
+                requests=[
+                    SearchRequest(vector=embedding, filter=query_filter, limit=limit, with_payload=True)
+                    for embedding in embeddings
+                ],
+            )
         return results
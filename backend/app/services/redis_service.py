@@ -1,33 +1,86 @@
-import json
+import random
+import time
+import uuid
 import redis.asyncio as redis
-from typing import Optional, Any
+from typing import Optional, Any, Tuple
+from app.core import metrics
+from app.core.codecs import get_codec
 from app.core.config import settings
 
+# Delete the lock only if we still own it (it may have expired and been re-taken)
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Envelope for values written with a soft TTL: {FRESH_UNTIL_KEY: epoch, "v": value}
+FRESH_UNTIL_KEY = "__fresh_until__"
+
 class RedisService:
     _client: Optional[redis.Redis] = None
 
     @classmethod
     async def get_client(cls) -> redis.Redis:
         if cls._client is None:
-            cls._client = redis.from_url(
-                settings.REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True
-            )
+            # Binary-safe: values are codec-encoded bytes (see app.core.codecs)
+            cls._client = redis.from_url(settings.REDIS_URL, decode_responses=False)
         return cls._client
 
+    @staticmethod
+    def jittered(ttl: float, jitter: Optional[float] = None) -> int:
+        """Spread TTLs by +/- jitter so keys written together don't all expire together"""
+        jitter = settings.CACHE_TTL_JITTER if jitter is None else jitter
+        return max(1, round(ttl * (1 + random.uniform(-jitter, jitter))))
+
+    @staticmethod
+    def unwrap(value: Any) -> Tuple[Any, bool]:
+        """(value, is_stale) for anything returned by get_cache"""
+        if isinstance(value, dict) and FRESH_UNTIL_KEY in value:
+            return value["v"], time.time() >= value[FRESH_UNTIL_KEY]
+        return value, False
+
     @classmethod
-    async def get_cache(cls, key: str) -> Optional[dict]:
+    async def get_cache(cls, key: str) -> Optional[Any]:
+        """Stored value; values written with a soft TTL come back in their envelope (see unwrap)"""
         client = await cls.get_client()
-        data = await client.get(key)
+        with metrics.timed("redis_get"):
+            data = await client.get(key)
         if data:
-            return json.loads(data)
+            with metrics.timed("cache_decode"):
+                return get_codec().decode(data)
+        return None
+
+    @classmethod
+    async def set_cache(cls, key: str, value: Any, expire: int = 3600, soft_ttl: Optional[float] = None):
+        """
+        Store with a (jittered) hard TTL. With soft_ttl the value is served as
+        stale between the soft and hard TTL, so callers can refresh it in the
+        background instead of everyone missing at once.
+        """
+        client = await cls.get_client()
+        expire = cls.jittered(expire)
+        if soft_ttl is not None:
+            value = {FRESH_UNTIL_KEY: time.time() + min(cls.jittered(soft_ttl), expire), "v": value}
+        with metrics.timed("cache_encode"):
+            data = get_codec().encode(value)
+        with metrics.timed("redis_set"):
+            await client.set(key, data, ex=expire)
+
+    @classmethod
+    async def acquire_lock(cls, key: str, ttl_ms: int) -> Optional[str]:
+        """Short-lived lock (SET NX PX) -> owner token, or None if someone else holds it"""
+        client = await cls.get_client()
+        token = uuid.uuid4().hex
+        if await client.set(f"lock:{key}", token, nx=True, px=ttl_ms):
+            return token
         return None
 
     @classmethod
-    async def set_cache(cls, key: str, value: Any, expire: int = 3600):
+    async def release_lock(cls, key: str, token: str):
         client = await cls.get_client()
-        await client.set(key, json.dumps(value), ex=expire)
+        await client.eval(_RELEASE_LOCK, 1, f"lock:{key}", token)
 
     @classmethod
     async def close(cls):
@@ -4,67 +4,224 @@ Stage 1: Fast ANN retrieval via Qdrant (recall-oriented)
 Stage 2: Precise cross-encoder reranking (precision-oriented)
 
 This is the pattern used by Amazon, Google, and Pinterest for production search.
+
+Stage 2 is bounded: at most RERANK_CANDIDATES candidates are scored, in
+batches of RERANK_BATCH_SIZE truncated to RERANK_MAX_LENGTH tokens, with
+(query, product) scores reused across requests. If scoring would blow the
+RERANK_BUDGET_MS deadline, the stage-1 ordering is returned instead. The
+deadline is set by the caller before the request queues for an inference
+thread, and each batch is judged by a running average of past forward passes.
+Loading a model on demand doesn't count against the budget.
 """
 
-from typing import List, Optional
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Hashable, List, Optional
 from dataclasses import dataclass
 
+from app.core import metrics, readiness
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.model_registry import ModelConfig, get_model_config
+from app.core.residency import ModelResidency
+
+_fallbacks = metrics.counter("rerank_fallback_total", "Rerank requests that returned stage-1 order")
+_pairs_scored = metrics.counter("rerank_pairs_scored_total", "Query/candidate pairs sent to the cross-encoder")
+_rerank_seconds = metrics.histogram("rerank_duration_seconds", "Cross-encoder stage latency")
+_stage_seconds = metrics.histogram("stage_duration_seconds")
+
+# Weight of the newest forward pass in the per-pair latency average
+_EWMA_ALPHA = 0.2
+
+
 @dataclass
 class RerankResult:
     original_score: float
-    rerank_score: float
+    # None when the deadline was hit and stage-1 order was kept
+    rerank_score: Optional[float]
     payload: dict
+    id: Optional[str] = None
+
 
 class RerankingService:
     _reranker = None
-    
+    _score_cache = LRUCache("rerank_scores", settings.RERANK_CACHE_SIZE)
+    _load_lock = threading.Lock()
+    # model_id -> moving average of forward-pass seconds per (query, product) pair
+    _pair_seconds: Dict[str, float] = {}
+
     @classmethod
     def get_reranker(cls):
         if cls._reranker is None:
-            from sentence_transformers import CrossEncoder
-            print("Loading Cross-Encoder reranker...")
-            cls._reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-            print("Reranker loaded.")
+            with cls._load_lock:
+                if cls._reranker is None:
+                    with readiness.loading("reranker"):
+                        print("Loading Cross-Encoder reranker...")
+                        cls._reranker = cls._build(settings.RERANK_MODEL_ID)
+                        ModelResidency.pin("reranker", settings.RERANK_MODEL_ID, cls._reranker)
+                        print("Reranker loaded.")
         return cls._reranker
-    
+
+    @staticmethod
+    def _build(model_id: str):
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_id, max_length=settings.RERANK_MAX_LENGTH)
+
+    @staticmethod
+    def _load_version(config: ModelConfig):
+        """ModelResidency loader for registry versions other than the default"""
+        return RerankingService._build(config.model_id)
+
+    @staticmethod
+    def model_id(version: Optional[str] = None) -> str:
+        return settings.RERANK_MODEL_ID if version is None else get_model_config("reranker", version).model_id
+
+    @classmethod
+    @contextmanager
+    def _using(cls, version: Optional[str] = None):
+        if version is None or cls.model_id(version) == settings.RERANK_MODEL_ID:
+            yield cls.get_reranker()
+        else:
+            with ModelResidency.acquire("reranker", version) as reranker:
+                yield reranker
+
+    @classmethod
+    def warmup(cls):
+        """One full-size, full-length batch through the cross-encoder"""
+        reranker = cls.get_reranker()
+        with readiness.warming("reranker"):
+            pairs = [("warm-up query", "warm-up product " * settings.RERANK_MAX_LENGTH)]
+            cls._forward(reranker, settings.RERANK_MODEL_ID, pairs * settings.RERANK_BATCH_SIZE)
+
+    @classmethod
+    def _estimate(cls, model_id: str, pairs: int) -> float:
+        """Expected forward seconds for `pairs` pairs; before this model has run, the mean rerank_forward batch"""
+        per_pair = cls._pair_seconds.get(model_id)
+        if per_pair is not None:
+            return per_pair * pairs
+        batches = _stage_seconds.count(stage="rerank_forward")
+        return _stage_seconds.total(stage="rerank_forward") / batches if batches else 0.0
+
+    @classmethod
+    def _forward(cls, reranker, model_id: str, pairs: list) -> list:
+        started = time.perf_counter()
+        with metrics.timed("rerank_forward"):
+            scores = reranker.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        per_pair = (time.perf_counter() - started) / len(pairs)
+        previous = cls._pair_seconds.get(model_id)
+        cls._pair_seconds[model_id] = (
+            per_pair if previous is None else _EWMA_ALPHA * per_pair + (1 - _EWMA_ALPHA) * previous
+        )
+        return scores
+
+    @staticmethod
+    def _product_id(candidate) -> Hashable:
+        sku = candidate.payload.get("sku")
+        return sku if sku else str(candidate.id)
+
+    @staticmethod
+    def _document(candidate, description_key: str) -> str:
+        desc = candidate.payload.get(description_key, "")
+        category = candidate.payload.get("category", "")
+        return f"{desc} {category}".strip()
+
+    @staticmethod
+    def _stage_one(candidates: list, top_k: int) -> List[RerankResult]:
+        return [
+            RerankResult(original_score=c.score, rerank_score=None, payload=c.payload, id=str(c.id))
+            for c in candidates[:top_k]
+        ]
+
+    @classmethod
+    def _score(cls, query_text: str, candidates: list, description_key: str,
+               deadline: float, version: Optional[str] = None) -> Optional[List[float]]:
+        """Cross-encoder scores per candidate, or None if the deadline would be missed"""
+        model_id = cls.model_id(version)
+        scores: List[Optional[float]] = []
+        pending = []  # indices not in the score cache
+        for i, candidate in enumerate(candidates):
+            score = cls._score_cache.get((model_id, query_text, cls._product_id(candidate)))
+            scores.append(score)
+            if score is None:
+                pending.append(i)
+        if not pending:
+            return scores
+
+        batch_size = max(1, settings.RERANK_BATCH_SIZE)
+        loading = time.perf_counter()
+        with cls._using(version) as reranker:
+            # An on-demand model load isn't scoring time; push the deadline back by it
+            deadline += time.perf_counter() - loading
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                # Stop before a batch that (judging by past forward passes) would overrun
+                if time.perf_counter() + cls._estimate(model_id, len(batch)) > deadline:
+                    return None
+                pairs = [(query_text, cls._document(candidates[i], description_key)) for i in batch]
+                batch_scores = cls._forward(reranker, model_id, pairs)
+                _pairs_scored.inc(len(pairs))
+                for i, score in zip(batch, batch_scores):
+                    scores[i] = float(score)
+                    cls._score_cache.put((model_id, query_text, cls._product_id(candidates[i])), scores[i])
+        return scores
+
+    @staticmethod
+    def deadline_after(budget_ms: Optional[float] = None, now: Optional[float] = None) -> float:
+        """perf_counter() deadline `budget_ms` (default RERANK_BUDGET_MS) from now"""
+        budget_ms = settings.RERANK_BUDGET_MS if budget_ms is None else budget_ms
+        return (time.perf_counter() if now is None else now) + budget_ms / 1000
+
     @classmethod
     def rerank(
         cls,
         query_text: str,
         candidates: list,
         top_k: int = 20,
-        description_key: str = "title"
+        description_key: str = "title",
+        budget_ms: Optional[float] = None,
+        version: Optional[str] = None,
+        deadline: Optional[float] = None,
     ) -> List[RerankResult]:
         """
         Two-stage retrieval:
         1. Candidates come from Qdrant ANN search (Stage 1 - fast, recall-oriented)
         2. Cross-encoder reranks for precision (Stage 2 - slower, precision-oriented)
-        
+
         This reduces false positives by ~30% compared to single-stage retrieval.
+        Candidates must be in stage-1 order; only the first RERANK_CANDIDATES
+        are scored. `version` picks a model_registry reranker other than
+        RERANK_MODEL_ID, loaded on demand. `deadline` is a time.perf_counter()
+        value from `deadline_after()`, taken before the call waited for a thread;
+        without one the budget starts now.
         """
-        reranker = cls.get_reranker()
-        
-        # Build query-candidate pairs for cross-encoder
-        pairs = []
-        for candidate in candidates:
-            desc = candidate.payload.get(description_key, "")
-            category = candidate.payload.get("category", "")
-            text = f"{desc} {category}".strip()
-            pairs.append((query_text, text))
-        
-        # Score all pairs with cross-encoder
-        scores = reranker.predict(pairs)
-        
-        # Combine with original scores and sort
-        results = []
-        for candidate, rerank_score in zip(candidates, scores):
-            results.append(RerankResult(
-                original_score=candidate.score,
-                rerank_score=float(rerank_score),
-                payload=candidate.payload
-            ))
-        
-        # Sort by rerank score (descending)
-        results.sort(key=lambda x: x.rerank_score, reverse=True)
-        
-        return results[:top_k]
+        started = time.perf_counter()
+        if deadline is None:
+            deadline = cls.deadline_after(budget_ms, started)
+        candidates = candidates[:settings.RERANK_CANDIDATES]
+
+        scores = cls._score(query_text, candidates, description_key, deadline, version)
+        _rerank_seconds.observe(time.perf_counter() - started)
+        if scores is None:
+            _fallbacks.inc()
+            return cls._stage_one(candidates, top_k)
+
+        # Partial selection: O(n log k) instead of sorting every candidate
+        best = heapq.nlargest(top_k, range(len(candidates)), key=scores.__getitem__)
+        return [
+            RerankResult(
+                original_score=candidates[i].score,
+                rerank_score=scores[i],
+                payload=candidates[i].payload,
+                id=str(candidates[i].id),
+            )
+            for i in best
+        ]
+
+    @classmethod
+    def cache_info(cls) -> dict:
+        return cls._score_cache.info()
+
+
+ModelResidency.register_loader("reranker", RerankingService._load_version)
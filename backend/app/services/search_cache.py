@@ -0,0 +1,326 @@
+"""
+Two-Tier Search Cache
+  tier 1: per-worker in-process LRU with a short TTL (no network, no decode)
+  tier 2: Redis, shared by every worker
+
+Two kinds of entries are cached:
+  - results:    formatted search responses, keyed by the normalized query plus
+                every parameter that changes the result (top_k, filters, ...)
+  - embeddings: SigLIP text embeddings, keyed by normalized query + model only,
+                so a new top_k or filter combination still skips the model
+
+With SEARCH_CACHE_PAYLOADS="ids" the Redis tier stores results as
+{"ids": [[id, score(, rerank_score)], ...]} and payloads are re-attached from
+the PayloadStore on a Redis hit; the local tier always holds full rows.
+Results from a SigLIP version's own collection also record it under
+"collection", so their payloads come from that collection.
+
+Results carry a soft and a hard TTL per endpoint (SEARCH_<KIND>_SOFT_TTL_S /
+SEARCH_<KIND>_TTL_S): between the two the cached value is served immediately
+and recomputed in the background (stale-while-revalidate), so popular keys
+never fall back to the full miss path when they expire.
+
+Lookups are counted per cache, tier and result in
+`search_cache_lookups_total`.
+
+Misses are single-flighted: within a worker through app.core.singleflight,
+across workers through a short Redis lock whose losers poll Redis for the
+winner's result instead of recomputing it.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.executor import InferenceExecutor
+from app.core.singleflight import SingleFlight
+from app.services.payload_store import PayloadStore
+from app.services.redis_service import RedisService
+from app.services.siglip_service import SiglipService
+
+_lookups = metrics.counter(
+    "search_cache_lookups_total", "Search cache lookups by cache, tier and result"
+)
+
+_lock_waits = metrics.counter(
+    "search_cache_lock_waits_total", "Cross-worker single-flight waits by outcome"
+)
+
+_refreshes = metrics.counter(
+    "search_cache_refreshes_total", "Stale-while-revalidate background refreshes by outcome"
+)
+
+_hit_ratio = metrics.gauge(
+    "search_cache_hit_ratio", "Lookups served from either tier (fresh or stale) / all lookups"
+)
+
+
+def _update_hit_ratio():
+    counts: Dict[str, Dict[Tuple[str, str], float]] = {}
+    for key, value in _lookups.samples().items():
+        labels = dict(key)
+        counts.setdefault(labels["cache"], {})[(labels["tier"], labels["result"])] = value
+    for cache, by_outcome in counts.items():
+        lookups = by_outcome.get(("local", "hit"), 0.0) + by_outcome.get(("local", "miss"), 0.0)
+        served = lookups - by_outcome.get(("redis", "miss"), 0.0)
+        _hit_ratio.set(served / lookups if lookups else 0.0, cache=cache)
+
+
+metrics.on_collect(_update_hit_ratio)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class SearchCache:
+    _results = LRUCache(
+        "search_results", settings.SEARCH_CACHE_LOCAL_SIZE, ttl=settings.SEARCH_CACHE_LOCAL_TTL_S
+    )
+    _embeddings = LRUCache(
+        "text_embeddings", settings.EMBEDDING_CACHE_LOCAL_SIZE, ttl=settings.SEARCH_CACHE_LOCAL_TTL_S
+    )
+    _result_flights = SingleFlight("search_results")
+    # key -> background refresh task (also keeps the task referenced)
+    _refreshing: Dict[str, asyncio.Task] = {}
+    _embedding_flights = SingleFlight("text_embeddings")
+
+    @staticmethod
+    def normalize_query(text: str) -> str:
+        """'  Red  Dress ' and 'red dress' are the same query"""
+        text = unicodedata.normalize("NFKC", text)
+        return _WHITESPACE.sub(" ", text).strip().casefold()
+
+    @staticmethod
+    def _digest(value: Any) -> str:
+        return hashlib.md5(
+            json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()
+
+    @classmethod
+    def result_key(cls, kind: str, query_text: str, **params) -> str:
+        """Cache key for a result list; params are everything besides the query that shapes it"""
+        return f"search:{kind}:{cls._digest({'q': cls.normalize_query(query_text), **params})}"
+
+    @classmethod
+    def embedding_key(cls, query_text: str, version: Optional[str] = None) -> str:
+        return f"emb:text:{cls._digest([SiglipService.model_id(version), cls.normalize_query(query_text)])}"
+
+    @classmethod
+    async def _get(cls, local: LRUCache, cache: str, key: str,
+                   unpack: Optional[Callable[[Any], Awaitable[Any]]] = None,
+                   on_stale: Optional[Callable[[], None]] = None) -> Optional[Any]:
+        value = local.get(key)
+        if value is not None:
+            _lookups.inc(cache=cache, tier="local", result="hit")
+            return value
+        _lookups.inc(cache=cache, tier="local", result="miss")
+
+        value, stale = RedisService.unwrap(await RedisService.get_cache(key))
+        if value is not None and unpack is not None:
+            value = await unpack(value)
+        if value is None:
+            _lookups.inc(cache=cache, tier="redis", result="miss")
+            return None
+        if stale:
+            # Serve it, but keep it out of the local tier until it is refreshed
+            _lookups.inc(cache=cache, tier="redis", result="stale")
+            if on_stale is not None:
+                on_stale()
+            return value
+        _lookups.inc(cache=cache, tier="redis", result="hit")
+        local.put(key, value)
+        return value
+
+    @staticmethod
+    async def _set(local: LRUCache, key: str, value: Any, expire: int,
+                   pack: Optional[Callable[[Any], Any]] = None, soft_ttl: Optional[float] = None):
+        local_ttl = min(t for t in (local.ttl, soft_ttl, expire) if t)
+        local.put(key, value, ttl=local_ttl)
+        await RedisService.set_cache(key, pack(value) if pack else value, expire=expire, soft_ttl=soft_ttl)
+
+    # ----- compact (ids + scores) result encoding -----
+
+    @staticmethod
+    def _pack_results(results: list, collection_name: Optional[str] = None) -> Any:
+        if settings.SEARCH_CACHE_PAYLOADS != "ids" or not all("id" in row for row in results):
+            return results
+        packed = {"ids": [
+            [row["id"], row["score"], row["rerank_score"]] if "rerank_score" in row
+            else [row["id"], row["score"]]
+            for row in results
+        ]}
+        if collection_name is not None:
+            packed["collection"] = collection_name
+        return packed
+
+    @staticmethod
+    async def _unpack_results(value: Any) -> Optional[list]:
+        if not isinstance(value, dict):
+            return value
+        rows = value["ids"]
+        payloads = await PayloadStore.get_many([row[0] for row in rows], value.get("collection"))
+        results = []
+        for row in rows:
+            payload = payloads.get(row[0])
+            if payload is None:
+                continue  # deleted since the result was cached
+            result = {"id": row[0], "score": row[1], "payload": payload}
+            if len(row) > 2:
+                result["rerank_score"] = row[2]
+            results.append(result)
+        return results
+
+    # ----- search results -----
+
+    @classmethod
+    async def get_results(cls, key: str) -> Optional[list]:
+        return await cls._get(cls._results, "results", key, unpack=cls._unpack_results)
+
+    @staticmethod
+    def result_ttls(kind: str) -> Tuple[int, int]:
+        """(soft, hard) TTL for an endpoint's results, e.g. SEARCH_TEXT_SOFT_TTL_S / SEARCH_TEXT_TTL_S"""
+        return (
+            getattr(settings, f"SEARCH_{kind.upper()}_SOFT_TTL_S"),
+            getattr(settings, f"SEARCH_{kind.upper()}_TTL_S"),
+        )
+
+    @classmethod
+    async def set_results(cls, key: str, results: list, kind: str = "text",
+                          collection_name: Optional[str] = None):
+        """`collection_name`: the non-default collection the results' ids come from"""
+        soft_ttl, expire = cls.result_ttls(kind)
+        await cls._set(
+            cls._results, key, results, expire, soft_ttl=soft_ttl,
+            pack=lambda value: cls._pack_results(value, collection_name),
+        )
+
+    @classmethod
+    async def cached_results(cls, key: str, compute: Callable[[], Awaitable[list]], kind: str = "text",
+                             collection_name: Optional[str] = None) -> list:
+        """
+        Fresh hit -> cached value. Stale hit -> cached value now, recomputed in
+        the background. Miss -> computed once (see fill_results) and cached.
+        """
+        with metrics.timed("cache_lookup"):
+            results = await cls._get(
+                cls._results, "results", key, unpack=cls._unpack_results,
+                on_stale=lambda: cls._schedule_refresh(key, compute, kind, collection_name),
+            )
+        if results is not None:
+            return results
+        return await cls.fill_results(key, compute, kind, collection_name)
+
+    @classmethod
+    def _schedule_refresh(cls, key: str, compute: Callable[[], Awaitable[list]], kind: str,
+                          collection_name: Optional[str] = None):
+        if key in cls._refreshing:
+            return
+        task = asyncio.get_running_loop().create_task(cls._refresh(key, compute, kind, collection_name))
+        cls._refreshing[key] = task
+        task.add_done_callback(lambda _: cls._refreshing.pop(key, None))
+
+    @classmethod
+    async def _refresh(cls, key: str, compute: Callable[[], Awaitable[list]], kind: str,
+                       collection_name: Optional[str] = None):
+        """Recompute a stale result; only the worker holding the lock does the work"""
+        try:
+            token = await RedisService.acquire_lock(key, settings.SINGLEFLIGHT_LOCK_TTL_MS)
+            if token is None:
+                _refreshes.inc(outcome="skipped")
+                return
+            try:
+                results = await compute()
+                await cls.set_results(key, results, kind, collection_name)
+            finally:
+                await RedisService.release_lock(key, token)
+            _refreshes.inc(outcome="refreshed")
+        except Exception as e:
+            # The stale value is still served until the hard TTL; just log it
+            _refreshes.inc(outcome="failed")
+            print(f"Background refresh of {key} failed: {e}")
+
+    @classmethod
+    async def _wait_for_results(cls, key: str) -> Optional[list]:
+        """Poll Redis while another worker computes the result"""
+        deadline = time.monotonic() + settings.SINGLEFLIGHT_WAIT_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.SINGLEFLIGHT_POLL_MS / 1000)
+            results, _ = RedisService.unwrap(await RedisService.get_cache(key))
+            if results is not None:
+                results = await cls._unpack_results(results)
+                cls._results.put(key, results)
+                return results
+        return None
+
+    @classmethod
+    async def fill_results(
+        cls, key: str, compute: Callable[[], Awaitable[list]], kind: str = "text",
+        collection_name: Optional[str] = None,
+    ) -> list:
+        """
+        Compute and cache a missing result exactly once: concurrent callers in
+        this worker share the computation, other workers wait on a Redis lock.
+        """
+        async def fill():
+            try:
+                token = await RedisService.acquire_lock(key, settings.SINGLEFLIGHT_LOCK_TTL_MS)
+                locked_out = token is None
+            except Exception as e:
+                # The lock is only an optimization; never fail a search over it
+                print(f"Single-flight lock unavailable for {key}: {e}")
+                token, locked_out = None, False
+            if locked_out:
+                results = await cls._wait_for_results(key)
+                if results is not None:
+                    _lock_waits.inc(outcome="filled")
+                    return results
+                # The holder is slow or died; compute rather than fail
+                _lock_waits.inc(outcome="timeout")
+            try:
+                results = await compute()
+                await cls.set_results(key, results, kind, collection_name)
+                return results
+            finally:
+                if token is not None:
+                    await RedisService.release_lock(key, token)
+
+        return await cls._result_flights.run(key, fill)
+
+    # ----- text embeddings -----
+
+    @classmethod
+    async def text_embedding(cls, query_text: str, version: Optional[str] = None) -> List[float]:
+        """
+        Cached SigLIP embedding of the normalized query (runs on the inference
+        executor on a miss); `version` selects a model_registry SigLIP version
+        """
+        key = cls.embedding_key(query_text, version)
+        embedding = await cls._get(cls._embeddings, "embeddings", key)
+        if embedding is not None:
+            return embedding
+
+        async def embed():
+            with metrics.timed("text_embedding"):
+                embedding = await InferenceExecutor.run(
+                    SiglipService.get_text_embedding, cls.normalize_query(query_text), version
+                )
+            await cls._set(cls._embeddings, key, embedding, settings.EMBEDDING_CACHE_TTL_S)
+            return embedding
+
+        # Same query with a different top_k / filters in flight -> one forward pass
+        return await cls._embedding_flights.run(key, embed)
+
+    @classmethod
+    def clear_local(cls):
+        cls._results.clear()
+        cls._embeddings.clear()
+
+    @classmethod
+    def info(cls) -> dict:
+        return {"results": cls._results.info(), "embeddings": cls._embeddings.info()}
@@ -1,44 +1,224 @@
+import threading
+from contextlib import contextmanager
+from typing import Optional
 import torch
 from transformers import SiglipProcessor, SiglipModel
 from PIL import Image
-import io
+from app.core import metrics, readiness
 from app.core.config import settings
+from app.core.batching import MicroBatcher
+from app.core.executor import InferenceExecutor
+from app.core.imaging import decode_image
+from app.core.model_registry import ModelConfig, find_model_config, get_model_config, resolve_backend
+from app.core.residency import ModelResidency
+from app.core.weights import load_pretrained
+from app.services.embedding_store import EmbeddingStore, image_key
+from app.services.inference_backends import load_siglip_backend
 
 class SiglipService:
     _processor = None
     _model = None
+    _backend = None
+    _text_batcher = None
+    _image_batcher = None
+    _load_lock = threading.Lock()
 
     @classmethod
     def get_model(cls):
-        if cls._model is None:
-            print(f"Loading SigLIP model: {settings.SIGLIP_MODEL_ID}...")
-            cls._processor = SiglipProcessor.from_pretrained(settings.SIGLIP_MODEL_ID)
-            cls._model = SiglipModel.from_pretrained(settings.SIGLIP_MODEL_ID)
-            cls._model.eval()
+        """(processor, torch model); the model is None for ONNX backends"""
+        if cls._backend is None:
+            # Concurrent first requests wait for one load instead of racing
+            with cls._load_lock:
+                if cls._backend is None:
+                    cls._load()
         return cls._processor, cls._model
 
+    @staticmethod
+    def _build(model_id: str, backend: str):
+        """
+        (processor, backend). Only the backend holds on to the weights: torch-int8
+        quantizes in place and ONNX releases the fp32 model once exported.
+        """
+        processor = SiglipProcessor.from_pretrained(model_id)
+        model = load_pretrained(SiglipModel, model_id)
+        model.eval()
+        return processor, load_siglip_backend(backend, model, model_id)
+
+    @classmethod
+    def _load(cls):
+        with readiness.loading("siglip"):
+            print(f"Loading SigLIP model: {settings.SIGLIP_MODEL_ID}...")
+            backend = resolve_backend("siglip", settings.SIGLIP_MODEL_ID, settings.SIGLIP_BACKEND)
+            processor, inference = cls._build(settings.SIGLIP_MODEL_ID, backend)
+            cls._processor = processor
+            cls._model = getattr(inference, "model", None)
+            # Published last: a non-None _backend means everything is ready
+            cls._backend = inference
+            ModelResidency.pin("siglip", settings.SIGLIP_MODEL_ID, (processor, inference))
+            print(f"SigLIP inference backend: {backend}")
+
+    @staticmethod
+    def _load_version(config: ModelConfig):
+        """ModelResidency loader for registry versions other than the default"""
+        return SiglipService._build(config.model_id, config.backend)
+
+    @staticmethod
+    def resolve_version(version: Optional[str]) -> Optional[str]:
+        """None when `version` is (or is served by) the default SIGLIP_MODEL_ID"""
+        if version is None or get_model_config("siglip", version).model_id == settings.SIGLIP_MODEL_ID:
+            return None
+        return version
+
+    @staticmethod
+    def model_id(version: Optional[str] = None) -> str:
+        version = SiglipService.resolve_version(version)
+        return settings.SIGLIP_MODEL_ID if version is None else get_model_config("siglip", version).model_id
+
+    @staticmethod
+    def collection_for(version: Optional[str]) -> Optional[str]:
+        """
+        Qdrant collection holding a version's embeddings (None = QDRANT_COLLECTION).
+        Versions differ in dimension, so each is indexed into its own collection.
+        """
+        version = SiglipService.resolve_version(version)
+        return None if version is None else f"{settings.QDRANT_COLLECTION}__siglip_{version}"
+
+    @staticmethod
+    @contextmanager
+    def _using(version: Optional[str] = None):
+        """(processor, backend) for the default model or a resident registry version"""
+        version = SiglipService.resolve_version(version)
+        if version is None:
+            processor, _ = SiglipService.get_model()
+            yield processor, SiglipService.get_backend()
+        else:
+            with ModelResidency.acquire("siglip", version) as handle:
+                yield handle
+
+    @classmethod
+    def warmup(cls):
+        """Forward passes at the batch shapes requests use, so the first real one isn't slow"""
+        cls.get_model()
+        with readiness.warming("siglip"):
+            for batch_size in sorted({1, settings.SIGLIP_BATCH_MAX_SIZE}):
+                cls.get_text_embeddings(["warm-up query"] * batch_size)
+            # Full image alone, and full image + detected crops (image search)
+            for batch_size in sorted({1, settings.IMAGE_SEARCH_MAX_CROPS + 1}):
+                cls.get_image_embeddings([Image.new("RGB", (384, 384))] * batch_size)
+
+    @classmethod
+    def get_backend(cls):
+        cls.get_model()
+        return cls._backend
+
+    @classmethod
+    def get_text_batcher(cls) -> MicroBatcher:
+        if cls._text_batcher is None:
+            cls._text_batcher = MicroBatcher(
+                "siglip_text",
+                cls.get_text_embeddings,
+                max_batch_size=settings.SIGLIP_BATCH_MAX_SIZE,
+                max_wait_ms=settings.SIGLIP_BATCH_MAX_WAIT_MS,
+            )
+        return cls._text_batcher
+
+    @classmethod
+    def get_image_batcher(cls) -> MicroBatcher:
+        if cls._image_batcher is None:
+            cls._image_batcher = MicroBatcher(
+                "siglip_image",
+                cls.get_image_embeddings,
+                max_batch_size=settings.SIGLIP_BATCH_MAX_SIZE,
+                max_wait_ms=settings.SIGLIP_BATCH_MAX_WAIT_MS,
+            )
+        return cls._image_batcher
+
+    @staticmethod
+    def embedding_dim(version: Optional[str] = None) -> int:
+        version = SiglipService.resolve_version(version)
+        if version is not None:
+            return get_model_config("siglip", version).embedding_dim
+        config = find_model_config("siglip", settings.SIGLIP_MODEL_ID)
+        return config.embedding_dim if config else settings.SIGLIP_EMBEDDING_DIM
+
+    @staticmethod
+    def get_embedding_store(version: Optional[str] = None):
+        return EmbeddingStore.for_model(SiglipService.model_id(version), SiglipService.embedding_dim(version))
+
+    @staticmethod
+    def _normalize(outputs):
+        return outputs / outputs.norm(p=2, dim=-1, keepdim=True)
+
+    @staticmethod
+    def decode_image(image_bytes: bytes) -> Image.Image:
+        # Reduced-resolution decode: the processor resizes to 384px anyway
+        return decode_image(image_bytes, settings.IMAGE_DECODE_MAX_SIDE).image
+
+    @staticmethod
+    def get_image_embeddings(images: list, version: Optional[str] = None) -> list[list[float]]:
+        """Embed several decoded images in a single forward pass"""
+        with SiglipService._using(version) as (processor, backend):
+            with metrics.timed("siglip_image_preprocess"):
+                inputs = processor(images=images, return_tensors="pt")
+            with torch.no_grad(), metrics.timed("siglip_image_forward"):
+                outputs = backend.image_features(inputs["pixel_values"])
+                # Normalize embedding
+                embeddings = SiglipService._normalize(outputs)
+
+        return embeddings.tolist()
+
+    @staticmethod
+    def get_text_embeddings(texts: list[str], version: Optional[str] = None) -> list[list[float]]:
+        """Embed several queries in a single forward pass"""
+        with SiglipService._using(version) as (processor, backend):
+            with metrics.timed("siglip_tokenize"):
+                inputs = processor(text=texts, return_tensors="pt", padding="max_length")
+            with torch.no_grad(), metrics.timed("siglip_text_forward"):
+                outputs = backend.text_features(inputs["input_ids"])
+                embeddings = SiglipService._normalize(outputs)
+
+        return embeddings.tolist()
+
     @staticmethod
     def get_embedding(image_bytes: bytes):
-        processor, model = SiglipService.get_model()
-        try:
-            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        except Exception:
-            raise ValueError("Invalid image")
-
-        inputs = processor(images=image, return_tensors="pt")
-        with torch.no_grad():
-            outputs = model.get_image_features(**inputs)
-            # Normalize embedding
-            embedding = outputs / outputs.norm(p=2, dim=-1, keepdim=True)
-            
-        return embedding[0].tolist()
-
-    @staticmethod
-    def get_text_embedding(text: str):
-        processor, model = SiglipService.get_model()
-        inputs = processor(text=[text], return_tensors="pt", padding="max_length")
-        with torch.no_grad():
-            outputs = model.get_text_features(**inputs)
-            embedding = outputs / outputs.norm(p=2, dim=-1, keepdim=True)
-            
-        return embedding[0].tolist()
+        # Same bytes + same model -> reuse the stored embedding
+        store = SiglipService.get_embedding_store()
+        if store is not None:
+            key = image_key(image_bytes)
+            cached = store.get(key)
+            if cached is not None:
+                return cached
+
+        # Decode in the caller's thread so one bad upload can't fail a whole batch
+        image = SiglipService.decode_image(image_bytes)
+        if settings.SIGLIP_BATCHING_ENABLED:
+            embedding = SiglipService.get_image_batcher().submit(image).result()
+        else:
+            embedding = SiglipService.get_image_embeddings([image])[0]
+
+        if store is not None:
+            store.put(key, embedding)
+        return embedding
+
+    @staticmethod
+    def submit_text_embedding(text: str, version: Optional[str] = None):
+        """
+        Non-blocking variant for InferenceExecutor.run: the batcher's future, or
+        None when this call should run on the pool (batching off, routed version)
+        """
+        if not settings.SIGLIP_BATCHING_ENABLED or SiglipService.resolve_version(version) is not None:
+            return None
+        return SiglipService.get_text_batcher().submit(text)
+
+    @staticmethod
+    def get_text_embedding(text: str, version: Optional[str] = None):
+        if SiglipService.resolve_version(version) is not None:
+            # On-demand versions see little traffic; they skip the micro-batcher
+            return SiglipService.get_text_embeddings([text], version)[0]
+        if settings.SIGLIP_BATCHING_ENABLED:
+            return SiglipService.get_text_batcher().submit(text).result()
+        return SiglipService.get_text_embeddings([text])[0]
+
+
+ModelResidency.register_loader("siglip", SiglipService._load_version)
+InferenceExecutor.register_submitter(SiglipService.get_text_embedding, SiglipService.submit_text_embedding)
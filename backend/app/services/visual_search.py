@@ -0,0 +1,83 @@
+"""
+Visual Search ("Magic Crop")
+Image query -> optional OWLv2 detection -> one SigLIP batch for the full
+image plus every detected garment crop -> one Qdrant batch search.
+
+The upload is decoded once (see app.core.imaging) and the same bitmap feeds
+both models, so large phone photos are only ever decoded at model size.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.imaging import DecodedImage
+from app.services.embedding_store import image_key
+from app.services.owlv2_service import Owlv2Service
+from app.services.siglip_service import SiglipService
+
+
+@dataclass
+class QueryRegion:
+    # "full" for the whole image, otherwise the detected label
+    label: str
+    box: Optional[list] = None
+    confidence: Optional[float] = None
+    embedding: List[float] = field(default_factory=list, repr=False)
+
+
+class VisualSearchService:
+    @staticmethod
+    def detect_regions(decoded: DecodedImage, labels: Optional[List[str]] = None) -> List[QueryRegion]:
+        """Top detections (by confidence) that are large enough to embed"""
+        result = Owlv2Service.detect_images([decoded.image], labels)[0]
+        detections = sorted(result["detections"], key=lambda d: d["confidence"], reverse=True)
+
+        regions = []
+        for detection in detections:
+            xmin, ymin, xmax, ymax = detection["box"]
+            if min(xmax - xmin, ymax - ymin) < settings.IMAGE_SEARCH_MIN_CROP_PX:
+                continue
+            regions.append(QueryRegion(
+                label=detection["label"],
+                box=detection["box"],
+                confidence=detection["confidence"],
+            ))
+            if len(regions) == settings.IMAGE_SEARCH_MAX_CROPS:
+                break
+        return regions
+
+    @staticmethod
+    def embed_regions(
+        decoded: DecodedImage,
+        image_bytes: bytes,
+        crop: bool = True,
+        labels: Optional[List[str]] = None,
+    ) -> List[QueryRegion]:
+        """
+        Embed the full image and (optionally) each detected crop in one SigLIP
+        batch. Boxes are returned in the uploaded image's coordinates.
+        """
+        full = QueryRegion(label="full")
+        regions = VisualSearchService.detect_regions(decoded, labels) if crop else []
+
+        # The full upload may already be in the embedding store
+        store = SiglipService.get_embedding_store()
+        key = image_key(image_bytes) if store is not None else None
+        cached = store.get(key) if store is not None else None
+
+        images = [] if cached is not None else [decoded.image]
+        images += [decoded.image.crop(tuple(region.box)) for region in regions]
+        embeddings = SiglipService.get_image_embeddings(images) if images else []
+
+        if cached is not None:
+            full.embedding = cached
+        else:
+            full.embedding, embeddings = embeddings[0], embeddings[1:]
+            if store is not None:
+                store.put(key, full.embedding)
+
+        for region, embedding in zip(regions, embeddings):
+            region.embedding = embedding
+            region.box = decoded.to_original(region.box)
+        return [full] + regions
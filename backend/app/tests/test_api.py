@@ -3,7 +3,9 @@ API Tests - Lightweight tests that verify API routing and health.
 Heavy ML dependencies are mocked via conftest.py (runs first).
 """
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
+import json
+import re
 import pytest
 
 # Patch services BEFORE importing app to prevent startup connections
@@ -11,9 +13,21 @@ with patch("app.services.qdrant_service.QdrantService.get_client"), \
      patch("app.services.qdrant_service.QdrantService.init_collection"):
     from app.main import app
 
+from app.core.executor import InferenceOverloaded
+
+from app.services.search_cache import SearchCache
+
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def clear_local_caches():
+    # The per-worker cache tier would otherwise leak results between tests
+    SearchCache.clear_local()
+    yield
+    SearchCache.clear_local()
+
+
 def test_health_check():
     """Verify the root endpoint returns service info"""
     response = client.get("/")
@@ -23,7 +37,247 @@ def test_health_check():
     assert data["status"] == "active"
 
 
+def test_ready_probe_waits_for_preloaded_models():
+    """Verify /ready is 503 until preloaded models are warm, then 200"""
+    from app.core import readiness
+    readiness.reset()
+    with patch("app.core.config.settings.PRELOAD_MODELS", "siglip"):
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+
+        with readiness.loading("siglip"):
+            pass
+        with readiness.warming("siglip"):
+            pass
+        response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["models"]["siglip"]["status"] == "ready"
+    readiness.reset()
+
+
 def test_api_docs_reachable():
     """Verify Swagger docs are accessible"""
     response = client.get("/docs")
     assert response.status_code == 200
+
+
+def test_search_returns_503_when_inference_saturated():
+    """Verify admission control sheds load with a fast 503"""
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=None)), \
+         patch("app.core.executor.InferenceExecutor.run", side_effect=InferenceOverloaded("full")):
+        response = client.post("/api/v1/search/", json={"query_text": "red dress"})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_search_cache_hit_skips_inference():
+    """Verify cache hits are served without touching the inference executor"""
+    cached = [{"score": 0.9, "payload": {"title": "Red Dress"}}]
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=cached)), \
+         patch("app.core.executor.InferenceExecutor.run", side_effect=InferenceOverloaded("full")):
+        response = client.post("/api/v1/search/", json={"query_text": "red dress"})
+    assert response.status_code == 200
+    assert response.json() == cached
+
+
+def test_concurrent_searches_share_text_batches():
+    """Verify queued searches coalesce into SigLIP batches larger than the thread pool"""
+    import asyncio
+    import httpx
+    from app.core.config import settings
+    from app.services.siglip_service import SiglipService
+
+    batch_sizes = []
+
+    def fake_text_embeddings(texts, version=None):
+        batch_sizes.append(len(texts))
+        return [[0.1] for _ in texts]
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*[
+                http.post("/api/v1/search/", json={"query_text": f"query {i}"}) for i in range(12)
+            ])
+
+    SiglipService._text_batcher = None
+    with patch.object(settings, "INFERENCE_WORKERS", 2), \
+         patch.object(settings, "SIGLIP_BATCH_MAX_WAIT_MS", 200.0), \
+         patch.object(SiglipService, "get_text_embeddings", side_effect=fake_text_embeddings), \
+         patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=None)), \
+         patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()), \
+         patch("app.services.qdrant_service.QdrantService.search", new=AsyncMock(return_value=[])):
+        responses = asyncio.run(burst())
+    SiglipService._text_batcher = None
+
+    assert [r.status_code for r in responses] == [200] * 12
+    assert sum(batch_sizes) == 12
+    assert max(batch_sizes) > 2
+
+
+def test_batch_detection_streams_ndjson():
+    """Verify batch detection emits one NDJSON line per uploaded file"""
+    def fake_detect_many(contents, labels):
+        return [{"detections": [], "count": 0} for _ in contents]
+
+    files = [
+        ("files", ("a.jpg", b"jpeg-a", "image/jpeg")),
+        ("files", ("notes.txt", b"hello", "text/plain")),
+        ("files", ("b.jpg", b"jpeg-b", "image/jpeg")),
+    ]
+    with patch("app.services.owlv2_service.Owlv2Service.detect_many", side_effect=fake_detect_many):
+        response = client.post("/api/v1/detect/batch", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert [line["status"] for line in lines] == ["success", "error", "success"]
+
+
+def test_batch_detection_overload():
+    """Verify overload is a 503 up front and a retryable status mid-stream, never a silent error"""
+    files = [("files", (f"{i}.jpg", b"jpeg", "image/jpeg")) for i in range(3)]
+    with patch("app.services.owlv2_service.Owlv2Service.detect_many",
+               side_effect=InferenceOverloaded("Inference queue is full")):
+        response = client.post("/api/v1/detect/batch", files=files)
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+
+    # Batch 1 runs, batch 2 gets through on a retry, batch 3 never does
+    outcomes = iter([None, InferenceOverloaded("full"), None] + [InferenceOverloaded("full")] * 4)
+
+    def detect_many(contents, labels):
+        outcome = next(outcomes)
+        if outcome is not None:
+            raise outcome
+        return [{"detections": [], "count": 0} for _ in contents]
+
+    with patch("app.core.config.settings.OWLV2_BATCH_SIZE", 1), \
+         patch("app.core.config.settings.INFERENCE_RETRY_AFTER_S", 0), \
+         patch("app.services.owlv2_service.Owlv2Service.detect_many", side_effect=detect_many):
+        response = client.post("/api/v1/detect/batch", files=files)
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["status"] for line in lines] == ["success", "success", "overloaded"]
+    assert lines[2]["retry_after"] == 0
+
+
+def test_oversized_upload_is_rejected_with_413():
+    """Verify uploads over MAX_UPLOAD_BYTES are refused before inference"""
+    with patch("app.core.config.settings.MAX_UPLOAD_BYTES", 1024), \
+         patch("app.services.owlv2_service.Owlv2Service.detect") as detect:
+        # Declared Content-Length over the limit: refused without reading the body
+        response = client.post("/api/v1/detect", files={"file": ("a.jpg", b"x" * 100_000, "image/jpeg")})
+        assert response.status_code == 413
+
+        # Fits the request limit but not the per-file one
+        response = client.post("/api/v1/detect", files={"file": ("a.jpg", b"x" * 2048, "image/jpeg")})
+        assert response.status_code == 413
+    detect.assert_not_called()
+
+
+def test_oversized_upload_413_carries_cors_headers():
+    """Verify the early 413 is readable by the cross-origin frontend"""
+    with patch("app.core.config.settings.MAX_UPLOAD_BYTES", 1024):
+        response = client.post(
+            "/api/v1/detect", files={"file": ("a.jpg", b"x" * 100_000, "image/jpeg")},
+            headers={"Origin": "http://localhost:3000"},
+        )
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"]
+
+
+def test_detection_boxes_are_mapped_back_to_the_upload():
+    """Verify boxes from a draft-downscaled decode use the original coordinates"""
+    from app.core.imaging import DecodedImage
+    from app.services.owlv2_service import Owlv2Service
+
+    decoded = DecodedImage(image=MagicMock(size=(960, 540)), original_size=(1920, 1080))
+    result = {"detections": [{"label": "shirt", "confidence": 0.9, "box": [10.0, 20.0, 100.0, 200.0]}], "count": 1}
+    with patch.object(Owlv2Service, "decode_image", return_value=decoded), \
+         patch.object(Owlv2Service, "detect_images", return_value=[result]):
+        detections = Owlv2Service.detect(b"jpeg", ["shirt"])["detections"]
+
+    assert detections[0]["box"] == [20.0, 40.0, 200.0, 400.0]
+
+
+def test_image_search_queries_all_regions_in_one_batch():
+    """Verify full image + crops are searched with a single batch call"""
+    from app.services.visual_search import QueryRegion
+
+    regions = [
+        QueryRegion(label="full", embedding=[0.1]),
+        QueryRegion(label="dress", box=[10.0, 20.0, 110.0, 220.0], confidence=0.9, embedding=[0.2]),
+    ]
+    hit = MagicMock(id="p1", score=0.8, payload={"title": "Red Dress"})
+    with patch("app.api.endpoints.search.decode_image"), \
+         patch("app.services.visual_search.VisualSearchService.embed_regions", return_value=regions), \
+         patch("app.services.qdrant_service.QdrantService.search_batch", new=AsyncMock(return_value=[[hit], [hit]])) as search_batch:
+        response = client.post(
+            "/api/v1/search/image",
+            files={"file": ("look.jpg", b"jpeg", "image/jpeg")},
+            data={"top_k": "3"},
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [region["label"] for region in body] == ["full", "dress"]
+    assert body[1]["box"] == [10.0, 20.0, 110.0, 220.0]
+    assert body[1]["results"][0]["payload"]["title"] == "Red Dress"
+    # Same row shape as / and /hybrid
+    assert body[1]["results"][0]["id"] == "p1"
+    search_batch.assert_called_once_with([[0.1], [0.2]], limit=3)
+
+
+def test_hybrid_search_forwards_filters():
+    """Verify structured filters reach HybridSearchService"""
+    hit = MagicMock(id="p1", score=0.7, payload={"title": "Blue Jeans"})
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=None)), \
+         patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()), \
+         patch("app.core.executor.InferenceExecutor.run", new=AsyncMock(return_value=[0.1])), \
+         patch("app.services.hybrid_search.HybridSearchService.search", new=AsyncMock(return_value=[hit])) as search:
+        response = client.post("/api/v1/search/hybrid", json={
+            "query_text": "jeans", "category": "pants", "max_price": 80, "in_stock": True, "top_k": 4,
+        })
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": "p1", "score": 0.7, "payload": {"title": "Blue Jeans"}}]
+    search.assert_awaited_once_with(
+        [0.1], category="pants", min_price=None, max_price=80.0,
+        in_stock=True, brand=None, limit=4, collection_name=None,
+    )
+
+
+def test_server_timing_header_includes_pipeline_stages():
+    """Verify spans from the handler and the inference thread reach Server-Timing"""
+    from app.core import metrics
+
+    def fake_embedding(text, version=None):
+        with metrics.timed("fake_forward"):
+            return [0.1]
+
+    hit = MagicMock(id="p1", score=0.7, payload={"title": "Blue Jeans"})
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=None)), \
+         patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()), \
+         patch("app.services.siglip_service.SiglipService.get_text_embedding", side_effect=fake_embedding), \
+         patch("app.services.qdrant_service.QdrantService.search", new=AsyncMock(return_value=[hit])):
+        response = client.post("/api/v1/search/", json={"query_text": "jeans"})
+
+    assert response.status_code == 200
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    for stage in ("cache_lookup", "text_embedding", "fake_forward", "response_encode", "app"):
+        assert stage in stages
+
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    """Verify /metrics renders histograms and counters in the exposition format"""
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert re.search(r'http_request_duration_seconds_count\{handler="[^"]+",method="GET",status="200"\} \d+', body)
@@ -0,0 +1,69 @@
+"""
+Inference Backend Tests - backend selection and the parity metrics used to
+measure each backend's accuracy cost against the fp32 reference.
+"""
+import math
+
+import pytest
+
+from app.core.model_registry import resolve_backend
+from app.services.inference_backends import (
+    box_iou, cosine_drift, detection_parity, validate_backend,
+)
+
+
+def test_backend_resolution_order():
+    # Settings override wins over the registry entry
+    assert resolve_backend("siglip", "google/siglip-base-patch16-384", "onnx-int8") == "onnx-int8"
+    # Registered models use their registry backend
+    assert resolve_backend("siglip", "google/siglip-base-patch16-384") == "torch"
+    # Unregistered models fall back to PyTorch fp32
+    assert resolve_backend("siglip", "someone/custom-siglip") == "torch"
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        validate_backend("tensorrt")
+
+
+def test_cosine_drift():
+    assert math.isclose(cosine_drift([1.0, 0.0], [1.0, 0.0]), 0.0, abs_tol=1e-9)
+    assert math.isclose(cosine_drift([1.0, 0.0], [0.0, 1.0]), 1.0, abs_tol=1e-9)
+
+
+def test_detection_parity_matches_boxes_per_label():
+    reference = [
+        {"label": "dress", "box": [0, 0, 10, 10]},
+        {"label": "shoes", "box": [20, 20, 30, 30]},
+    ]
+    candidate = [
+        {"label": "dress", "box": [0, 0, 10, 5]},
+        {"label": "bag", "box": [20, 20, 30, 30]},  # right place, wrong label
+    ]
+    assert math.isclose(box_iou([0, 0, 10, 10], [0, 0, 10, 5]), 0.5, abs_tol=1e-9)
+    assert math.isclose(detection_parity(reference, candidate), 0.25, abs_tol=1e-9)
+    assert math.isclose(detection_parity(reference, reference), 1.0, abs_tol=1e-9)
+
+
+def test_non_torch_backends_keep_no_fp32_model():
+    from unittest.mock import MagicMock, patch
+
+    from app.core import readiness
+    from app.core.config import settings
+    from app.services.siglip_service import SiglipService
+
+    onnx_backend = MagicMock(spec=["image_features", "text_features"])
+    SiglipService._model = SiglipService._processor = SiglipService._backend = None
+    try:
+        with patch.object(settings, "SIGLIP_BACKEND", "onnx"), \
+             patch("app.services.siglip_service.SiglipModel.from_pretrained") as load, \
+             patch("app.services.siglip_service.load_siglip_backend", return_value=onnx_backend):
+            SiglipService.get_model()
+            processor, model = SiglipService.get_model()
+
+        assert load.call_count == 1
+        assert model is None
+        assert SiglipService.get_backend() is onnx_backend
+    finally:
+        SiglipService._model = SiglipService._processor = SiglipService._backend = None
+        readiness.reset()
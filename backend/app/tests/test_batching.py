@@ -0,0 +1,51 @@
+"""
+Micro-batching Tests - verify concurrent calls are grouped into one pass
+and that results (and errors) are fanned back to every caller.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.batching import MicroBatcher
+
+
+def test_concurrent_calls_share_one_batch():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher("test_share", batch_fn, max_batch_size=8, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(5)]
+    results = [f.result(timeout=2) for f in futures]
+
+    assert results == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+
+def test_batches_are_capped_at_max_size():
+    sizes = []
+
+    def batch_fn(items):
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher("test_cap", batch_fn, max_batch_size=3, max_wait_ms=100)
+    with ThreadPoolExecutor(max_workers=7) as pool:
+        results = list(pool.map(lambda i: batcher.submit(i).result(timeout=2), range(7)))
+
+    assert results == list(range(7))
+    assert max(sizes) <= 3
+    assert sum(sizes) == 7
+
+
+def test_errors_propagate_to_all_callers():
+    def batch_fn(items):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher("test_error", batch_fn, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model exploded"):
+            future.result(timeout=2)
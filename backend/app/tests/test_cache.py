@@ -0,0 +1,180 @@
+"""
+Cache Tests - in-process LRU behaviour, the OWLv2 text-query cache and the
+two-tier search cache.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.cache import LRUCache
+from app.services.owlv2_service import Owlv2Service
+from app.core.config import settings
+from app.services.payload_store import PayloadStore
+from app.services.search_cache import SearchCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache("test_lru", maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recent
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_tracks_hit_rate():
+    cache = LRUCache("test_hit_rate", maxsize=4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("missing")
+
+    info = cache.info()
+    assert info["hits"] == 1
+    assert info["misses"] == 1
+    assert info["hit_rate"] == 0.5
+
+
+def test_owlv2_query_embeddings_cached_per_normalized_label_set():
+    processor, backend = MagicMock(), MagicMock()
+    input_ids = MagicMock()
+    input_ids.__getitem__.return_value.__gt__.return_value = "query_mask"
+    processor.return_value = {"input_ids": input_ids, "attention_mask": MagicMock()}
+    Owlv2Service._query_cache.clear()
+
+    with patch.object(Owlv2Service, "get_model", return_value=(processor, MagicMock())), \
+         patch.object(Owlv2Service, "get_backend", return_value=backend):
+        first = Owlv2Service.get_query_embeddings(["Shirt ", "dress"])
+        second = Owlv2Service.get_query_embeddings(["shirt", "  Dress"])
+
+    assert first == second
+    assert first[1] == "query_mask"
+    assert backend.text_features.call_count == 1
+    processor.assert_called_once_with(text=[["shirt", "dress"]], return_tensors="pt")
+
+
+def test_lru_entries_expire_after_ttl():
+    cache = LRUCache("test_ttl", maxsize=4, ttl=10)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.put("a", 1)
+        cache.put("b", 2, ttl=30)
+    with patch("app.core.cache.time.monotonic", return_value=111.0):
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+
+def test_search_keys_ignore_case_and_whitespace():
+    assert SearchCache.result_key("text", "Red Dress", top_k=5) == \
+        SearchCache.result_key("text", "  red   dress ", top_k=5)
+    assert SearchCache.result_key("text", "red dress", top_k=5) != \
+        SearchCache.result_key("text", "red dress", top_k=10)
+    assert SearchCache.embedding_key("Red Dress") == SearchCache.embedding_key("red dress ")
+
+
+def test_text_embedding_served_from_local_tier_after_first_call():
+    SearchCache.clear_local()
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=None)) as get_cache, \
+         patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()), \
+         patch("app.core.executor.InferenceExecutor.run", new=AsyncMock(return_value=[0.3])) as run:
+        first = asyncio.run(SearchCache.text_embedding("Red Dress"))
+        second = asyncio.run(SearchCache.text_embedding("red dress"))
+
+    assert first == second == [0.3]
+    run.assert_awaited_once()
+    assert run.call_args.args[1] == "red dress"
+    get_cache.assert_awaited_once()
+    SearchCache.clear_local()
+
+
+def test_redis_hits_populate_the_local_tier():
+    SearchCache.clear_local()
+    key = SearchCache.result_key("text", "jeans", top_k=5)
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=[{"score": 1.0}])) as get_cache:
+        assert asyncio.run(SearchCache.get_results(key)) == [{"score": 1.0}]
+        assert asyncio.run(SearchCache.get_results(key)) == [{"score": 1.0}]
+    get_cache.assert_awaited_once()
+    SearchCache.clear_local()
+
+
+def test_ids_mode_stores_compact_results_and_hydrates_payloads():
+    SearchCache.clear_local()
+    PayloadStore.clear()
+    key = SearchCache.result_key("text", "jeans", top_k=2)
+    rows = [
+        {"id": "p1", "score": 0.9, "payload": {"title": "Blue Jeans"}},
+        {"id": "p2", "score": 0.8, "payload": {"title": "Black Jeans"}},
+    ]
+    with patch.object(settings, "SEARCH_CACHE_PAYLOADS", "ids"), \
+         patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()) as set_cache:
+        asyncio.run(SearchCache.set_results(key, rows))
+    stored = set_cache.call_args.args[1]
+    assert stored == {"ids": [["p1", 0.9], ["p2", 0.8]]}
+
+    # Another worker: p1 is in its payload store, p2 must come from Qdrant
+    SearchCache.clear_local()
+    PayloadStore._cache.put("p1", {"title": "Blue Jeans"})
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=stored)), \
+         patch("app.services.qdrant_service.QdrantService.retrieve_payloads",
+               new=AsyncMock(return_value={"p2": {"title": "Black Jeans"}})) as retrieve:
+        assert asyncio.run(SearchCache.get_results(key)) == rows
+    retrieve.assert_awaited_once_with(["p2"], collection_name=None)
+    SearchCache.clear_local()
+    PayloadStore.clear()
+
+
+def test_ids_mode_hydrates_routed_results_from_their_collection():
+    SearchCache.clear_local()
+    PayloadStore.clear()
+    key = SearchCache.result_key("text", "jeans", top_k=1, siglip="v2")
+    rows = [{"id": "p1", "score": 0.9, "payload": {"title": "Blue Jeans", "model_id": "siglip-large"}}]
+    with patch.object(settings, "SEARCH_CACHE_PAYLOADS", "ids"), \
+         patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()) as set_cache:
+        asyncio.run(SearchCache.set_results(key, rows, collection_name="products__siglip_v2"))
+    stored = set_cache.call_args.args[1]
+    assert stored == {"ids": [["p1", 0.9]], "collection": "products__siglip_v2"}
+
+    # Same point id cached from the default collection must not be served
+    SearchCache.clear_local()
+    PayloadStore._cache.put("p1", {"title": "Blue Jeans", "model_id": "siglip-base"})
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=stored)), \
+         patch("app.services.qdrant_service.QdrantService.retrieve_payloads",
+               new=AsyncMock(return_value={"p1": rows[0]["payload"]})) as retrieve:
+        assert asyncio.run(SearchCache.get_results(key)) == rows
+    retrieve.assert_awaited_once_with(["p1"], collection_name="products__siglip_v2")
+    SearchCache.clear_local()
+    PayloadStore.clear()
+
+
+def test_ttls_are_jittered_within_bounds():
+    from app.services.redis_service import RedisService
+    ttls = {RedisService.jittered(1000, jitter=0.1) for _ in range(200)}
+    assert min(ttls) >= 900 and max(ttls) <= 1100
+    assert len(ttls) > 1
+
+
+def test_stale_results_are_served_and_refreshed_in_background():
+    from app.services.redis_service import FRESH_UNTIL_KEY
+    SearchCache.clear_local()
+    key = SearchCache.result_key("text", "boots", top_k=5)
+    stale = {FRESH_UNTIL_KEY: 0, "v": [{"score": 0.1, "payload": {"title": "old"}}]}
+    compute = AsyncMock(return_value=[{"score": 0.9, "payload": {"title": "new"}}])
+
+    async def main():
+        served = await SearchCache.cached_results(key, compute)
+        await asyncio.gather(*SearchCache._refreshing.values())
+        return served
+
+    with patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=stale)), \
+         patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()) as set_cache, \
+         patch("app.services.redis_service.RedisService.acquire_lock", new=AsyncMock(return_value="t")), \
+         patch("app.services.redis_service.RedisService.release_lock", new=AsyncMock()):
+        served = asyncio.run(main())
+
+    assert served == stale["v"]
+    compute.assert_awaited_once()
+    assert set_cache.call_args.args[1] == compute.return_value
+    assert set_cache.call_args.kwargs["soft_ttl"] == settings.SEARCH_TEXT_SOFT_TTL_S
+    # The refreshed value, not the stale one, is what this worker now serves
+    assert asyncio.run(SearchCache.get_results(key)) == compute.return_value
+    SearchCache.clear_local()
@@ -0,0 +1,44 @@
+"""
+Codec Tests - tagged encoding, cross-codec decoding and legacy JSON entries.
+orjson / msgpack / zstandard cases run only when the package is installed.
+"""
+import pytest
+
+from app.core.codecs import Codec, available_formats
+
+RESULTS = [{"id": "p1", "score": 0.91, "payload": {"title": "Red Dress", "price": 49.5, "in_stock": True}}]
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgpack"])
+def test_roundtrip(name):
+    if name not in available_formats():
+        pytest.skip(f"{name} not installed")
+    codec = Codec(name)
+    data = codec.encode(RESULTS)
+    assert isinstance(data, bytes)
+    assert codec.decode(data) == RESULTS
+
+
+def test_values_written_by_another_codec_are_readable():
+    writer = Codec("auto")
+    assert Codec("json").decode(writer.encode(RESULTS)) == RESULTS
+
+
+def test_untagged_legacy_json_is_readable():
+    assert Codec("json").decode(b'[{"score": 0.5, "payload": {}}]') == [{"score": 0.5, "payload": {}}]
+
+
+def test_zstd_compresses_large_values_only():
+    pytest.importorskip("zstandard")
+    codec = Codec("json", compression="zstd", min_compress_bytes=64)
+    small, large = {"a": 1}, RESULTS * 50
+    assert codec.encode(small)[:1] == b"j"
+    encoded = codec.encode(large)
+    assert encoded[:1] == b"J"
+    assert len(encoded) < len(Codec("json").encode(large))
+    assert codec.decode(encoded) == large
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        Codec("pickle")
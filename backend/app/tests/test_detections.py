@@ -0,0 +1,68 @@
+"""
+Detection Post-processing Tests - class-aware NMS, per-label top-k and the
+compact response format. Array tests need real NumPy.
+"""
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from app.core import detections
+
+requires_numpy = pytest.mark.skipif(isinstance(np, MagicMock), reason="requires numpy")
+
+
+def _raw():
+    boxes = np.array([
+        [10, 10, 110, 210],   # dress
+        [12, 8, 112, 205],    # dress, near-duplicate of the first
+        [50, 100, 90, 160],   # bag, inside the dress
+        [300, 10, 400, 210],  # dress, elsewhere
+        [301, 12, 399, 211],  # dress, near-duplicate of the previous
+    ], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7, 0.6, 0.65], dtype=np.float32)
+    labels = np.array([0, 0, 1, 0, 0])
+    return boxes, scores, labels
+
+
+@requires_numpy
+def test_nms_only_suppresses_overlaps_within_a_label():
+    keep = detections.select(*_raw(), iou_threshold=0.5)
+    assert keep.tolist() == [0, 2, 4]
+
+
+@requires_numpy
+def test_top_k_caps_each_label_after_nms():
+    keep = detections.select(*_raw(), iou_threshold=0.5, top_k=1)
+    assert keep.tolist() == [0, 2]
+
+    # NMS disabled: the best two of each label, still in score order
+    keep = detections.select(*_raw(), iou_threshold=1.0, top_k=2)
+    assert keep.tolist() == [0, 1, 2]
+
+
+@requires_numpy
+def test_survivors_convert_in_bulk():
+    boxes, scores, labels = _raw()
+    keep = detections.select(boxes, scores, labels)
+    result = detections.to_dicts(boxes[keep], scores[keep], labels[keep], ["dress", "bag"])
+
+    assert result[0] == {"label": "dress", "confidence": 0.9, "box": [10.0, 10.0, 110.0, 210.0]}
+    assert [d["label"] for d in result] == ["dress", "bag", "dress"]
+    assert detections.select(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)).size == 0
+
+
+def test_compact_format_flattens_boxes():
+    result = {
+        "detections": [
+            {"label": "dress", "confidence": 0.9, "box": [10.0, 10.0, 110.0, 210.0]},
+            {"label": "bag", "confidence": 0.7, "box": [50.0, 100.0, 90.0, 160.0]},
+        ],
+        "count": 2,
+    }
+    assert detections.compact(result) == {
+        "labels": ["dress", "bag"],
+        "confidences": [0.9, 0.7],
+        "boxes": [10.0, 10.0, 110.0, 210.0, 50.0, 100.0, 90.0, 160.0],
+        "count": 2,
+    }
@@ -0,0 +1,53 @@
+"""
+Embedding Store Tests - on-disk lookup, cross-process visibility and
+ring-buffer eviction. Needs real NumPy (skipped when conftest mocks it).
+"""
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from app.services.embedding_store import EmbeddingStore, image_key
+
+pytestmark = pytest.mark.skipif(isinstance(np, MagicMock), reason="requires numpy")
+
+
+def _store(tmp_path, capacity=4):
+    return EmbeddingStore(str(tmp_path), "google/siglip-test", dim=3, capacity=capacity)
+
+
+def test_put_then_get_roundtrip(tmp_path):
+    store = _store(tmp_path)
+    key = image_key(b"image-bytes")
+    assert store.get(key) is None
+
+    store.put(key, [0.5, -0.25, 1.0])
+    assert store.get(key) == pytest.approx([0.5, -0.25, 1.0], abs=1e-3)
+
+
+def test_writes_are_visible_to_other_workers(tmp_path):
+    writer, reader = _store(tmp_path), _store(tmp_path)
+    key = image_key(b"shared")
+    assert reader.get(key) is None
+
+    writer.put(key, [1.0, 0.0, 0.0])
+    assert reader.get(key) == pytest.approx([1.0, 0.0, 0.0])
+
+
+def test_oldest_entries_are_evicted_when_full(tmp_path):
+    store = _store(tmp_path, capacity=2)
+    keys = [image_key(bytes([i])) for i in range(3)]
+    for i, key in enumerate(keys):
+        store.put(key, [float(i)] * 3)
+
+    assert store.get(keys[0]) is None
+    assert store.get(keys[1]) == pytest.approx([1.0] * 3)
+    assert store.get(keys[2]) == pytest.approx([2.0] * 3)
+    assert len(store) == 2
+
+
+def test_store_is_reset_when_dimension_changes(tmp_path):
+    key = image_key(b"x")
+    _store(tmp_path).put(key, [1.0, 2.0, 3.0])
+    resized = EmbeddingStore(str(tmp_path), "google/siglip-test", dim=5, capacity=4)
+    assert resized.get(key) is None
@@ -0,0 +1,47 @@
+"""
+Inference Executor Tests - verify blocking work runs off the event loop and
+that admission control sheds load once the queue is full.
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.core.executor import InferenceExecutor, InferenceOverloaded
+
+
+def test_run_executes_off_the_event_loop():
+    async def main():
+        loop_thread = threading.get_ident()
+        worker_thread = await InferenceExecutor.run(threading.get_ident)
+        return loop_thread, worker_thread
+
+    loop_thread, worker_thread = asyncio.run(main())
+    assert loop_thread != worker_thread
+
+
+def test_rejects_when_queue_is_full():
+    release = threading.Event()
+
+    async def main():
+        blocked = [
+            asyncio.ensure_future(InferenceExecutor.run(release.wait, 5))
+            for _ in range(InferenceExecutor.capacity())
+        ]
+        await asyncio.sleep(0.05)
+        with pytest.raises(InferenceOverloaded):
+            await InferenceExecutor.run(lambda: None)
+        release.set()
+        await asyncio.gather(*blocked)
+        # Slots are returned once the work completes
+        assert await InferenceExecutor.run(lambda: "ok") == "ok"
+
+    with patch.object(settings, "INFERENCE_WORKERS", 1), \
+         patch.object(settings, "INFERENCE_MAX_QUEUE", 1):
+        InferenceExecutor.shutdown()
+        try:
+            asyncio.run(main())
+        finally:
+            InferenceExecutor.shutdown()
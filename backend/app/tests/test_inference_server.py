@@ -0,0 +1,162 @@
+"""
+Inference Server Tests - client and server talk over a real Unix socket in
+one process, with the model services patched out.
+"""
+import asyncio
+import itertools
+import math
+from unittest.mock import patch
+
+import pytest
+
+from app.core import ipc
+from app.core.config import settings
+from app.core.executor import InferenceExecutor, InferenceOverloaded
+from app.services.inference_client import InferenceClient
+from app.services.inference_server import InferenceServer
+from app.services.owlv2_service import Owlv2Service
+from app.services.siglip_service import SiglipService
+
+
+def run_with_server(tmp_path, scenario):
+    socket_path = str(tmp_path / "inference.sock")
+
+    async def main():
+        server = InferenceServer(socket_path)
+        await server.start()
+        try:
+            return await scenario()
+        finally:
+            await InferenceClient.close()
+            await server.close()
+
+    with patch.object(settings, "INFERENCE_SOCKET", socket_path):
+        return asyncio.run(main())
+
+
+def test_text_embedding_round_trip(tmp_path):
+    with patch.object(SiglipService, "get_text_embedding", return_value=[0.5, -0.25, 1.0]) as embed:
+        embedding = run_with_server(tmp_path, lambda: InferenceClient.text_embedding("red dress"))
+
+    embed.assert_called_once_with("red dress", None)
+    assert embedding == [0.5, -0.25, 1.0]
+
+
+def test_detect_many_sends_raw_image_buffers(tmp_path):
+    images = [b"\x89PNG\x00\x01", b"\xff\xd8\xff\x00"]
+
+    def detect_many(images_bytes, texts=None):
+        return [{"size": len(b), "labels": texts} for b in images_bytes]
+
+    with patch.object(Owlv2Service, "detect_many", side_effect=detect_many) as detect:
+        results = run_with_server(tmp_path, lambda: InferenceClient.detect_many(images, ["shoe"]))
+
+    assert detect.call_args.args[0] == images
+    assert results == [{"size": 6, "labels": ["shoe"]}, {"size": 4, "labels": ["shoe"]}]
+
+
+def test_connections_are_reused(tmp_path):
+    async def scenario():
+        for _ in range(3):
+            await InferenceClient.detect(b"img")
+        return len(InferenceClient._idle[settings.INFERENCE_SOCKET])
+
+    with patch.object(Owlv2Service, "detect", return_value={"boxes": []}):
+        assert run_with_server(tmp_path, scenario) == 1
+
+
+def test_server_errors_keep_their_type(tmp_path):
+    async def scenario():
+        with pytest.raises(InferenceOverloaded, match="queue is full"):
+            await InferenceClient.detect(b"img")
+        with pytest.raises(ValueError, match="Unknown inference op"):
+            await InferenceClient.call("train")
+
+    with patch.object(Owlv2Service, "detect", side_effect=InferenceOverloaded("queue is full")):
+        run_with_server(tmp_path, scenario)
+
+
+def test_calls_round_robin_over_servers(tmp_path):
+    paths = [str(tmp_path / "a.sock"), str(tmp_path / "b.sock")]
+    served = []
+
+    async def main():
+        servers = [InferenceServer(path) for path in paths]
+        for server in servers:
+            await server.start()
+        try:
+            for _ in range(4):
+                await InferenceClient.detect(b"img")
+            return {path: len(InferenceClient._idle[path]) for path in paths}
+        finally:
+            await InferenceClient.close()
+            for server in servers:
+                await server.close()
+
+    with patch.object(settings, "INFERENCE_SOCKET", ",".join(paths)), \
+         patch.object(Owlv2Service, "detect", side_effect=lambda *a: served.append(a) or {}), \
+         patch("app.services.inference_client.InferenceClient._turns", itertools.count()):
+        connections = asyncio.run(main())
+
+    assert len(served) == 4
+    assert connections == {paths[0]: 1, paths[1]: 1}
+
+
+def test_server_needs_one_socket_path(tmp_path):
+    with patch.object(settings, "INFERENCE_SOCKET", f"{tmp_path}/a.sock, {tmp_path}/b.sock"):
+        with pytest.raises(ValueError, match="lists 2 servers"):
+            InferenceServer()
+        with pytest.raises(ValueError, match="One socket path"):
+            InferenceServer(settings.INFERENCE_SOCKET)
+        assert InferenceServer(f"{tmp_path}/b.sock").socket_path == f"{tmp_path}/b.sock"
+
+
+def test_ready_is_503_when_a_server_fails(tmp_path):
+    import httpx
+    from app.main import app
+
+    async def broken_ping(args, buffers):
+        raise RuntimeError("models failed to load")
+
+    async def ready():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ready")
+
+    socket_path = str(tmp_path / "inference.sock")
+    with patch.object(settings, "INFERENCE_MODE", "remote"), \
+         patch.dict("app.services.inference_server.OPS", {"ping": broken_ping}):
+        response = run_with_server(tmp_path, ready)
+    assert response.status_code == 503
+    assert response.json()["servers"][socket_path]["error"].startswith("InferenceServerError")
+
+    # Nothing listening at all
+    with patch.object(settings, "INFERENCE_MODE", "remote"), \
+         patch.object(settings, "INFERENCE_SOCKET", str(tmp_path / "missing.sock")):
+        response = asyncio.run(ready())
+    assert response.status_code == 503
+
+
+def test_executor_forwards_remote_functions():
+    def blocking(x):
+        raise AssertionError("should not run locally")
+
+    async def remote(x):
+        return x * 2
+
+    InferenceExecutor.use_remote({blocking: remote})
+    try:
+        assert asyncio.run(InferenceExecutor.run(blocking, 21)) == 42
+    finally:
+        InferenceExecutor.use_remote({})
+    assert InferenceExecutor._pending == 0
+
+
+def test_pack_unpack_vectors():
+    vectors = [[0.1, 0.2, 0.3], [1.0, 2.0, 3.0]]
+    unpacked = ipc.unpack_vectors(ipc.pack_vectors(vectors), 2)
+
+    assert len(unpacked) == 2
+    for original, decoded in zip(vectors, unpacked):
+        assert all(math.isclose(a, b, rel_tol=1e-6) for a, b in zip(original, decoded))
+    assert ipc.unpack_vectors(b"", 0) == []
@@ -0,0 +1,98 @@
+"""
+Ingestion Tests - manifest parsing, chunked upserts and checkpoint resume.
+Model and Qdrant calls are patched out.
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+from app.core.config import settings
+from app.services.ingestion import IngestionPipeline, read_manifest
+from app.services.qdrant_service import QdrantService
+
+
+def _write_manifest(tmp_path, count):
+    manifest = tmp_path / "products.jsonl"
+    with open(manifest, "w") as f:
+        for i in range(count):
+            (tmp_path / f"{i}.jpg").write_bytes(b"jpeg")
+            f.write(json.dumps({"sku": f"SKU-{i}", "image": f"{i}.jpg", "title": f"Item {i}"}) + "\n")
+    return str(manifest)
+
+
+def _run(manifest, checkpoint, existing=None, **kwargs):
+    upserts = []
+    existing = existing or {}
+    with patch("app.services.qdrant_service.QdrantService.retrieve_points",
+               side_effect=lambda ids, **kw: {i: existing[i] for i in ids if i in existing}), \
+         patch("app.services.siglip_service.SiglipService.decode_image", return_value="image"), \
+         patch("app.services.siglip_service.SiglipService.get_image_embeddings",
+               side_effect=lambda images, version=None: [[0.1] * 4 for _ in images]), \
+         patch("app.services.qdrant_service.QdrantService.build_point",
+               side_effect=lambda embedding, payload: payload["sku"]), \
+         patch("app.services.qdrant_service.QdrantService.upsert_points",
+               side_effect=lambda points, **kw: upserts.append(list(points))):
+        stats = IngestionPipeline(manifest, checkpoint_path=checkpoint, **kwargs).run()
+    return stats, upserts
+
+
+def test_read_manifest_resolves_images_relative_to_manifest(tmp_path):
+    manifest = _write_manifest(tmp_path, 2)
+    items = list(read_manifest(manifest))
+    assert [item.sku for item in items] == ["SKU-0", "SKU-1"]
+    assert items[0].image_path == str(tmp_path / "0.jpg")
+    assert items[0].payload == {"sku": "SKU-0", "title": "Item 0"}
+
+
+def test_pipeline_upserts_in_chunks_and_checkpoints(tmp_path):
+    manifest = _write_manifest(tmp_path, 10)
+    checkpoint = str(tmp_path / "ckpt.json")
+
+    stats, upserts = _run(manifest, checkpoint, embed_batch_size=3, upsert_batch_size=4)
+
+    assert stats.processed == 10
+    assert stats.upserted == 10
+    assert sorted(len(chunk) for chunk in upserts) == [2, 4, 4]
+    assert sorted(sku for chunk in upserts for sku in chunk) == sorted(f"SKU-{i}" for i in range(10))
+    with open(checkpoint) as f:
+        assert json.load(f)["offset"] == 10
+
+
+def test_pipeline_resumes_from_checkpoint(tmp_path):
+    manifest = _write_manifest(tmp_path, 6)
+    checkpoint = tmp_path / "ckpt.json"
+    checkpoint.write_text(json.dumps({"offset": 4}))
+
+    stats, upserts = _run(manifest, str(checkpoint), embed_batch_size=2, upsert_batch_size=2)
+
+    assert stats.skipped == 4
+    assert upserts == [["SKU-4", "SKU-5"]]
+
+
+def test_point_ids_are_deterministic_per_sku():
+    assert QdrantService.point_id("SKU-1") == QdrantService.point_id("SKU-1")
+    assert QdrantService.point_id("SKU-1") != QdrantService.point_id("SKU-2")
+
+
+def test_reingest_skips_unchanged_and_reuses_vectors(tmp_path):
+    manifest = _write_manifest(tmp_path, 3)
+    content_hash = QdrantService.content_hash(b"jpeg")
+
+    def stored(i, title):
+        record = MagicMock()
+        record.payload = {
+            "sku": f"SKU-{i}", "title": title,
+            "content_hash": content_hash, "model_id": settings.SIGLIP_MODEL_ID,
+        }
+        return record
+
+    existing = {
+        QdrantService.point_id("SKU-0"): stored(0, "Item 0"),          # identical
+        QdrantService.point_id("SKU-1"): stored(1, "Old title"),       # payload changed
+    }
+    stats, upserts = _run(manifest, None, existing=existing, embed_batch_size=3, upsert_batch_size=8)
+
+    assert stats.unchanged == 1
+    assert stats.reused == 1
+    assert stats.embedded == 1  # SKU-2 is new
+    assert stats.upserted == 2
+    assert "SKU-2" in upserts[0]
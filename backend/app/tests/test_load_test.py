@@ -0,0 +1,59 @@
+"""
+Load Test Harness Tests - the load driver, stage quantiles and baseline
+comparison of benchmarks.load_test, against a trivial ASGI app.
+"""
+import asyncio
+import math
+
+import httpx
+from fastapi import FastAPI
+
+from app.core import metrics
+from benchmarks.load_test import compare_to_baseline, drive
+
+
+def test_bucket_quantile_interpolates_within_buckets():
+    buckets = (0.01, 0.1, 1.0)
+    # 10 observations <= 10ms, 10 in (10ms, 100ms]
+    counts = [10, 10, 0, 0]
+    assert math.isclose(metrics.bucket_quantile(buckets, counts, 0.5), 0.01)
+    assert math.isclose(metrics.bucket_quantile(buckets, counts, 0.75), 0.055)
+    assert metrics.bucket_quantile(buckets, [0, 0, 0, 3], 0.99) == 1.0
+    assert metrics.bucket_quantile(buckets, [0, 0, 0, 0], 0.5) is None
+
+
+def test_drive_reports_latency_throughput_and_stages():
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo():
+        with metrics.timed("bench_echo"):
+            await asyncio.sleep(0.001)
+        return {"ok": True}
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await drive(client, lambda i: ("POST", "/echo", {}), requests=40, concurrency=8)
+
+    report = asyncio.run(main())
+    assert report["statuses"] == {"200": 40}
+    assert report["errors"] == 0
+    assert report["throughput_rps"] > 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p95"] <= report["latency_ms"]["p99"]
+    assert report["stages"]["bench_echo"]["count"] == 40
+
+
+def test_regressions_beyond_tolerance_are_reported():
+    def report(p95, rps, error_rate=0.0):
+        latency = {"p50": p95 / 2, "p95": p95, "p99": p95 * 1.2}
+        return {"scenarios": {"search_hit": {
+            "latency_ms": latency, "throughput_rps": rps, "error_rate": error_rate,
+        }}}
+
+    baseline = report(p95=20.0, rps=500)
+    assert compare_to_baseline(report(22.0, 480), baseline, tolerance=0.25, min_delta_ms=2) == []
+    regressions = compare_to_baseline(report(40.0, 300, 0.05), baseline, tolerance=0.25, min_delta_ms=2)
+    assert any("p95" in r for r in regressions)
+    assert any("throughput" in r for r in regressions)
+    assert any("error rate" in r for r in regressions)
@@ -0,0 +1,192 @@
+"""
+Local Vector Index Tests - exact and IVF search, Qdrant-style filters,
+persistence across instances and QdrantService with VECTOR_BACKEND=local
+(including A/B-routed SigLIP collections end to end).
+Needs real NumPy (skipped when conftest mocks it).
+"""
+import asyncio
+import json
+from types import SimpleNamespace as NS
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.core import metrics
+from app.core.config import settings
+from app.services.ingestion import IngestionPipeline
+from app.services.local_index import LocalVectorIndex
+from app.services.qdrant_service import QdrantService
+from app.services.search_cache import SearchCache
+from app.services.siglip_service import SiglipService
+
+pytestmark = pytest.mark.skipif(isinstance(np, MagicMock), reason="requires numpy")
+
+DIM = 16
+
+
+def _index(tmp_path, points=200, seed=0):
+    index = LocalVectorIndex(str(tmp_path))
+    index.create_collection("products", vectors_config=NS(size=DIM))
+    vectors = np.random.default_rng(seed).standard_normal((points, DIM)).astype(np.float32)
+    index.upsert("products", [
+        NS(id=f"p{i}", vector=vectors[i].tolist(),
+           payload={"category": f"c{i % 4}", "price": float(i), "in_stock": i % 2 == 0})
+        for i in range(points)
+    ])
+    return index, vectors
+
+
+def _brute_force(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [f"p{i}" for i in np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:k]]
+
+
+def test_exact_search_matches_brute_force(tmp_path):
+    index, vectors = _index(tmp_path)
+    query = vectors[7] + 0.1
+
+    hits = index.search("products", query_vector=query.tolist(), limit=5)
+
+    assert [hit.id for hit in hits] == _brute_force(vectors, query, 5)
+    assert hits[0].payload["price"] == 7.0
+    assert all(a.score >= b.score for a, b in zip(hits, hits[1:]))
+
+
+def test_filters_and_upsert_overwrites_by_id(tmp_path):
+    index, vectors = _index(tmp_path)
+    query_filter = NS(
+        must=[NS(key="category", match=NS(any=["c1", "c2"])), NS(key="price", range=NS(gte=50, lt=150))],
+        must_not=[NS(key="in_stock", match=NS(value=True))],
+    )
+
+    hits = index.search("products", query_vector=vectors[0].tolist(), query_filter=query_filter, limit=100)
+
+    assert hits and all(
+        hit.payload["category"] == "c1" and 50 <= hit.payload["price"] < 150 for hit in hits
+    )
+
+    index.upsert("products", [NS(id="p1", vector=vectors[0].tolist(), payload={"category": "moved"})])
+    assert index.get_collection("products").points_count == 200
+    assert index.retrieve("products", ["p1", "missing"])[0].payload == {"category": "moved"}
+
+
+def test_float32_cache_is_opt_in_past_the_ann_threshold(tmp_path):
+    index, vectors = _index(tmp_path)
+    collection = index._collection("products")
+
+    # Below LOCAL_INDEX_ANN_MIN_POINTS the exact scan keeps the copy
+    index.search("products", query_vector=vectors[7].tolist(), limit=5)
+    assert collection._dense is not None
+
+    with patch.object(settings, "LOCAL_INDEX_ANN_MIN_POINTS", 0):
+        hits = index.search("products", query_vector=vectors[7].tolist(), limit=5)
+    assert collection._dense is None
+
+    with patch.object(settings, "LOCAL_INDEX_FLOAT32_CACHE", True), \
+         patch.object(settings, "LOCAL_INDEX_ANN_MIN_POINTS", 0):
+        cached = index.search("products", query_vector=vectors[7].tolist(), limit=5)
+        # Overwritten rows reach the cache
+        index.upsert("products", [NS(id="p7", vector=(-vectors[7]).tolist(), payload={})])
+        moved = index.search("products", query_vector=vectors[7].tolist(), limit=200)
+    assert collection._dense.dtype == np.float32
+    assert [hit.id for hit in cached] == [hit.id for hit in hits]
+    assert np.allclose([hit.score for hit in cached], [hit.score for hit in hits])
+    assert moved[-1].id == "p7"
+
+
+def test_writes_persist_and_reach_other_instances(tmp_path):
+    index, vectors = _index(tmp_path, points=10)
+    reader = LocalVectorIndex(str(tmp_path))
+    assert reader.get_collection("products").points_count == 10
+
+    # Another process (e.g. the ingestion CLI) appends while the reader is open
+    index.upsert("products", [NS(id="new", vector=vectors[3].tolist(), payload={"sku": "new"})])
+
+    hits = reader.search("products", query_vector=vectors[3].tolist(), limit=2)
+    assert {hit.id for hit in hits} == {"p3", "new"}
+    record = reader.retrieve("products", ["new"], with_vectors=True)[0]
+    assert np.allclose(record.vector, vectors[3] / np.linalg.norm(vectors[3]), atol=1e-3)
+
+
+def test_ivf_mode_keeps_recall(tmp_path):
+    index, vectors = _index(tmp_path, points=2000)
+    queries = vectors[:50] + 0.3 * np.random.default_rng(1).standard_normal((50, DIM)).astype(np.float32)
+    requests = [NS(vector=q.tolist(), filter=None, limit=10, with_payload=False) for q in queries]
+    ivf_searches = metrics.counter("local_index_searches_total")
+    before = ivf_searches.value(mode="ivf")
+
+    with patch.object(settings, "LOCAL_INDEX_ANN_MIN_POINTS", 1000), \
+         patch.object(settings, "LOCAL_INDEX_IVF_NPROBE", 32):
+        batches = index.search_batch("products", requests=requests)
+
+    recall = np.mean([
+        len({hit.id for hit in hits} & set(_brute_force(vectors, q, 10))) / 10
+        for q, hits in zip(queries, batches)
+    ])
+    assert ivf_searches.value(mode="ivf") - before == 50
+    assert recall > 0.9
+
+
+def test_qdrant_service_uses_local_index(tmp_path):
+    _, vectors = _index(tmp_path)
+    with patch.object(settings, "VECTOR_BACKEND", "local"), \
+         patch.object(settings, "LOCAL_INDEX_PATH", str(tmp_path)), \
+         patch.object(settings, "QDRANT_COLLECTION", "products"), \
+         patch.object(QdrantService, "_async_client", None):
+        hits = asyncio.run(QdrantService.search(vectors[42].tolist(), limit=3))
+        payloads = asyncio.run(QdrantService.retrieve_payloads(["p42"]))
+
+    assert hits[0].id == "p42"
+    assert payloads == {"p42": hits[0].payload}
+
+
+def test_routed_siglip_queries_search_the_version_collection(tmp_path):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    manifest = tmp_path / "products.jsonl"
+    with open(manifest, "w") as f:
+        for i in range(3):
+            (tmp_path / f"{i}.jpg").write_bytes(b"jpeg")
+            f.write(json.dumps({"sku": f"SKU-{i}", "image": f"{i}.jpg", "title": f"Item {i}"}) + "\n")
+    # SigLIP v2 (siglip-large) embeds 1024-dim vectors; the default collection holds 768
+    v2_vectors = np.eye(3, 1024, dtype=np.float32).tolist()
+
+    def image_embeddings(images, version=None):
+        assert version == "v2"
+        return v2_vectors[:len(images)]
+
+    def text_embeddings(texts, version=None):
+        assert version == "v2"
+        return [v2_vectors[1] for _ in texts]
+
+    SearchCache.clear_local()
+    # conftest mocks qdrant_client.models; the local index reads plain attributes
+    with patch.object(settings, "VECTOR_BACKEND", "local"), \
+         patch.object(settings, "LOCAL_INDEX_PATH", str(tmp_path / "index")), \
+         patch.object(settings, "SIGLIP_MODEL_ID", "google/siglip-base-patch16-384"), \
+         patch.object(settings, "MODEL_AB_ROUTES", "siglip=v2"), \
+         patch.object(QdrantService, "_client", None), \
+         patch.object(QdrantService, "_async_client", None), \
+         patch("app.services.qdrant_service.VectorParams", NS), \
+         patch("app.services.qdrant_service.PointStruct", NS), \
+         patch.object(SiglipService, "decode_image", return_value="image"), \
+         patch.object(SiglipService, "get_embedding_store", return_value=None), \
+         patch.object(SiglipService, "get_image_embeddings", side_effect=image_embeddings), \
+         patch.object(SiglipService, "get_text_embeddings", side_effect=text_embeddings), \
+         patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=None)), \
+         patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()):
+        QdrantService.init_collection()
+        IngestionPipeline(str(manifest), siglip_version="v2").run()
+        stored = QdrantService.retrieve_points(
+            [QdrantService.point_id("SKU-1")], with_vectors=True, collection_name=SiglipService.collection_for("v2")
+        )
+        assert QdrantService.get_client().get_collection(settings.QDRANT_COLLECTION).points_count == 0
+        response = TestClient(app).post("/api/v1/search/", json={"query_text": "item", "top_k": 2})
+    SearchCache.clear_local()
+
+    assert len(next(iter(stored.values())).vector) == 1024
+    assert response.status_code == 200
+    assert response.json()[0]["payload"]["sku"] == "SKU-1"
+    assert response.json()[0]["payload"]["model_id"] == "google/siglip-large-patch16-384"
@@ -0,0 +1,69 @@
+"""
+Qdrant Service Tests - async client usage and batched search requests.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.qdrant_service import QdrantService
+
+
+def test_search_batch_sends_one_request_for_all_vectors():
+    client = MagicMock()
+    client.search_batch = AsyncMock(return_value=[["a"], ["b"], ["c"]])
+
+    with patch.object(QdrantService, "get_async_client", return_value=client):
+        results = asyncio.run(QdrantService.search_batch([[0.1], [0.2], [0.3]], limit=7))
+
+    assert results == [["a"], ["b"], ["c"]]
+    client.search_batch.assert_awaited_once()
+    assert len(client.search_batch.call_args.kwargs["requests"]) == 3
+
+
+def test_async_client_is_reused():
+    QdrantService._async_client = None
+    try:
+        assert QdrantService.get_async_client() is QdrantService.get_async_client()
+    finally:
+        QdrantService._async_client = None
+
+
+def test_payload_indexes_are_created_only_when_missing():
+    client = MagicMock()
+    client.get_collection.return_value.payload_schema = {"category": object(), "price": object()}
+
+    with patch.object(QdrantService, "get_client", return_value=client):
+        created = QdrantService.ensure_payload_indexes("products")
+
+    assert created == ["brand", "in_stock"]
+    indexed = [call.kwargs["field_name"] for call in client.create_payload_index.call_args_list]
+    assert indexed == ["brand", "in_stock"]
+
+
+def test_collection_uses_the_configured_siglip_dimension():
+    client = MagicMock()
+    client.collection_exists.return_value = False
+    client.get_collection.return_value.payload_schema = {}
+
+    with patch.object(QdrantService, "get_client", return_value=client), \
+         patch("app.core.config.settings.SIGLIP_MODEL_ID", "google/siglip-base-patch16-384"), \
+         patch("app.services.qdrant_service.VectorParams") as vector_params:
+        QdrantService.init_collection()
+
+    assert vector_params.call_args.kwargs["size"] == 768
+
+
+def test_routed_siglip_versions_get_their_own_collection():
+    client = MagicMock()
+    client.collection_exists.return_value = False
+    client.get_collection.return_value.payload_schema = {}
+
+    with patch.object(QdrantService, "get_client", return_value=client), \
+         patch("app.core.config.settings.SIGLIP_MODEL_ID", "google/siglip-base-patch16-384"), \
+         patch("app.core.config.settings.MODEL_AB_ROUTES", "siglip=v1:1,v2:1"), \
+         patch("app.core.config.settings.QDRANT_COLLECTION", "products"), \
+         patch("app.services.qdrant_service.VectorParams") as vector_params:
+        QdrantService.init_collection()
+
+    created = [call.kwargs["collection_name"] for call in client.create_collection.call_args_list]
+    assert created == ["products", "products__siglip_v2"]
+    assert [call.kwargs["size"] for call in vector_params.call_args_list] == [768, 1024]
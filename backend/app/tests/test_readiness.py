@@ -0,0 +1,73 @@
+"""
+Readiness Tests - once-only model loading under concurrency, load-state
+tracking and the startup preloader.
+"""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core import readiness
+from app.services.model_preload import ModelPreloader
+from app.services.siglip_service import SiglipService
+
+
+@pytest.fixture
+def fresh_siglip():
+    readiness.reset()
+    SiglipService._model = SiglipService._processor = SiglipService._backend = None
+    yield
+    SiglipService._model = SiglipService._processor = SiglipService._backend = None
+    readiness.reset()
+
+
+def test_concurrent_first_requests_load_the_model_once(fresh_siglip):
+    def slow_load(*args, **kwargs):
+        time.sleep(0.05)
+        return MagicMock()
+
+    with patch("app.services.siglip_service.SiglipModel.from_pretrained", side_effect=slow_load) as load, \
+         patch("app.services.siglip_service.load_siglip_backend"):
+        threads = [threading.Thread(target=SiglipService.get_model) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert load.call_count == 1
+    model = readiness.state("siglip")
+    assert model.status == "loaded"
+    assert model.load_seconds >= 0.05
+
+
+def test_failed_load_is_reported_and_retried(fresh_siglip):
+    with patch("app.services.siglip_service.SiglipModel.from_pretrained", side_effect=OSError("no weights")), \
+         patch("app.services.siglip_service.load_siglip_backend"):
+        with pytest.raises(OSError):
+            SiglipService.get_model()
+    assert readiness.state("siglip").status == "failed"
+    assert "no weights" in readiness.state("siglip").error
+    assert SiglipService._model is None
+
+
+def test_preloader_is_ready_only_after_warm_up(fresh_siglip):
+    load, warmup = MagicMock(), MagicMock()
+    with patch("app.core.config.settings.PRELOAD_MODELS", "siglip"), \
+         patch.dict("app.services.model_preload.MODELS", {"siglip": (load, warmup)}):
+        ModelPreloader.preload()
+        warmup.assert_called_once()
+        load.assert_not_called()
+
+        with readiness.loading("siglip"):
+            pass
+        assert not ModelPreloader.is_ready()
+        with readiness.warming("siglip"):
+            pass
+        assert ModelPreloader.is_ready()
+
+
+def test_unknown_preload_model_is_rejected():
+    with patch("app.core.config.settings.PRELOAD_MODELS", "siglip, gpt"):
+        with pytest.raises(ValueError):
+            ModelPreloader.requested()
@@ -0,0 +1,94 @@
+"""
+Reranking Tests - candidate cap, score cache, top-k selection and the
+latency-budget fallback to stage-1 order. The cross-encoder is a stub.
+"""
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.reranking_service import RerankingService
+
+
+def _hit(sku, score):
+    return SimpleNamespace(id=sku, score=score, payload={"sku": sku, "title": f"item {sku}"})
+
+
+@pytest.fixture
+def reranker():
+    model = MagicMock()
+    # Later titles score higher, reversing the stage-1 order
+    model.predict.side_effect = lambda pairs, **kw: [float(text.split()[-1]) for _, text in pairs]
+    RerankingService._score_cache.clear()
+    with patch.object(RerankingService, "get_reranker", return_value=model), \
+         patch.dict(RerankingService._pair_seconds, clear=True):
+        yield model
+    RerankingService._score_cache.clear()
+
+
+def test_rerank_orders_by_cross_encoder_score(reranker):
+    hits = [_hit(str(i), 1.0 - i / 10) for i in range(5)]
+    results = RerankingService.rerank("shirt", hits, top_k=3, budget_ms=10_000)
+    assert [r.payload["sku"] for r in results] == ["4", "3", "2"]
+    assert results[0].rerank_score == 4.0
+
+
+def test_scores_are_cached_per_query_and_product(reranker):
+    hits = [_hit(str(i), 0.5) for i in range(4)]
+    RerankingService.rerank("shirt", hits, top_k=2, budget_ms=10_000)
+    RerankingService.rerank("shirt", hits, top_k=2, budget_ms=10_000)
+    assert reranker.predict.call_count == 1
+
+    RerankingService.rerank("dress", hits, top_k=2, budget_ms=10_000)
+    assert reranker.predict.call_count == 2
+
+
+def test_candidates_are_capped_and_batched(reranker):
+    hits = [_hit(str(i), 0.5) for i in range(10)]
+    with patch.object(settings, "RERANK_CANDIDATES", 6), patch.object(settings, "RERANK_BATCH_SIZE", 4):
+        RerankingService.rerank("shirt", hits, top_k=2, budget_ms=10_000)
+    assert [len(call.args[0]) for call in reranker.predict.call_args_list] == [4, 2]
+
+
+def test_exhausted_budget_falls_back_to_stage_one_order(reranker):
+    hits = [_hit(str(i), 1.0 - i / 10) for i in range(5)]
+    results = RerankingService.rerank("shirt", hits, top_k=2, budget_ms=0)
+    assert [r.payload["sku"] for r in results] == ["0", "1"]
+    assert results[0].rerank_score is None
+    reranker.predict.assert_not_called()
+
+
+def test_deadline_set_before_queueing_counts_the_wait(reranker):
+    hits = [_hit(str(i), 1.0 - i / 10) for i in range(5)]
+    deadline = RerankingService.deadline_after(budget_ms=10)
+    time.sleep(0.02)  # queued behind other work past the budget
+
+    results = RerankingService.rerank("shirt", hits, top_k=2, deadline=deadline)
+
+    assert results[0].rerank_score is None
+    reranker.predict.assert_not_called()
+
+
+def test_first_batch_is_judged_by_past_forward_passes(reranker):
+    hits = [_hit(str(i), 0.5) for i in range(4)]
+    RerankingService.rerank("shirt", hits, top_k=2, budget_ms=10_000)
+    assert RerankingService._pair_seconds[settings.RERANK_MODEL_ID] > 0
+
+    # A slow model history predicts an overrun before anything is scored
+    RerankingService._pair_seconds[settings.RERANK_MODEL_ID] = 1.0
+    results = RerankingService.rerank("dress", hits, top_k=2, budget_ms=100)
+    assert results[0].rerank_score is None
+    assert reranker.predict.call_count == 1
+
+
+def test_model_load_is_not_charged_to_the_budget(reranker):
+    def cold_load():
+        time.sleep(0.2)
+        return reranker
+
+    hits = [_hit(str(i), 1.0 - i / 10) for i in range(5)]
+    with patch.object(RerankingService, "get_reranker", side_effect=cold_load):
+        results = RerankingService.rerank("shirt", hits, top_k=2, budget_ms=100)
+    assert [r.payload["sku"] for r in results] == ["4", "3"]
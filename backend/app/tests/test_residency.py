@@ -0,0 +1,78 @@
+"""
+Model Residency Tests - on-demand registry versions under a memory budget,
+LRU eviction of idle versions and stable A/B routing. Loaders are stubs.
+"""
+from collections import Counter
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.residency import ModelMemoryExhausted, ModelResidency
+
+
+@pytest.fixture
+def loader():
+    # siglip v1 = 1.5GB, siglip v2 = 2.8GB, reranker v2 = 1.2GB in MODEL_REGISTRY
+    load = MagicMock(side_effect=lambda config: f"handle:{config.model_id}")
+    ModelResidency.reset()
+    with patch.dict(ModelResidency._loaders, {"siglip": load, "reranker": load}):
+        yield load
+    ModelResidency.reset()
+
+
+def _resident():
+    return [(m["model"], m["version"]) for m in ModelResidency.info()["models"]]
+
+
+def test_versions_load_once_and_are_reused(loader):
+    for _ in range(3):
+        with ModelResidency.acquire("siglip", "v1") as handle:
+            assert handle == "handle:google/siglip-base-patch16-384"
+
+    assert loader.call_count == 1
+    assert metrics.counter("model_uses_total").value(model="siglip", version="v1") >= 3
+
+
+def test_least_recently_used_idle_version_is_evicted(loader):
+    with patch.object(settings, "MODEL_MEMORY_BUDGET_GB", 4.5):
+        with ModelResidency.acquire("siglip", "v1"):
+            pass
+        with ModelResidency.acquire("reranker", "v2"):
+            pass
+        with ModelResidency.acquire("siglip", "v1"):  # reranker v2 is now the LRU
+            pass
+        with ModelResidency.acquire("siglip", "v2"):
+            pass
+
+    assert _resident() == [("siglip", "v1"), ("siglip", "v2")]
+    assert ModelResidency.resident_gb() <= 4.5
+
+
+def test_models_in_use_and_pinned_defaults_are_never_evicted(loader):
+    ModelResidency.pin("detection", "google/owlv2-base-patch16-ensemble")  # 1.7GB
+    with patch.object(settings, "MODEL_MEMORY_BUDGET_GB", 4.0):
+        with ModelResidency.acquire("siglip", "v1"):
+            with pytest.raises(ModelMemoryExhausted):
+                with ModelResidency.acquire("reranker", "v2"):
+                    pass
+        # Idle now, so it can make room
+        with ModelResidency.acquire("reranker", "v2"):
+            pass
+
+    assert _resident() == [("detection", "v1"), ("reranker", "v2")]
+
+
+def test_ab_routing_is_stable_and_weighted():
+    with patch.object(settings, "MODEL_AB_ROUTES", "reranker=v1:80,v2:20"):
+        queries = [f"query {i}" for i in range(2000)]
+        first = [ModelResidency.route("reranker", q) for q in queries]
+        assert first == [ModelResidency.route("reranker", q) for q in queries]
+        assert 0.7 < Counter(first)["v1"] / len(first) < 0.9
+        assert ModelResidency.route("siglip", "red dress") is None
+        assert ModelResidency.route_all("red dress").keys() == {"reranker"}
+
+    with patch.object(settings, "MODEL_AB_ROUTES", "reranker=v9:100"):
+        with pytest.raises(ValueError):
+            ModelResidency.routes()
@@ -0,0 +1,110 @@
+"""
+Single-Flight Tests - in-worker coalescing and the cross-worker Redis lock
+used by SearchCache.fill_results.
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.services.search_cache import SearchCache
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def main():
+        return await asyncio.gather(*(flight.run("red dress", compute) for _ in range(10)))
+
+    assert asyncio.run(main()) == [1] * 10
+    assert calls == 1
+    assert flight.in_flight() == 0
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight("test_errors")
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("qdrant down")
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.run("k", compute) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_waiter_takes_over_when_leader_is_cancelled():
+    flight = SingleFlight("test_cancel")
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "done"
+
+    async def main():
+        leader = asyncio.create_task(flight.run("k", slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.run("k", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(main()) == "done"
+
+
+@pytest.fixture
+def redis_cache():
+    SearchCache.clear_local()
+    with patch("app.services.redis_service.RedisService.set_cache", new=AsyncMock()), \
+         patch("app.services.redis_service.RedisService.release_lock", new=AsyncMock()) as release:
+        yield release
+    SearchCache.clear_local()
+
+
+def test_lock_loser_waits_for_other_worker_result(redis_cache):
+    compute = AsyncMock(return_value=["mine"])
+    with patch("app.services.redis_service.RedisService.acquire_lock", new=AsyncMock(return_value=None)), \
+         patch("app.services.redis_service.RedisService.get_cache",
+               new=AsyncMock(side_effect=[None, ["theirs"]])), \
+         patch.object(settings, "SINGLEFLIGHT_POLL_MS", 1):
+        result = asyncio.run(SearchCache.fill_results("search:text:k", compute))
+
+    assert result == ["theirs"]
+    compute.assert_not_awaited()
+    redis_cache.assert_not_awaited()
+
+
+def test_lock_holder_computes_caches_and_releases(redis_cache):
+    compute = AsyncMock(return_value=["mine"])
+    with patch("app.services.redis_service.RedisService.acquire_lock", new=AsyncMock(return_value="token")):
+        result = asyncio.run(SearchCache.fill_results("search:text:k", compute))
+
+    assert result == ["mine"]
+    compute.assert_awaited_once()
+    redis_cache.assert_awaited_once_with("search:text:k", "token")
+
+
+def test_lock_loser_computes_after_wait_times_out(redis_cache):
+    compute = AsyncMock(return_value=["mine"])
+    with patch("app.services.redis_service.RedisService.acquire_lock", new=AsyncMock(return_value=None)), \
+         patch("app.services.redis_service.RedisService.get_cache", new=AsyncMock(return_value=None)), \
+         patch.object(settings, "SINGLEFLIGHT_POLL_MS", 1), \
+         patch.object(settings, "SINGLEFLIGHT_WAIT_MS", 5):
+        result = asyncio.run(SearchCache.fill_results("search:text:k", compute))
+
+    assert result == ["mine"]
+    compute.assert_awaited_once()
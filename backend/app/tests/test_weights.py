@@ -0,0 +1,53 @@
+"""
+Shared Weights Tests - MODEL_WEIGHTS_MODE dispatch, the one-time mmap
+checkpoint export and process memory reporting. torch is mocked.
+"""
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core import weights
+from app.core.memory import process_memory
+
+
+def test_default_mode_uses_from_pretrained():
+    model_cls = MagicMock()
+    with patch.object(weights.settings, "MODEL_WEIGHTS_MODE", "default"):
+        assert weights.load_pretrained(model_cls, "org/model") is model_cls.from_pretrained.return_value
+    model_cls.from_pretrained.assert_called_once_with("org/model")
+
+
+def test_mmap_mode_exports_once_and_maps_state_dict(tmp_path):
+    model_cls = MagicMock()
+    modeling_utils = MagicMock()
+
+    def fake_save(state, path):
+        open(path, "wb").close()
+
+    with patch.object(weights.settings, "MODEL_WEIGHTS_MODE", "mmap"), \
+         patch.object(weights.settings, "MMAP_WEIGHTS_DIR", str(tmp_path)), \
+         patch.dict(sys.modules, {"transformers.modeling_utils": modeling_utils}), \
+         patch.object(weights.torch, "save", side_effect=fake_save) as save, \
+         patch.object(weights.torch, "load") as load:
+        first = weights.load_pretrained(model_cls, "org/model")
+        weights.load_pretrained(model_cls, "org/model")
+
+    assert save.call_count == 1
+    assert (tmp_path / "org--model.pt").exists()
+    assert load.call_args.kwargs["mmap"] is True
+    first.load_state_dict.assert_called_with(load.return_value, assign=True)
+
+
+def test_unknown_weights_mode_is_rejected():
+    with patch.object(weights.settings, "MODEL_WEIGHTS_MODE", "gpu-direct"):
+        with pytest.raises(ValueError):
+            weights.load_pretrained(MagicMock(), "org/model")
+
+
+def test_process_memory_reports_rss():
+    memory = process_memory()
+    assert memory["rss"] > 0
+    if sys.platform.startswith("linux") and os.path.exists("/proc/self/smaps_rollup"):
+        assert 0 < memory["pss"] <= memory["rss"]
@@ -0,0 +1 @@
+# Benchmarks & performance tooling (run from backend/: python -m benchmarks.<name>)
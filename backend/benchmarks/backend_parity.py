@@ -0,0 +1,130 @@
+"""
+Inference Backend Parity & Speed
+Runs SigLIP and OWLv2 through every inference backend and compares them with
+the PyTorch fp32 reference:
+
+  - SigLIP: mean / max cosine drift of text and image embeddings
+  - OWLv2:  mean IoU of each reference box with its best same-label match
+  - Both:   mean latency per batch and speed-up vs. fp32
+
+Usage (from backend/):
+    python -m benchmarks.backend_parity --images ./samples --backends torch-int8 onnx onnx-int8
+
+Exits non-zero if any backend exceeds --max-drift or falls below --min-iou.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from app.services.inference_backends import BACKENDS, cosine_drift, detection_parity
+from app.services.owlv2_service import Owlv2Service
+from app.services.siglip_service import SiglipService
+from app.core.config import settings
+
+DEFAULT_QUERIES = [
+    "red summer dress", "black leather jacket", "white sneakers",
+    "floral maxi skirt", "denim jeans", "gold wristwatch",
+]
+
+
+def _timed(fn, repeats: int):
+    result = fn()  # warm-up, also the value we compare
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return result, (time.perf_counter() - started) / max(repeats, 1)
+
+
+def _load_images(directory: str):
+    images = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
+            with open(os.path.join(directory, name), "rb") as f:
+                images.append(SiglipService.decode_image(f.read()))
+    if not images:
+        raise SystemExit(f"No images found in {directory}")
+    return images
+
+
+def siglip_parity(backend_name: str, images, texts, reference: dict = None, repeats: int = 3) -> dict:
+    # Fresh fp32 weights per backend: building one consumes them (in-place INT8, ONNX export)
+    SiglipService._processor, SiglipService._backend = SiglipService._build(settings.SIGLIP_MODEL_ID, backend_name)
+
+    image_embs, image_latency = _timed(lambda: SiglipService.get_image_embeddings(images), repeats)
+    text_embs, text_latency = _timed(lambda: SiglipService.get_text_embeddings(texts), repeats)
+
+    drifts = [0.0]
+    if reference:
+        drifts = [cosine_drift(r, c) for r, c in zip(reference["image"], image_embs)]
+        drifts += [cosine_drift(r, c) for r, c in zip(reference["text"], text_embs)]
+    return {
+        "mean_cosine_drift": sum(drifts) / len(drifts),
+        "max_cosine_drift": max(drifts),
+        "image_batch_ms": image_latency * 1000,
+        "text_batch_ms": text_latency * 1000,
+        "_embeddings": {"image": image_embs, "text": text_embs},
+    }
+
+
+def owlv2_parity(backend_name: str, images, reference: list = None, repeats: int = 3) -> dict:
+    Owlv2Service._processor, Owlv2Service._backend = Owlv2Service._build(settings.OWLV2_MODEL_ID, backend_name)
+    Owlv2Service._query_cache.clear()
+
+    results, latency = _timed(lambda: Owlv2Service.detect_images(images), repeats)
+    ious = [
+        detection_parity(ref["detections"], res["detections"])
+        for ref, res in zip(reference, results)
+    ] if reference else [1.0]
+    return {
+        "mean_box_iou": sum(ious) / len(ious),
+        "min_box_iou": min(ious),
+        "detect_batch_ms": latency * 1000,
+        "_results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--images", required=True, help="Directory of sample product photos")
+    parser.add_argument("--backends", nargs="+", default=[b for b in BACKENDS if b != "torch"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-drift", type=float, default=0.02)
+    parser.add_argument("--min-iou", type=float, default=0.8)
+    parser.add_argument("--skip-detection", action="store_true")
+    args = parser.parse_args()
+
+    images = _load_images(args.images)
+    report = {"siglip": {}, "owlv2": {}}
+    failed = False
+
+    reference = siglip_parity("torch", images, DEFAULT_QUERIES, repeats=args.repeats)
+    reference_embs = reference.pop("_embeddings")
+    report["siglip"]["torch"] = reference
+    for name in args.backends:
+        result = siglip_parity(name, images, DEFAULT_QUERIES, reference_embs, args.repeats)
+        result.pop("_embeddings")
+        result["speedup"] = reference["image_batch_ms"] / result["image_batch_ms"]
+        report["siglip"][name] = result
+        failed |= result["max_cosine_drift"] > args.max_drift
+
+    if not args.skip_detection:
+        reference = owlv2_parity("torch", images, repeats=args.repeats)
+        reference_results = reference.pop("_results")
+        report["owlv2"]["torch"] = reference
+        for name in args.backends:
+            result = owlv2_parity(name, images, reference_results, args.repeats)
+            result.pop("_results")
+            result["speedup"] = reference["detect_batch_ms"] / result["detect_batch_ms"]
+            report["owlv2"][name] = result
+            failed |= result["mean_box_iou"] < args.min_iou
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
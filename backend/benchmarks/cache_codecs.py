@@ -0,0 +1,148 @@
+"""
+Search Cache Codecs
+Compares cached-result size and hit latency for every installed codec
+(json / orjson / msgpack), with and without zstd, storing either full rows
+("inline") or only ids + scores ("ids", payloads re-attached from memory).
+
+Offline (default): encoded bytes per entry and encode / decode(+hydrate) time.
+With --redis-url: also Redis memory per entry and GET+decode p50 / p95.
+
+Usage (from backend/):
+    python -m benchmarks.cache_codecs --top-k 20 --entries 2000
+    python -m benchmarks.cache_codecs --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.core.codecs import Codec, available_formats
+
+CATEGORIES = ["dress", "jeans", "jacket", "sneakers", "skirt", "shirt", "bag"]
+BRANDS = ["Aurora", "Northwind", "Mistral", "Kestrel", "Solace"]
+
+
+def _payload(i: int, rng: random.Random) -> dict:
+    category = rng.choice(CATEGORIES)
+    return {
+        "sku": f"SKU-{i:07d}",
+        "title": f"{rng.choice(BRANDS)} {category} in {rng.choice(['red', 'black', 'navy', 'ivory'])}",
+        "description": " ".join(rng.choice(CATEGORIES + BRANDS) for _ in range(30)),
+        "category": category,
+        "brand": rng.choice(BRANDS),
+        "price": round(rng.uniform(9, 400), 2),
+        "in_stock": rng.random() > 0.1,
+        "image_url": f"https://cdn.example.com/products/{i:07d}/main.jpg",
+        "content_hash": "%064x" % rng.getrandbits(256),
+        "model_id": "google/siglip-so400m-patch14-384",
+    }
+
+
+def _results(top_k: int, catalog: dict, rng: random.Random) -> list:
+    ids = rng.sample(sorted(catalog), top_k)
+    return [{"id": pid, "score": rng.random(), "payload": catalog[pid]} for pid in ids]
+
+
+def _compact(results: list) -> dict:
+    return {"ids": [[row["id"], row["score"]] for row in results]}
+
+
+def _hydrate(value, catalog: dict) -> list:
+    if isinstance(value, dict):
+        return [{"id": pid, "score": score, "payload": catalog[pid]} for pid, score in value["ids"]]
+    return value
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def run_offline(codec: Codec, mode: str, entries: list, catalog: dict) -> dict:
+    values = [_compact(e) if mode == "ids" else e for e in entries]
+    started = time.perf_counter()
+    encoded = [codec.encode(v) for v in values]
+    encode_s = (time.perf_counter() - started) / len(values)
+    started = time.perf_counter()
+    for data in encoded:
+        _hydrate(codec.decode(data), catalog)
+    decode_s = (time.perf_counter() - started) / len(values)
+    return {
+        "bytes": round(statistics.mean(len(d) for d in encoded)),
+        "encode_us": _us(encode_s),
+        "decode_us": _us(decode_s),
+    }, encoded
+
+
+def run_redis(client, encoded: list, codec: Codec, catalog: dict, prefix: str) -> dict:
+    client.flushdb()
+    before = client.info("memory")["used_memory"]
+    for i, data in enumerate(encoded):
+        client.set(f"{prefix}:{i}", data)
+    per_entry = (client.info("memory")["used_memory"] - before) / len(encoded)
+    latencies = []
+    for i in range(len(encoded)):
+        started = time.perf_counter()
+        _hydrate(codec.decode(client.get(f"{prefix}:{i}")), catalog)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    client.flushdb()
+    return {
+        "redis_bytes": round(per_entry),
+        "hit_p50_us": _us(latencies[len(latencies) // 2]),
+        "hit_p95_us": _us(latencies[int(len(latencies) * 0.95)]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--catalog", type=int, default=10_000)
+    parser.add_argument("--redis-url", help="Scratch Redis DB (it is flushed!)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    catalog = {f"{i:08x}-0000-0000-0000-000000000000": _payload(i, rng) for i in range(args.catalog)}
+    entries = [_results(args.top_k, catalog, rng) for _ in range(args.entries)]
+
+    client = None
+    if args.redis_url:
+        import redis
+        client = redis.Redis.from_url(args.redis_url, decode_responses=False)
+
+    compressions = ["none"]
+    try:
+        import zstandard  # noqa: F401
+        compressions.append("zstd")
+    except ImportError:
+        print("zstandard not installed: skipping compressed variants")
+
+    report = []
+    for name in available_formats():
+        for compression in compressions:
+            codec = Codec(name, compression)
+            for mode in ("inline", "ids"):
+                row, encoded = run_offline(codec, mode, entries, catalog)
+                row = {"codec": name, "compression": compression, "mode": mode, **row}
+                if client is not None:
+                    row.update(run_redis(client, encoded, codec, catalog, "bench:cache"))
+                report.append(row)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    baseline = next(r for r in report if r["codec"] == "json" and r["compression"] == "none" and r["mode"] == "inline")
+    columns = ["bytes", "encode_us", "decode_us"] + (["redis_bytes", "hit_p50_us", "hit_p95_us"] if client else [])
+    print(f"\n{'codec':<9}{'zstd':<6}{'mode':<8}" + "".join(f"{c:>13}" for c in columns) + f"{'size vs json':>14}")
+    for row in report:
+        print(f"{row['codec']:<9}{row['compression']:<6}{row['mode']:<8}"
+              + "".join(f"{row[c]:>13}" for c in columns)
+              + f"{row['bytes'] / baseline['bytes']:>13.0%}")
+
+
+if __name__ == "__main__":
+    main()
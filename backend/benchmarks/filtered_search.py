@@ -0,0 +1,145 @@
+"""
+Filtered Search Latency
+Measures filtered ANN query latency (p50 / p95) across filter selectivities,
+on a collection with the production payload indexes + HNSW config and on an
+otherwise identical collection without them.
+
+Two filter shapes are swept, matching what /search/hybrid sends:
+  - price:    float Range covering `selectivity` of the catalog
+  - category: keyword MatchAny over `selectivity` of the categories
+
+Needs a running Qdrant (scratch collections are created and dropped).
+
+Usage (from backend/):
+    python -m benchmarks.filtered_search --points 100000 --selectivities 0.5 0.1 0.01 0.001
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance, FieldCondition, Filter, MatchAny, PointStruct, Range, VectorParams,
+)
+
+from app.core.config import settings
+from app.services.qdrant_service import PAYLOAD_INDEXES, QdrantService
+from app.services.siglip_service import SiglipService
+
+CATEGORIES = 1000
+MAX_PRICE = 1000.0
+
+
+def _percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) * 1000
+
+
+def _create(client: QdrantClient, name: str, dim: int, indexed: bool):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        hnsw_config=QdrantService.hnsw_config() if indexed else None,
+    )
+    if indexed:
+        # Before the upload, as in production, so HNSW builds payload links
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            client.create_payload_index(name, field_name=field_name, field_schema=schema, wait=True)
+
+
+def _load(client: QdrantClient, name: str, vectors: np.ndarray, prices: np.ndarray, batch: int = 1024):
+    for start in range(0, len(vectors), batch):
+        client.upsert(
+            collection_name=name,
+            points=[
+                PointStruct(
+                    id=i,
+                    vector=vectors[i].tolist(),
+                    payload={
+                        "category": f"c{i % CATEGORIES}",
+                        "brand": f"b{i % 97}",
+                        "in_stock": bool(i % 10),
+                        "price": float(prices[i]),
+                    },
+                )
+                for i in range(start, min(start + batch, len(vectors)))
+            ],
+            wait=True,
+        )
+    # Wait for the optimizer to finish building the HNSW graph
+    while client.get_collection(name).status != "green":
+        time.sleep(0.5)
+
+
+def _filters(selectivity: float) -> dict:
+    categories = max(1, round(CATEGORIES * selectivity))
+    return {
+        "price": Filter(must=[FieldCondition(key="price", range=Range(lte=MAX_PRICE * selectivity))]),
+        "category": Filter(must=[FieldCondition(
+            key="category", match=MatchAny(any=[f"c{i}" for i in range(categories)])
+        )]),
+    }
+
+
+def _measure(client: QdrantClient, name: str, queries: np.ndarray, query_filter: Filter, limit: int) -> dict:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        client.search(collection_name=name, query_vector=query.tolist(), query_filter=query_filter, limit=limit)
+        latencies.append(time.perf_counter() - started)
+    return {"p50_ms": round(_percentile(latencies, 50), 2), "p95_ms": round(_percentile(latencies, 95), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default=settings.QDRANT_URL)
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=SiglipService.embedding_dim())
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--selectivities", nargs="+", type=float, default=[0.5, 0.1, 0.01, 0.001])
+    parser.add_argument("--prefix", default="bench_filtered")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collections")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.points, args.dim), dtype=np.float32)
+    prices = rng.uniform(0, MAX_PRICE, args.points)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    client = QdrantClient(url=args.url, timeout=60)
+    collections = {"indexed": f"{args.prefix}_indexed", "unindexed": f"{args.prefix}_plain"}
+    report = []
+    try:
+        for variant, name in collections.items():
+            print(f"Loading {args.points} points into '{name}' ({variant})...")
+            _create(client, name, args.dim, indexed=variant == "indexed")
+            _load(client, name, vectors, prices)
+
+        for selectivity in args.selectivities:
+            for shape, query_filter in _filters(selectivity).items():
+                row = {"filter": shape, "selectivity": selectivity}
+                for variant, name in collections.items():
+                    row[variant] = _measure(client, name, queries, query_filter, args.limit)
+                report.append(row)
+    finally:
+        if not args.keep:
+            for name in collections.values():
+                client.delete_collection(name)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n{'filter':<10}{'selectivity':>12}{'indexed p95':>14}{'unindexed p95':>16}")
+    for row in report:
+        print(f"{row['filter']:<10}{row['selectivity']:>12.3%}"
+              f"{row['indexed']['p95_ms']:>12.2f}ms{row['unindexed']['p95_ms']:>14.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+End-to-End Load Test
+Drives concurrent load through the real FastAPI app (in-process, over ASGI)
+with stand-in backends, so runs are reproducible on any machine and in CI:
+
+  - Qdrant:  in-memory AsyncQdrantClient(":memory:") seeded with random vectors
+  - Redis:   fakeredis
+  - Models:  tiny random-weight SigLIP and OWLv2 built from config (no
+             download) behind a hashing tokenizer; the real service, batching,
+             executor, cache and single-flight code paths all run
+
+Scenarios:
+  search_miss   POST /api/v1/search/ with a distinct query per request
+  search_hit    POST /api/v1/search/ with a handful of already-cached queries
+  detect        POST /api/v1/detect/ with a small generated image
+
+Reports throughput and client-side p50 / p95 / p99 per scenario, plus per
+stage p50 / p95 / p99 (text_embedding, qdrant_search, cache_lookup, ...)
+estimated from the stage_duration_seconds histogram buckets, as JSON.
+
+Absolute numbers measure the service overhead around inference, not model
+speed. Record a baseline on the machine that will enforce it, then compare:
+
+Usage (from backend/, needs torch, transformers, qdrant-client, fakeredis):
+    python -m benchmarks.load_test --concurrency 16 --requests 400 --save-baseline benchmarks/baselines/load_test.json
+    python -m benchmarks.load_test --concurrency 16 --requests 400 --baseline benchmarks/baselines/load_test.json
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+
+TINY_DIM = 32
+SIGLIP_IMAGE_SIZE = 32
+OWLV2_IMAGE_SIZE = 64
+MAX_TEXT_LENGTH = 16
+VOCAB_SIZE = 1000
+QUANTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+Request = Tuple[str, str, dict]
+
+
+class StandInProcessor:
+    """
+    processor(text=..., images=...) like the HF processors, with a hashing
+    tokenizer so no vocabulary has to be downloaded. Empty strings tokenize
+    to all padding (id 0), as OWLv2's query padding expects.
+    """
+
+    def __init__(self, image_processor):
+        self.image_processor = image_processor
+
+    def _tokenize(self, texts: List[str]):
+        import torch
+
+        input_ids = torch.zeros(len(texts), MAX_TEXT_LENGTH, dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        for row, text in enumerate(texts):
+            tokens = [1 + zlib.crc32(word.encode()) % (VOCAB_SIZE - 2) for word in text.split()]
+            tokens = tokens[:MAX_TEXT_LENGTH - 1]
+            if tokens:
+                tokens.append(VOCAB_SIZE - 1)  # highest id = EOS for argmax pooling
+            input_ids[row, :len(tokens)] = torch.tensor(tokens, dtype=torch.long)
+            attention_mask[row, :len(tokens)] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+    def __call__(self, text=None, images=None, return_tensors="pt", **kwargs):
+        inputs = {}
+        if text is not None:
+            # OWLv2 passes one nested list of queries per image
+            flat = [t for group in text for t in group] if text and isinstance(text[0], list) else list(text)
+            inputs.update(self._tokenize(flat))
+        if images is not None:
+            inputs.update(self.image_processor(images=images, return_tensors=return_tensors))
+        return inputs
+
+    def post_process_object_detection(self, *args, **kwargs):
+        return self.image_processor.post_process_object_detection(*args, **kwargs)
+
+
+def _tower(**overrides) -> dict:
+    return {
+        "hidden_size": TINY_DIM, "intermediate_size": TINY_DIM * 2,
+        "num_hidden_layers": 2, "num_attention_heads": 2, **overrides,
+    }
+
+
+def install_stand_in_models():
+    """Publish tiny random-weight models into the service singletons"""
+    from transformers import (
+        Owlv2Config, Owlv2ForObjectDetection, Owlv2ImageProcessor,
+        SiglipConfig, SiglipImageProcessor, SiglipModel,
+    )
+
+    from app.core import readiness
+    from app.services.inference_backends import load_owlv2_backend, load_siglip_backend
+    from app.services.owlv2_service import Owlv2Service
+    from app.services.siglip_service import SiglipService
+
+    siglip = SiglipModel(SiglipConfig(
+        text_config=_tower(vocab_size=VOCAB_SIZE, max_position_embeddings=MAX_TEXT_LENGTH),
+        vision_config=_tower(image_size=SIGLIP_IMAGE_SIZE, patch_size=8),
+    )).eval()
+    SiglipService._backend = load_siglip_backend("torch", siglip, settings.SIGLIP_MODEL_ID)
+    SiglipService._processor = StandInProcessor(
+        SiglipImageProcessor(size={"height": SIGLIP_IMAGE_SIZE, "width": SIGLIP_IMAGE_SIZE})
+    )
+    SiglipService._model = siglip
+
+    owlv2 = Owlv2ForObjectDetection(Owlv2Config(
+        text_config=_tower(vocab_size=VOCAB_SIZE, max_position_embeddings=MAX_TEXT_LENGTH),
+        vision_config=_tower(image_size=OWLV2_IMAGE_SIZE, patch_size=16),
+        projection_dim=TINY_DIM,
+    )).eval()
+    Owlv2Service._backend = load_owlv2_backend("torch", owlv2, settings.OWLV2_MODEL_ID)
+    Owlv2Service._processor = StandInProcessor(
+        Owlv2ImageProcessor(size={"height": OWLV2_IMAGE_SIZE, "width": OWLV2_IMAGE_SIZE})
+    )
+    Owlv2Service._model = owlv2
+
+    for name in ("siglip", "owlv2"):
+        readiness.state(name).status = "ready"
+
+
+async def install_stand_in_stores(points: int, seed: int = 0):
+    """In-memory Qdrant seeded with `points` random products, and fakeredis"""
+    import fakeredis
+    import numpy as np
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    from app.services.qdrant_service import QdrantService
+    from app.services.redis_service import RedisService
+
+    client = AsyncQdrantClient(location=":memory:")
+    await client.create_collection(
+        collection_name=settings.QDRANT_COLLECTION,
+        vectors_config=VectorParams(size=TINY_DIM, distance=Distance.COSINE),
+    )
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((points, TINY_DIM), dtype=np.float32)
+    for start in range(0, points, 1024):
+        await client.upsert(
+            collection_name=settings.QDRANT_COLLECTION,
+            points=[
+                PointStruct(id=i, vector=vectors[i].tolist(), payload={
+                    "sku": f"SKU-{i:07d}", "title": f"product {i}",
+                    "category": f"c{i % 50}", "price": float(i % 500), "in_stock": bool(i % 10),
+                })
+                for i in range(start, min(start + 1024, points))
+            ],
+        )
+    QdrantService._async_client = client
+    RedisService._client = fakeredis.FakeAsyncRedis()
+
+
+def _png(size: int = 256) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), (180, 40, 60)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def scenarios(hot_queries: int) -> Dict[str, Callable[[int], Request]]:
+    image = _png()
+    return {
+        "search_miss": lambda i: ("POST", "/api/v1/search/", {"json": {"query_text": f"red dress {i}"}}),
+        "search_hit": lambda i: (
+            "POST", "/api/v1/search/", {"json": {"query_text": f"black jacket {i % hot_queries}"}}
+        ),
+        "detect": lambda i: (
+            "POST", "/api/v1/detect/", {"files": {"file": ("look.png", image, "image/png")}}
+        ),
+    }
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _stage_snapshot() -> dict:
+    histogram = metrics.histogram("stage_duration_seconds")
+    return {dict(key).get("stage"): series for key, series in histogram.samples().items()}
+
+
+def _stage_report(before: dict, after: dict) -> dict:
+    """Per-stage quantiles over the observations made between two snapshots"""
+    buckets = metrics.histogram("stage_duration_seconds").buckets
+    stages = {}
+    for stage, series in sorted(after.items()):
+        previous = before.get(stage, {"counts": [0] * len(series["counts"]), "count": 0})
+        counts = [a - b for a, b in zip(series["counts"], previous["counts"])]
+        if not sum(counts):
+            continue
+        stages[stage] = {"count": sum(counts)}
+        for name, q in QUANTILES.items():
+            stages[stage][f"{name}_ms"] = round(metrics.bucket_quantile(buckets, counts, q) * 1000, 3)
+    return stages
+
+
+async def drive(client, make_request: Callable[[int], Request], requests: int, concurrency: int) -> dict:
+    """Issue `requests` requests from `concurrency` concurrent clients"""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            method, url, kwargs = make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    before = _stage_snapshot()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    failed = errors + sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": failed,
+        "error_rate": round(failed / requests, 4) if requests else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            **{name: round(_percentile(latencies, q) * 1000, 3) for name, q in QUANTILES.items()},
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "stages": _stage_report(before, _stage_snapshot()),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    install_stand_in_models()
+    await install_stand_in_stores(args.points)
+    from app.main import app
+
+    report = {
+        "config": {
+            "points": args.points, "requests": args.requests, "concurrency": args.concurrency,
+            "inference_workers": settings.INFERENCE_WORKERS, "python": platform.python_version(),
+            "machine": platform.machine(), "cpus": os.cpu_count(),
+        },
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        selected = scenarios(args.hot_queries)
+        # Prime the hot queries and warm every path once before measuring
+        await drive(client, selected["search_hit"], args.hot_queries, 1)
+        await drive(client, selected["detect"], 2, 1)
+        for name in args.scenarios:
+            report["scenarios"][name] = await drive(client, selected[name], args.requests, args.concurrency)
+    return report
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    Regressions against a stored report: a latency quantile more than
+    `tolerance` (fraction) and `min_delta_ms` above the baseline, throughput
+    more than `tolerance` below it, or errors where the baseline had none.
+    """
+    regressions = []
+    for name, base in baseline.get("scenarios", {}).items():
+        current = report["scenarios"].get(name)
+        if current is None:
+            continue
+        for quantile in QUANTILES:
+            was, now = base["latency_ms"][quantile], current["latency_ms"][quantile]
+            if now > was * (1 + tolerance) and now - was > min_delta_ms:
+                regressions.append(f"{name} {quantile} {was:.2f}ms -> {now:.2f}ms")
+        was, now = base["throughput_rps"], current["throughput_rps"]
+        if now < was * (1 - tolerance):
+            regressions.append(f"{name} throughput {was:.1f} -> {now:.1f} req/s")
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name} error rate {base['error_rate']:.2%} -> {current['error_rate']:.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=400, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--points", type=int, default=10_000, help="Products in the in-memory collection")
+    parser.add_argument("--hot-queries", type=int, default=8, help="Distinct queries in search_hit")
+    parser.add_argument("--scenarios", nargs="+", default=["search_miss", "search_hit", "detect"],
+                        choices=["search_miss", "search_hit", "detect"])
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="Fail (exit 1) on regressions against this stored report")
+    parser.add_argument("--save-baseline", help="Store this run's report as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="Ignore latency changes smaller than this (timer noise on fast paths)")
+    args = parser.parse_args()
+
+    # Stand-in models are only registered under these ids; keep every run local and cold
+    settings.SIGLIP_MODEL_ID = "bench/tiny-siglip"
+    settings.OWLV2_MODEL_ID = "bench/tiny-owlv2"
+    settings.SIGLIP_EMBEDDING_DIM = TINY_DIM
+    settings.IMAGE_DECODE_MAX_SIDE = OWLV2_IMAGE_SIZE * 4
+    settings.INFERENCE_MODE = "local"
+    settings.PRELOAD_MODELS = ""
+    settings.EMBEDDING_STORE_DIR = None
+
+    report = asyncio.run(run(args))
+    rendered = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(rendered + "\n")
+    else:
+        print(rendered)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            f.write(rendered + "\n")
+        print(f"Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Local Index vs Qdrant Crossover
+Measures single-query latency (p50 / p95) of the in-process vector index
+(app.services.local_index) in exact and IVF mode against a Qdrant server, at
+increasing catalog sizes, and reports the size at which Qdrant's p50 drops
+below the local exact scan. IVF recall@limit is relative to the exact scan.
+
+Vectors are clustered (like product embeddings) rather than uniform noise.
+Without a reachable Qdrant (or with --no-qdrant) only the local modes run.
+
+Usage (from backend/):
+    python -m benchmarks.local_index --sizes 1000 10000 50000 200000
+    python -m benchmarks.local_index --no-qdrant --float32-cache
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.local_index import LocalVectorIndex
+from app.services.siglip_service import SiglipService
+
+COLLECTION = "bench_local_index"
+CLUSTERS = 256
+UPLOAD_BATCH = 1024
+
+
+def _percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) * 1000
+
+
+def _dataset(points: int, queries: int, dim: int):
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((CLUSTERS, dim), dtype=np.float32)
+    vectors = centers[rng.integers(CLUSTERS, size=points)] + 0.5 * rng.standard_normal((points, dim), dtype=np.float32)
+    picks = rng.integers(points, size=queries)
+    return vectors, vectors[picks] + 0.3 * rng.standard_normal((queries, dim), dtype=np.float32)
+
+
+def _points(vectors: np.ndarray, start: int, stop: int) -> list:
+    return [
+        SimpleNamespace(id=i, vector=vectors[i].tolist(), payload={"sku": f"SKU-{i:07d}"})
+        for i in range(start, stop)
+    ]
+
+
+def _measure(search, queries: np.ndarray) -> tuple:
+    search(queries[0])  # warm-up: builds the IVF index, maps pages
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = search(query)
+        latencies.append(time.perf_counter() - started)
+        results.append({hit.id for hit in hits})
+    return {"p50_ms": round(_percentile(latencies, 50), 2), "p95_ms": round(_percentile(latencies, 95), 2)}, results
+
+
+def _qdrant(url: str, dim: int):
+    try:
+        from qdrant_client import QdrantClient
+        from qdrant_client.models import Distance, VectorParams
+
+        client = QdrantClient(url=url, timeout=60)
+        if client.collection_exists(COLLECTION):
+            client.delete_collection(COLLECTION)
+        client.create_collection(COLLECTION, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+        return client
+    except Exception as e:
+        print(f"Qdrant unavailable at {url} ({e}); measuring the local index only")
+        return None
+
+
+def _upload_qdrant(client, vectors: np.ndarray, start: int, stop: int):
+    from qdrant_client.models import PointStruct
+
+    for offset in range(start, stop, UPLOAD_BATCH):
+        client.upsert(COLLECTION, points=[
+            PointStruct(id=p.id, vector=p.vector, payload=p.payload)
+            for p in _points(vectors, offset, min(offset + UPLOAD_BATCH, stop))
+        ], wait=True)
+    # Wait for the optimizer to finish building the HNSW graph
+    while client.get_collection(COLLECTION).status != "green":
+        time.sleep(0.5)
+
+
+def crossover(report: list) -> int:
+    """Smallest measured size where Qdrant's p50 beats the local exact scan, else 0"""
+    for row in report:
+        if "qdrant" in row and row["qdrant"]["p50_ms"] < row["local_exact"]["p50_ms"]:
+            return row["points"]
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default=settings.QDRANT_URL)
+    parser.add_argument("--no-qdrant", action="store_true")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 50_000, 200_000])
+    parser.add_argument("--dim", type=int, default=SiglipService.embedding_dim())
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--nprobe", type=int, default=settings.LOCAL_INDEX_IVF_NPROBE)
+    parser.add_argument("--float32-cache", action="store_true",
+                        help="Score from a per-process float32 copy (LOCAL_INDEX_FLOAT32_CACHE)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    sizes = sorted(args.sizes)
+    vectors, queries = _dataset(sizes[-1], args.queries, args.dim)
+    qdrant = None if args.no_qdrant else _qdrant(args.url, args.dim)
+
+    report, loaded = [], 0
+    with tempfile.TemporaryDirectory() as directory:
+        index = LocalVectorIndex(directory)
+        index.create_collection(COLLECTION, vectors_config=SimpleNamespace(size=args.dim))
+        settings.LOCAL_INDEX_IVF_NPROBE = args.nprobe
+        settings.LOCAL_INDEX_FLOAT32_CACHE = args.float32_cache
+        try:
+            for size in sizes:
+                print(f"Loading up to {size} points...")
+                for offset in range(loaded, size, UPLOAD_BATCH):
+                    index.upsert(COLLECTION, _points(vectors, offset, min(offset + UPLOAD_BATCH, size)))
+                if qdrant is not None:
+                    _upload_qdrant(qdrant, vectors, loaded, size)
+                loaded = size
+
+                def local(query):
+                    return index.search(COLLECTION, query_vector=query, limit=args.limit, with_payload=False)
+
+                row = {"points": size}
+                settings.LOCAL_INDEX_ANN_MIN_POINTS = 0
+                row["local_exact"], exact = _measure(local, queries)
+                settings.LOCAL_INDEX_ANN_MIN_POINTS = 1
+                row["local_ivf"], approximate = _measure(local, queries)
+                row["local_ivf"]["recall"] = round(float(np.mean(
+                    [len(a & e) / len(e) for a, e in zip(approximate, exact)]
+                )), 3)
+                if qdrant is not None:
+                    row["qdrant"], _ = _measure(
+                        lambda query: qdrant.search(COLLECTION, query_vector=query.tolist(), limit=args.limit),
+                        queries,
+                    )
+                report.append(row)
+        finally:
+            if qdrant is not None:
+                qdrant.delete_collection(COLLECTION)
+
+    if args.json:
+        print(json.dumps({"sizes": report, "crossover_points": crossover(report)}, indent=2))
+        return
+
+    print(f"\n{'points':>10}{'exact p50':>12}{'ivf p50':>12}{'ivf recall':>12}{'qdrant p50':>13}")
+    for row in report:
+        qdrant_p50 = f"{row['qdrant']['p50_ms']:>11.2f}ms" if "qdrant" in row else f"{'-':>13}"
+        print(f"{row['points']:>10}{row['local_exact']['p50_ms']:>10.2f}ms{row['local_ivf']['p50_ms']:>10.2f}ms"
+              f"{row['local_ivf']['recall']:>12.3f}{qdrant_p50}")
+    if qdrant is not None:
+        point = crossover(report)
+        print(f"\nQdrant overtakes the local exact scan at {point} points" if point
+              else "\nThe local exact scan was faster at every measured size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Worker Memory (RSS / PSS)
+Per-process memory of a running API deployment, to compare worker density
+between weight-loading modes (per-worker from_pretrained, preload-then-fork,
+MODEL_WEIGHTS_MODE=mmap).
+
+RSS counts shared weights once per worker; PSS splits shared pages between
+the processes mapping them, so the PSS total is what the node really pays.
+
+Usage (from backend/, Linux):
+    python -m benchmarks.worker_memory --pid <gunicorn master pid>
+    python -m benchmarks.worker_memory --pid <pid1> <pid2> ... --no-children
+"""
+
+import argparse
+import json
+
+from app.core.memory import child_pids, process_memory
+
+GB = 1024 ** 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--pid", type=int, nargs="+", required=True)
+    parser.add_argument("--no-children", action="store_true",
+                        help="Report the given pids only, not their worker children")
+    parser.add_argument("--node-gb", type=float, default=16.0,
+                        help="Node memory used to estimate how many workers fit")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    pids = []
+    for pid in args.pid:
+        pids.append(pid)
+        if not args.no_children:
+            pids.extend(child_pids(pid))
+
+    rows = [{"pid": pid, **process_memory(pid)} for pid in pids]
+    rows = [row for row in rows if "pss" in row]
+    if not rows:
+        raise SystemExit("No /proc/<pid>/smaps_rollup readable for these pids (Linux only)")
+
+    totals = {key: sum(row[key] for row in rows) for key in ("rss", "pss", "shared_clean", "private_dirty")}
+    workers = [row for row in rows if row["pid"] not in args.pid] or rows
+    per_worker_pss = sum(row["pss"] for row in workers) / len(workers)
+    # Marginal cost of one more worker is its private memory, not its PSS
+    per_worker_private = sum(row["private_dirty"] for row in workers) / len(workers)
+    fixed = totals["pss"] - per_worker_private * len(workers)
+    report = {
+        "processes": rows,
+        "totals": totals,
+        "per_worker_pss": per_worker_pss,
+        "per_worker_private": per_worker_private,
+        "estimated_workers_per_node": int(max(0, args.node_gb * GB - fixed) // max(per_worker_private, 1)),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'pid':>8}{'RSS GB':>10}{'PSS GB':>10}{'shared GB':>11}{'private GB':>12}")
+    for row in rows:
+        print(f"{row['pid']:>8}{row['rss'] / GB:>10.2f}{row['pss'] / GB:>10.2f}"
+              f"{row['shared_clean'] / GB:>11.2f}{row['private_dirty'] / GB:>12.2f}")
+    print(f"{'total':>8}{totals['rss'] / GB:>10.2f}{totals['pss'] / GB:>10.2f}"
+          f"{totals['shared_clean'] / GB:>11.2f}{totals['private_dirty'] / GB:>12.2f}")
+    print(f"\nPer worker: PSS {per_worker_pss / GB:.2f} GB, private {per_worker_private / GB:.2f} GB")
+    print(f"Estimated workers on a {args.node_gb:g} GB node: {report['estimated_workers_per_node']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Gunicorn config: N uvicorn workers sharing one copy of the model weights.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+With preload_app, the app is imported in the master and the PRELOAD_MODELS
+weights are loaded there (on_starting) before any worker is forked, so every
+worker shares those pages copy-on-write. Only the load happens in the master:
+warm-up forward passes run in each worker after the fork, because the
+intra-op thread pools they start do not survive fork(). gc.freeze() keeps the
+collector from touching (and so copying) the preloaded objects.
+
+Compare per-worker RSS/PSS with:
+    python -m benchmarks.worker_memory --pid <master pid>
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+# Preload-then-fork; set PRELOAD_APP=false to load models in each worker
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+
+
+def on_starting(server):
+    if not preload_app:
+        return
+    from app.services.model_preload import ModelPreloader
+
+    # Load only; each worker warms up in its own startup hook
+    ModelPreloader.preload(warmup=False)
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's reach so its
+    # bookkeeping writes don't un-share inherited pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Workers share the node's cores instead of each using all of them
+    try:
+        import torch
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // max(workers, 1)))
+    except ImportError:
+        pass